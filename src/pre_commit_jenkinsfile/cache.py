@@ -0,0 +1,143 @@
+import hashlib
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from src.pre_commit_jenkinsfile.results import ErrorCodes, ValidationResult
+from src.pre_commit_jenkinsfile.syntax import canonical_digest
+
+DEFAULT_TTL: float = 7 * 24 * 60 * 60
+DEFAULT_MAX_ENTRIES: int = 5000
+PRUNE_INTERVAL: float = 60 * 60
+
+
+def default_cache_dir() -> Path:
+    cache_home: str = os.environ.get("XDG_CACHE_HOME", "")
+    if len(cache_home) == 0:
+        cache_home = str(Path.home() / ".cache")
+    return Path(cache_home) / "pre-commit-jenkinsfile"
+
+
+def content_key(content: bytes, scope: str) -> str:
+    # "<canonical>.<exact>": entries are found by the canonical digest, so edits to comments or
+    # whitespace still hit, and the exact digest is kept to tell whether the file is the very one
+    # that was validated
+    digest = hashlib.sha256()
+    digest.update(scope.encode())
+    digest.update(b"\0")
+    digest.update(canonical_digest(content).encode())
+    return f"{digest.hexdigest()}.{hashlib.sha256(content).hexdigest()}"
+
+
+def split_key(key: str) -> Tuple[str, str]:
+    canonical, _, exact = key.partition(".")
+    return canonical, exact
+
+
+def entry_result(entry: Dict, key: str, filename: Path) -> Optional[ValidationResult]:
+    # The messages of failures point at lines and columns, which moved unless the file is unchanged
+    return_code: ErrorCodes = ErrorCodes(entry["return_code"])
+    if ErrorCodes.FAIL == return_code and entry.get("source") != split_key(key)[1]:
+        return None
+    return ValidationResult(filename, return_code, entry.get("message", ""))
+
+
+class ResultCache:
+    def __init__(
+        self,
+        cache_dir: Path,
+        ttl: float = DEFAULT_TTL,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+    ):
+        self.cache_dir: Path = cache_dir / "results"
+        self.ttl: float = ttl
+        self.max_entries: int = max_entries
+
+    @staticmethod
+    def key(content: bytes, controller: str) -> str:
+        return content_key(content, controller)
+
+    def _entry_path(self, key: str) -> Path:
+        canonical: str = split_key(key)[0]
+        return self.cache_dir / canonical[:2] / f"{canonical}.json"
+
+    def get(self, key: str, filename: Path) -> Optional[ValidationResult]:
+        entry_path: Path = self._entry_path(key)
+        try:
+            entry: Dict = json.loads(entry_path.read_text())
+        except (OSError, ValueError):
+            return None
+
+        if time.time() - entry.get("created", 0.0) > self.ttl:
+            entry_path.unlink(missing_ok=True)
+            return None
+
+        return entry_result(entry, key, filename)
+
+    def put(self, key: str, result: ValidationResult) -> None:
+        # Only verdicts from the controller are worth remembering
+        if not result.is_verdict:
+            return
+
+        entry_path: Path = self._entry_path(key)
+        entry: Dict = {
+            "return_code": int(result.return_code),
+            "message": result.message,
+            "source": split_key(key)[1],
+            "created": time.time(),
+        }
+        try:
+            entry_path.parent.mkdir(parents=True, exist_ok=True)
+            # Write to a temporary file first so concurrent hook runs never see a partial entry
+            file_descriptor, temp_name = tempfile.mkstemp(
+                dir=entry_path.parent, suffix=".tmp"
+            )
+            with os.fdopen(file_descriptor, "w") as temp_file:
+                json.dump(entry, temp_file)
+            os.replace(temp_name, entry_path)
+        except OSError as err:
+            print(f"Could not write to the result cache {self.cache_dir}:\n{str(err)}")
+
+    def find(
+        self, filename: Path, controller: str
+    ) -> Tuple[Optional[ValidationResult], str]:
+        try:
+            key: str = self.key(filename.read_bytes(), controller)
+        except OSError:
+            # Let the validator report unreadable files
+            return None, ""
+        return self.get(key, filename), key
+
+    def prune(self) -> None:
+        now: float = time.time()
+        # Scanning the whole cache is not free, so only do it once per interval
+        marker: Path = self.cache_dir / ".last-prune"
+        try:
+            if now - marker.stat().st_mtime < PRUNE_INTERVAL:
+                return
+        except OSError:
+            pass
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            marker.touch()
+        except OSError:
+            return
+
+        entries: List[Tuple[float, Path]] = []
+        for entry_path in self.cache_dir.glob("*/*.json"):
+            try:
+                modified: float = entry_path.stat().st_mtime
+                if now - modified > self.ttl:
+                    entry_path.unlink()
+                else:
+                    entries.append((modified, entry_path))
+            except OSError:
+                continue
+
+        if len(entries) > self.max_entries:
+            entries.sort()
+            for _, entry_path in entries[: len(entries) - self.max_entries]:
+                entry_path.unlink(missing_ok=True)
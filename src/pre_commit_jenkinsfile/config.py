@@ -1,6 +1,7 @@
 import configparser
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from pathlib import Path
+from typing import List
 
 
 @dataclass
@@ -10,6 +11,8 @@ class Config:
     jenkins_api_token: str = ""
     jenkins_hostname: str = ""
     jenkins_ssh_port: int = 22
+    # Further controllers from the [http:<name>] and [ssh:<name>] sections of a config file
+    extra_controllers: List["Config"] = field(default_factory=list)
 
     def has_http_creds(self) -> bool:
         return len(self.jenkins_url) > 0
@@ -17,6 +20,26 @@ class Config:
     def has_ssh_creds(self) -> bool:
         return len(self.jenkins_hostname) > 0
 
+    def controller_id(self) -> str:
+        if self.has_http_creds():
+            return self.jenkins_url
+        return f"{self.jenkins_hostname}:{self.jenkins_ssh_port}"
+
+    def controllers(self) -> List["Config"]:
+        # One config per controller, each of which is reached either over HTTP or over SSH
+        controllers: List[Config] = []
+        if self.has_http_creds() or self.has_ssh_creds():
+            controllers.append(
+                Config(
+                    self.jenkins_url,
+                    self.jenkins_login,
+                    self.jenkins_api_token,
+                    self.jenkins_hostname,
+                    self.jenkins_ssh_port,
+                )
+            )
+        return controllers + self.extra_controllers
+
     @staticmethod
     def load_file(file_path: Path) -> "Config":
         config = Config()
@@ -41,4 +64,22 @@ class Config:
             "ssh", "port", fallback=config.jenkins_ssh_port
         )
 
+        # Additional controllers, in the order of the file
+        for section in parser.sections():
+            if section.startswith("http:"):
+                config.extra_controllers.append(
+                    Config(
+                        jenkins_url=parser.get(section, "url", fallback=""),
+                        jenkins_login=parser.get(section, "login", fallback=""),
+                        jenkins_api_token=parser.get(section, "api_token", fallback=""),
+                    )
+                )
+            elif section.startswith("ssh:"):
+                config.extra_controllers.append(
+                    Config(
+                        jenkins_hostname=parser.get(section, "hostname", fallback=""),
+                        jenkins_ssh_port=parser.getint(section, "port", fallback=22),
+                    )
+                )
+
         return config
@@ -0,0 +1,525 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from src.pre_commit_jenkinsfile.config import Config
+from src.pre_commit_jenkinsfile.deadline import Deadline
+from src.pre_commit_jenkinsfile.health import HealthStore
+from src.pre_commit_jenkinsfile.hedge import cancelled
+from src.pre_commit_jenkinsfile.results import ErrorCodes, ValidationResult
+from src.pre_commit_jenkinsfile.shared_store import (
+    SharedStore,
+    describe_versions_error,
+    with_shared_store,
+)
+from src.pre_commit_jenkinsfile.timings import TIMINGS
+
+# Weight of the newest sample in the moving average of a controller's validation time
+LATENCY_SMOOTHING: float = 0.3
+# How long the transport picked by --transport auto is used before both are measured again
+DEFAULT_TRANSPORT_TTL: float = 24 * 60 * 60
+
+
+class TransportStore:
+    # Remembers the transport that --transport auto picked for each controller
+    def __init__(self, cache_dir: Path, ttl: float = DEFAULT_TRANSPORT_TTL):
+        self.store_dir: Path = cache_dir / "transports"
+        self.ttl: float = ttl
+
+    def _entry_path(self, controller_id: str) -> Path:
+        key: str = hashlib.sha256(controller_id.encode()).hexdigest()
+        return self.store_dir / f"{key}.json"
+
+    def load(self, controller_id: str) -> Optional[str]:
+        try:
+            entry: Dict[str, Any] = json.loads(
+                self._entry_path(controller_id).read_text()
+            )
+        except (OSError, ValueError):
+            return None
+        if entry.get("expires", 0.0) < time.time():
+            return None
+        return entry.get("transport")
+
+    def save(self, controller_id: str, transport: str) -> None:
+        entry: Dict[str, Any] = {
+            "transport": transport,
+            "expires": time.time() + self.ttl,
+        }
+        try:
+            self.store_dir.mkdir(parents=True, exist_ok=True)
+            file_descriptor, temp_name = tempfile.mkstemp(
+                dir=self.store_dir, suffix=".tmp"
+            )
+            with os.fdopen(file_descriptor, "w") as temp_file:
+                json.dump(entry, temp_file)
+            os.replace(temp_name, self._entry_path(controller_id))
+        except OSError as err:
+            print(f"Could not save the transport to {self.store_dir}:\n{str(err)}")
+
+
+class Controller:
+    # A connection to one controller that is opened on first use and then kept: an HTTP session with its
+    # crumb or a connected SSHClient.
+    # With the "auto" transport and both configured, the first connect opens both at once and keeps the
+    # one that was ready first, unless the TransportStore remembers a choice. When the transport in use
+    # fails without a verdict, the file and all after it go over the other one.
+    def __init__(
+        self,
+        config: Config,
+        jobs: int = 1,
+        crumb_store: Any = None,
+        shared_store: Optional[SharedStore] = None,
+        notify: Callable[[str], None] = print,
+        deadline: Optional[Deadline] = None,
+        transport: str = "",
+        transport_store: Optional[TransportStore] = None,
+    ):
+        self.config: Config = config
+        self.jobs: int = jobs
+        self.crumb_store: Any = crumb_store
+        self.shared_store: Optional[SharedStore] = shared_store
+        self.notify: Callable[[str], None] = notify
+        self.deadline: Optional[Deadline] = deadline
+        # The Jenkins and plugin versions that key the shared store, read once per controller
+        self.versions: Optional[str] = None
+        self._versions_read: bool = False
+        # "http" or "ssh"; by default HTTP when the config has an API token
+        self.transport: str = (
+            transport
+            if transport in ("http", "ssh")
+            else ("http" if config.has_http_creds() else "ssh")
+        )
+        self.auto: bool = (
+            "auto" == transport and config.has_http_creds() and config.has_ssh_creds()
+        )
+        self.transport_store: Optional[TransportStore] = transport_store
+        self._chosen: bool = False
+        # Transports that failed in this run, so a file is not passed back and forth
+        self._failed: Set[str] = set()
+        self.session: Any = None
+        self.client: Any = None
+        self._warm_up_error: Optional[str] = None
+        # Scheduling state for ControllerPool
+        self.latency: float = 0.0
+        self.in_flight: int = 0
+        self.down: bool = False
+        self._lock = threading.Lock()
+
+    @property
+    def name(self) -> str:
+        return self.config.controller_id()
+
+    def connect(self) -> Optional[str]:
+        # Returns an error message when the controller cannot be reached
+        with self._lock:
+            if self._warm_up_error is not None:
+                # Reported by the first file instead of connecting again right away
+                error, self._warm_up_error = self._warm_up_error, None
+                return error
+            return self._connect()
+
+    def warm_up(self) -> None:
+        # Connects on a background thread, so the handshake and the crumb request overlap whatever
+        # the caller does before the first file is sent. That file waits on the lock until the
+        # connection is ready, and gets the error if there was one.
+        def run() -> None:
+            with self._lock:
+                self._warm_up_error = self._connect()
+
+        threading.Thread(target=run, daemon=True).start()
+
+    def _connect(self) -> Optional[str]:
+        error: Optional[str]
+        if self.auto and not self._chosen:
+            self._chosen = True
+            error = self._choose_transport()
+        else:
+            error = self._connect_to(self.transport)
+        if error is None and self.shared_store is not None and not self._versions_read:
+            self._versions_read = True
+            try:
+                with TIMINGS.span("controller_versions"):
+                    self.versions = self._controller_versions()
+            except Exception as err:
+                self.notify(describe_versions_error(err))
+        return error
+
+    def _controller_versions(self) -> str:
+        if "http" == self.transport:
+            from src.pre_commit_jenkinsfile import http_transport
+
+            return http_transport.controller_versions(self.session)
+
+        from src.pre_commit_jenkinsfile import ssh_transport
+
+        return ssh_transport.controller_versions(self.client)
+
+    def _connect_to(self, transport: str) -> Optional[str]:
+        return self._connect_http() if "http" == transport else self._connect_ssh()
+
+    def _choose_transport(self) -> Optional[str]:
+        remembered: Optional[str] = (
+            None
+            if self.transport_store is None
+            else self.transport_store.load(self.name)
+        )
+        if remembered is not None:
+            self.transport = remembered
+            error: Optional[str] = self._connect_to(remembered)
+            if error is None:
+                return None
+            # The remembered transport went down since it was picked, so the other one is tried and
+            # remembered instead
+            self._failed.add(remembered)
+            other: str = "ssh" if "http" == remembered else "http"
+            other_error: Optional[str] = self._connect_to(other)
+            if other_error is not None:
+                self._failed.add(other)
+                return f"{error}\n{other_error}"
+            self.transport = other
+            assert self.transport_store is not None
+            self.transport_store.save(self.name, other)
+            return None
+
+        # A fresh crumb and an SSH login each take a few round trips to the controller, like a
+        # validation does
+        outcomes: Dict[str, Tuple[float, Optional[str]]] = {}
+
+        def probe(transport: str) -> None:
+            started: float = time.perf_counter()
+            error: Optional[str] = (
+                self._connect_http(fresh=True)
+                if "http" == transport
+                else self._connect_ssh()
+            )
+            outcomes[transport] = (time.perf_counter() - started, error)
+
+        with TIMINGS.span("transport_probe"):
+            probes: List[threading.Thread] = [
+                threading.Thread(target=probe, args=(transport,))
+                for transport in ("http", "ssh")
+            ]
+            for thread in probes:
+                thread.start()
+            for thread in probes:
+                thread.join()
+
+        connected: Dict[str, float] = {
+            transport: duration
+            for transport, (duration, error) in outcomes.items()
+            if error is None
+        }
+        if len(connected) == 0:
+            return "\n".join(str(error) for _, error in outcomes.values())
+        self.transport = min(connected, key=lambda transport: connected[transport])
+        self._failed = set(outcomes) - set(connected)
+        if self.transport_store is not None:
+            self.transport_store.save(self.name, self.transport)
+        return None
+
+    def _switch(self, failed: str, reason: str) -> bool:
+        # Returns True when the files should go over self.transport, which is no longer the failed one
+        if not self.auto or (self.deadline is not None and self.deadline.expired):
+            return False
+        with self._lock:
+            if self.transport != failed:
+                # Another worker switched already
+                return True
+            self._failed.add(failed)
+            other: str = "ssh" if "http" == failed else "http"
+            if other in self._failed or self._connect_to(other) is not None:
+                self._failed.add(other)
+                return False
+            self.transport = other
+        self.notify(
+            f"{reason}\nThe remaining files go to {self.name} over {other.upper()}."
+        )
+        if self.transport_store is not None:
+            self.transport_store.save(self.name, other)
+        return True
+
+    def _connect_http(self, fresh: bool = False) -> Optional[str]:
+        # fresh asks the controller for a crumb even when the CrumbStore has one
+        from src.pre_commit_jenkinsfile.session import JenkinsSession
+
+        if self.session is None:
+            self.session = JenkinsSession(
+                self.config.jenkins_url,
+                self.config.jenkins_login,
+                self.config.jenkins_api_token,
+                self.jobs,
+                self.crumb_store,
+                self.deadline,
+            )
+        try:
+            crumb: Optional[str] = (
+                self.session.fetch_crumb() if fresh else self.session.ensure_crumb()
+            )
+        except Exception as err:
+            self.session = None
+            return f"Connection failed:\n{str(err)}"
+        if not crumb:
+            from src.pre_commit_jenkinsfile.http_transport import NO_CRUMB
+
+            error: str = self.session.error
+            self.session = None
+            return f"{error}\n{NO_CRUMB}" if len(error) > 0 else NO_CRUMB
+        return None
+
+    def _connect_ssh(self) -> Optional[str]:
+        from src.pre_commit_jenkinsfile import ssh_transport
+
+        transport = None if self.client is None else self.client.get_transport()
+        if transport is None or not transport.is_active():
+            if self.client is not None:
+                self.client.close()
+            try:
+                self.client = ssh_transport.connect(
+                    self.config.jenkins_hostname,
+                    self.config.jenkins_ssh_port,
+                    None if self.deadline is None else self.deadline.timeout(),
+                )
+            except Exception as err:
+                self.client = None
+                return ssh_transport.describe_error(err)
+        return None
+
+    def validate(self, filename: Path) -> ValidationResult:
+        if self.shared_store is not None and self.versions is not None:
+            return with_shared_store(
+                self._validate_switching, self.shared_store, self.versions
+            )(filename)
+        return self._validate_switching(filename)
+
+    def _validate_switching(self, filename: Path) -> ValidationResult:
+        # Records the transport that delivered the result, which can change during the run
+        transport: str = self.transport
+        try:
+            result: ValidationResult = self._validate(filename, transport)
+        except Exception as err:
+            # A request that was taken back did not fail on the transport
+            if cancelled() or not self._switch(
+                transport, f"Connection failed:\n{str(err)}"
+            ):
+                raise
+            return self._validate_switching(filename)
+        if (
+            not result.is_verdict
+            and not result.overloaded
+            and not cancelled()
+            and self._switch(transport, result.message)
+        ):
+            return self._validate_switching(filename)
+        result.transport = result.transport or transport
+        return result
+
+    def _validate(self, filename: Path, transport: str) -> ValidationResult:
+        if "http" == transport:
+            from src.pre_commit_jenkinsfile.http_transport import http_validate
+
+            with TIMINGS.span("http_validate", "file", file=str(filename)):
+                return http_validate(filename, self.session)
+
+        from src.pre_commit_jenkinsfile.ssh_transport import ssh_validate
+
+        with TIMINGS.span("ssh_validate", "file", file=str(filename)):
+            return ssh_validate(
+                self.client,
+                filename,
+                None if self.deadline is None else self.deadline.timeout(),
+            )
+
+    def close(self) -> None:
+        if self.session is not None:
+            self.session.save_crumb()
+        if self.client is not None:
+            self.client.close()
+
+
+class ControllerPool:
+    # Spreads files over several controllers. Each file goes to the controller expected to finish it
+    # first, judged by its moving average latency and the files it is already working on. A controller
+    # that cannot be reached, or fails without a verdict, is dropped and the file goes to the next one.
+    # With a HealthStore, controllers start from the latency of earlier runs and a controller whose
+    # circuit is open is dropped without being contacted.
+    def __init__(
+        self,
+        controllers: List[Controller],
+        notify: Callable[[str], None] = print,
+        deadline: Optional[Deadline] = None,
+        health: Optional[HealthStore] = None,
+    ):
+        self.controllers: List[Controller] = controllers
+        self.notify: Callable[[str], None] = notify
+        self.deadline: Optional[Deadline] = deadline
+        self.health: Optional[HealthStore] = health
+        # Whether each controller may be contacted, and whether it delivered a verdict, in this round
+        self._allowed: Dict[str, bool] = {}
+        self._answered: Dict[str, bool] = {}
+        self._lock = threading.Lock()
+        if health is not None:
+            for controller in controllers:
+                controller.latency = health.latency(controller.name)
+
+    @property
+    def reachable(self) -> bool:
+        return not all(controller.down for controller in self.controllers)
+
+    def revive(self) -> None:
+        # Gives the controllers that were skipped another chance, e.g. on the next batch of files
+        with self._lock:
+            for controller in self.controllers:
+                controller.down = False
+            self._allowed.clear()
+            self._answered.clear()
+
+    def warm_up(self) -> None:
+        # Connects to every controller in the background. One whose circuit is open is left alone,
+        # and a failure is only reported once a file is sent there.
+        for controller in self.controllers:
+            if self.health is None or not self.health.is_open(controller.name):
+                controller.warm_up()
+
+    def _circuit_closed(self, controller: Controller) -> bool:
+        # Asks the HealthStore once per round, since asking may claim the probe
+        if self.health is None:
+            return True
+        with self._lock:
+            if controller.name not in self._allowed:
+                self._allowed[controller.name] = self.health.allow(controller.name)
+            return self._allowed[controller.name]
+
+    def _record(self, controller: Controller, answered: bool) -> None:
+        # Writes the health of each controller once per round, plus its latency on close()
+        if self.health is None:
+            return
+        with self._lock:
+            if controller.name in self._answered:
+                return
+            self._answered[controller.name] = answered
+        if answered:
+            self.health.success(controller.name, controller.latency)
+        else:
+            self.health.failure(controller.name)
+
+    def _pick(self, tried: List[Controller]) -> Optional[Controller]:
+        with self._lock:
+            available: List[Controller] = [
+                controller
+                for controller in self.controllers
+                if not controller.down and controller not in tried
+            ]
+            if len(available) == 0:
+                return None
+            # Controllers that have not been measured yet have a latency of 0, so each is tried early
+            chosen: Controller = min(
+                available,
+                key=lambda controller: (
+                    (controller.in_flight + 1) * controller.latency,
+                    controller.in_flight,
+                ),
+            )
+            chosen.in_flight += 1
+            return chosen
+
+    def _release(self, controller: Controller, duration: Optional[float]) -> bool:
+        # A duration of None marks the controller as down. Returns True if it was not down already.
+        with self._lock:
+            controller.in_flight -= 1
+            if duration is None:
+                was_up: bool = not controller.down
+                controller.down = True
+                return was_up
+            elif 0.0 == controller.latency:
+                controller.latency = duration
+            else:
+                controller.latency += LATENCY_SMOOTHING * (
+                    duration - controller.latency
+                )
+            return False
+
+    def validate(self, filename: Path) -> ValidationResult:
+        failure: Optional[ValidationResult] = None
+        tried: List[Controller] = []
+        circuit_open: bool = False
+        while True:
+            # Past the deadline nothing is sent, and a request that ran out of time does not make its
+            # controller look down
+            if self.deadline is not None and self.deadline.expired:
+                return self.deadline.result(filename)
+            if cancelled():
+                return ValidationResult(
+                    filename,
+                    ErrorCodes.FAIL,
+                    "The request was taken back, since another one answered first.",
+                    is_verdict=False,
+                )
+            controller: Optional[Controller] = self._pick(tried)
+            if controller is None:
+                if failure is None and circuit_open:
+                    assert self.health is not None
+                    return self.health.result(filename)
+                return failure or ValidationResult(
+                    filename,
+                    ErrorCodes.FAIL,
+                    "None of the Jenkins controllers could be reached.",
+                    is_verdict=False,
+                )
+
+            if not self._circuit_closed(controller):
+                circuit_open = True
+                if self._release(controller, None):
+                    assert self.health is not None
+                    self.notify(self.health.skipped(controller.name))
+                continue
+
+            error: Optional[str] = controller.connect()
+            if error is None:
+                started: float = time.perf_counter()
+                try:
+                    result: ValidationResult = controller.validate(filename)
+                except Exception as err:
+                    error = f"Connection failed:\n{str(err)}"
+                else:
+                    # The channel of a request that was taken back was closed before the verdict
+                    if result.is_verdict and not cancelled():
+                        self._release(controller, time.perf_counter() - started)
+                        self._record(controller, True)
+                        result.transport = result.transport or controller.transport
+                        return result
+                    if result.overloaded:
+                        # A busy controller is not down; the file goes elsewhere this time and a
+                        # limiter, if there is one, backs off when no controller has room
+                        self._release(controller, time.perf_counter() - started)
+                        tried.append(controller)
+                        failure = result
+                        continue
+                    error = result.message
+
+            if cancelled() or (self.deadline is not None and self.deadline.expired):
+                # Leaves the controller up and its moving average as it was
+                self._release(controller, controller.latency)
+                continue
+            if self._release(controller, None):
+                self._record(controller, False)
+                self.notify(
+                    f"{error}\nThe Jenkins controller {controller.name} is skipped."
+                )
+            failure = ValidationResult(filename, ErrorCodes.FAIL, error, False)
+
+    def close(self) -> None:
+        for controller in self.controllers:
+            controller.close()
+            if self.health is not None and self._answered.get(controller.name, False):
+                self.health.success(controller.name, controller.latency)
+
+
+def pool_id(configs: List[Config]) -> str:
+    # Any controller in the pool may deliver a verdict, so cached results belong to the pool
+    return "\0".join(sorted(config.controller_id() for config in configs))
@@ -0,0 +1,393 @@
+import argparse
+import json
+import os
+import socket
+import socketserver
+import stat
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from dataclasses import asdict
+from pathlib import Path
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Generator,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Set,
+)
+
+from src.pre_commit_jenkinsfile.cache import ResultCache
+from src.pre_commit_jenkinsfile.config import Config
+from src.pre_commit_jenkinsfile.controllers import Controller
+from src.pre_commit_jenkinsfile.deadline import Deadline
+from src.pre_commit_jenkinsfile.results import (
+    REPORTER,
+    ErrorCodes,
+    ValidationResult,
+    combine_return_codes,
+    report_result,
+)
+from src.pre_commit_jenkinsfile.transport import (
+    resolve_cached,
+    store_result,
+    timed,
+    validate_all,
+)
+
+DEFAULT_IDLE_TIMEOUT: float = 10 * 60
+# The most connections or channels the daemon keeps open to one controller
+MAX_JOBS: int = 16
+START_TIMEOUT: float = 10.0
+PROTOCOL_VERSION: int = 1
+
+
+def is_supported() -> bool:
+    return hasattr(socket, "AF_UNIX")
+
+
+def socket_path() -> Path:
+    # A per-user directory that nobody else can enter, so only this user can talk to the daemon
+    runtime_dir: str = os.environ.get("XDG_RUNTIME_DIR", "")
+    if len(runtime_dir) > 0:
+        daemon_dir = Path(runtime_dir) / "pre-commit-jenkinsfile"
+    else:
+        daemon_dir = (
+            Path(tempfile.gettempdir()) / f"pre-commit-jenkinsfile-{os.getuid()}"
+        )
+    return daemon_dir / "daemon.sock"
+
+
+def is_private(path: Path, is_kind: Callable[[int], bool]) -> bool:
+    # Whether path is of the expected kind, belongs to this user and is closed to everyone else. The
+    # fallback directory lives in the shared temporary directory, where another user could have created
+    # it first, and each request carries the API token.
+    try:
+        path_stat: os.stat_result = os.lstat(path)
+    except OSError:
+        return False
+    return (
+        is_kind(path_stat.st_mode)
+        and path_stat.st_uid == os.getuid()
+        and 0 == path_stat.st_mode & 0o077
+    )
+
+
+def _result_to_dict(result: ValidationResult) -> Dict[str, Any]:
+    return {
+        "filename": str(result.filename),
+        "return_code": int(result.return_code),
+        "message": result.message,
+        "is_verdict": result.is_verdict,
+        "transport": result.transport,
+        "duration": result.duration,
+    }
+
+
+def _result_from_dict(entry: Dict[str, Any]) -> ValidationResult:
+    return ValidationResult(
+        Path(entry["filename"]),
+        ErrorCodes(entry["return_code"]),
+        entry["message"],
+        entry["is_verdict"],
+        entry.get("transport", ""),
+        entry.get("duration", 0.0),
+    )
+
+
+class DaemonServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path: Path, idle_timeout: float = DEFAULT_IDLE_TIMEOUT):
+        self.path: Path = path
+        self.idle_timeout: float = idle_timeout
+        self.controllers: Dict[str, Controller] = {}
+        self.controllers_lock = threading.Lock()
+        self.active: int = 0
+        self.last_activity: float = time.monotonic()
+        if not is_private(path.parent, stat.S_ISDIR):
+            raise PermissionError(
+                f"{path.parent} must belong to the current user and be closed to everyone else."
+            )
+        # The socket is created without access for others, not just restricted after the fact
+        umask: int = os.umask(0o077)
+        try:
+            super().__init__(str(path), DaemonRequestHandler)
+        finally:
+            os.umask(umask)
+        os.chmod(path, 0o600)
+
+    def controller(self, config: Config) -> Controller:
+        # Controllers are keyed by everything that identifies the controller and the account on it
+        key: str = json.dumps(asdict(config), sort_keys=True)
+        with self.controllers_lock:
+            if key not in self.controllers:
+                self.controllers[key] = Controller(config, MAX_JOBS)
+            return self.controllers[key]
+
+    def touch(self, delta: int) -> None:
+        with self.controllers_lock:
+            self.active += delta
+            self.last_activity = time.monotonic()
+
+    def watch_idle(self) -> None:
+        while True:
+            time.sleep(min(1.0, self.idle_timeout))
+            with self.controllers_lock:
+                idle: bool = (
+                    0 == self.active
+                    and time.monotonic() - self.last_activity > self.idle_timeout
+                )
+            if idle:
+                self.shutdown()
+                return
+
+    def serve(self) -> None:
+        threading.Thread(target=self.watch_idle, daemon=True).start()
+        try:
+            self.serve_forever()
+        finally:
+            self.server_close()
+            self.path.unlink(missing_ok=True)
+            for controller in self.controllers.values():
+                controller.close()
+
+
+class DaemonRequestHandler(socketserver.StreamRequestHandler):
+    server: DaemonServer
+
+    def handle(self) -> None:
+        self.server.touch(1)
+        try:
+            request: Dict[str, Any] = json.loads(self.rfile.readline())
+            if request.get("version") != PROTOCOL_VERSION:
+                self.send({"error": "Unsupported protocol version"})
+                return
+
+            config = Config(**request["config"])
+            jobs: int = min(MAX_JOBS, max(1, int(request.get("jobs", 1))))
+            filenames: List[Path] = [Path(filename) for filename in request["files"]]
+            in_order: bool = bool(request.get("in_order", True))
+            results: Generator[ValidationResult, None, None] = self.validate(
+                config, filenames, jobs, in_order
+            )
+            for result in results:
+                # The client hangs up once it has seen enough, e.g. after a failure with --fail-fast
+                if not self.send({"result": _result_to_dict(result)}):
+                    break
+            else:
+                self.send({"done": True})
+            results.close()
+        except Exception as err:
+            self.send({"error": str(err)})
+        finally:
+            self.server.touch(-1)
+
+    def validate(
+        self, config: Config, filenames: List[Path], jobs: int, in_order: bool
+    ) -> Generator[ValidationResult, None, None]:
+        controller: Controller = self.server.controller(config)
+        error: Optional[str] = controller.connect()
+        if error is not None:
+            yield ValidationResult(Path(), ErrorCodes.FAIL, error, is_verdict=False)
+            return
+
+        yield from validate_all(
+            timed(controller.validate, controller.transport), filenames, jobs, in_order
+        )
+
+    def send(self, message: Dict[str, Any]) -> bool:
+        try:
+            self.wfile.write(json.dumps(message).encode() + b"\n")
+            self.wfile.flush()
+        except OSError:
+            return False
+        return True
+
+
+def _connect(path: Path) -> Optional[socket.socket]:
+    # Only a socket of this user's own daemon gets to see the config
+    if not is_private(path.parent, stat.S_ISDIR) or not is_private(path, stat.S_ISSOCK):
+        return None
+    client_socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        client_socket.connect(str(path))
+    except OSError:
+        client_socket.close()
+        return None
+    return client_socket
+
+
+def _start_daemon(path: Path, idle_timeout: float) -> None:
+    # The daemon must find this package the same way the hook did
+    root_dir: str = str(Path(__file__).resolve().parents[2])
+    environment: Dict[str, str] = dict(os.environ)
+    environment["PYTHONPATH"] = os.pathsep.join(
+        [root_dir] + [entry for entry in [environment.get("PYTHONPATH", "")] if entry]
+    )
+    subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "src.pre_commit_jenkinsfile.daemon",
+            "--socket",
+            str(path),
+            "--idle-timeout",
+            str(idle_timeout),
+        ],
+        env=environment,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True,
+    )
+
+
+def connect_or_start(
+    path: Path, idle_timeout: float = DEFAULT_IDLE_TIMEOUT
+) -> Optional[socket.socket]:
+    client_socket: Optional[socket.socket] = _connect(path)
+    if client_socket is not None:
+        return client_socket
+
+    _start_daemon(path, idle_timeout)
+    deadline: float = time.monotonic() + START_TIMEOUT
+    while time.monotonic() < deadline:
+        time.sleep(0.02)
+        client_socket = _connect(path)
+        if client_socket is not None:
+            return client_socket
+    return None
+
+
+def _lines(
+    client_socket: socket.socket, stream: Any, deadline: Optional[Deadline]
+) -> Iterator[Optional[bytes]]:
+    # Yields None once the deadline has passed
+    while True:
+        if deadline is not None:
+            client_socket.settimeout(deadline.timeout())
+        try:
+            line: bytes = stream.readline()
+        except socket.timeout:
+            yield None
+            return
+        if len(line) == 0:
+            return
+        yield line
+
+
+def lint_via_daemon(
+    filenames: Iterable[Path],
+    config: Config,
+    cache: Optional[ResultCache] = None,
+    jobs: int = 1,
+    idle_timeout: float = DEFAULT_IDLE_TIMEOUT,
+    path: Optional[Path] = None,
+    deadline: Optional[Deadline] = None,
+) -> Optional[ErrorCodes]:
+    # Returns None when no daemon could be reached, so the caller can lint in process instead. The
+    # files are only read once the daemon answers, so they are still there for the caller then.
+    client_socket = connect_or_start(path or socket_path(), idle_timeout)
+    if client_socket is None:
+        print("Could not reach the lint daemon, linting without it.")
+        return None
+
+    return_codes: List[ErrorCodes] = []
+    pending: Dict[Path, str] = dict(
+        resolve_cached(filenames, config.controller_id(), cache, return_codes)
+    )
+    if len(pending) == 0:
+        client_socket.close()
+        return combine_return_codes(return_codes)
+
+    request: Dict[str, Any] = {
+        "version": PROTOCOL_VERSION,
+        "config": asdict(config),
+        "jobs": jobs,
+        "in_order": REPORTER.in_order,
+        "files": [str(filename.resolve()) for filename in pending],
+    }
+    # The daemon reports absolute paths, which are mapped back to the names given on the command line
+    names: Dict[str, Path] = {str(filename.resolve()): filename for filename in pending}
+    done: bool = False
+    reported: Set[Path] = set()
+    with client_socket, client_socket.makefile("rwb") as stream:
+        stream.write(json.dumps(request).encode() + b"\n")
+        stream.flush()
+        for line in _lines(client_socket, stream, deadline):
+            if line is None:
+                # Out of time; hanging up tells the daemon to stop validating
+                assert deadline is not None
+                for filename in pending:
+                    if filename not in reported:
+                        expired: ValidationResult = deadline.result(filename)
+                        report_result(expired)
+                        return_codes.append(expired.return_code)
+                done = True
+                break
+            message: Dict[str, Any] = json.loads(line)
+            if "result" in message:
+                result: ValidationResult = _result_from_dict(message["result"])
+                result.filename = names.get(str(result.filename), result.filename)
+                reported.add(result.filename)
+                report_result(result)
+                store_result(result, pending.get(result.filename, ""), cache)
+                return_codes.append(result.return_code)
+                if REPORTER.stopped:
+                    done = True
+                    break
+                continue
+            if "error" in message:
+                print(f"The lint daemon failed:\n{message['error']}")
+                return_codes.append(ErrorCodes.FAIL)
+            done = True
+            break
+
+    if not done:
+        print("The lint daemon stopped before all files were validated.")
+        return_codes.append(ErrorCodes.FAIL)
+    return combine_return_codes(return_codes)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--socket", action="store", type=str, default="")
+    parser.add_argument(
+        "--idle-timeout", action="store", type=float, default=DEFAULT_IDLE_TIMEOUT
+    )
+    args = parser.parse_args(argv)
+
+    path: Path = Path(args.socket) if len(args.socket) > 0 else socket_path()
+    umask: int = os.umask(0o077)
+    try:
+        path.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+        if not is_private(path.parent, stat.S_ISDIR):
+            # Someone else created the directory, or opened it up
+            return 1
+
+        # Several hooks may start a daemon at the same moment; the lock lets exactly one of them serve
+        import fcntl
+
+        lock_file = open(path.with_suffix(".lock"), "w")
+    finally:
+        os.umask(umask)
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        return 0
+
+    path.unlink(missing_ok=True)
+    DaemonServer(path, args.idle_timeout).serve()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
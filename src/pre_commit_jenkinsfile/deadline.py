@@ -0,0 +1,48 @@
+import time
+from pathlib import Path
+from typing import Iterable, List
+
+from src.pre_commit_jenkinsfile.results import ErrorCodes, ValidationResult
+
+DEADLINE_POLICIES = ("fail-closed", "fail-open")
+# A socket timeout of 0 would make it non-blocking rather than expire at once
+MIN_TIMEOUT: float = 0.01
+
+
+class Deadline:
+    # A wall-clock budget for the whole run. Every step that can block, from connecting to waiting for
+    # a verdict, waits at most for the time that is left, and files not sent by then are not sent at
+    # all. Whether those files pass or fail is up to the policy.
+    def __init__(self, seconds: float, fail_open: bool = False):
+        self.expires: float = time.monotonic() + seconds
+        self.fail_open: bool = fail_open
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() <= 0.0
+
+    def timeout(self) -> float:
+        return max(MIN_TIMEOUT, self.remaining())
+
+    def result(self, filename: Path) -> ValidationResult:
+        return ValidationResult(
+            filename,
+            ErrorCodes.OK if self.fail_open else ErrorCodes.FAIL,
+            f'The file "{str(filename)}" was not validated before the deadline.',
+            is_verdict=False,
+            transport="deadline",
+        )
+
+
+def most_recent_first(filenames: Iterable[Path]) -> List[Path]:
+    # The files just edited are the likeliest to be broken, so they get the budget first
+    def modified(filename: Path) -> float:
+        try:
+            return filename.stat().st_mtime
+        except OSError:
+            return 0.0
+
+    return sorted(filenames, key=modified, reverse=True)
@@ -0,0 +1,203 @@
+import os
+import queue
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from fnmatch import fnmatchcase
+from pathlib import Path
+from typing import Iterator, List, NamedTuple, Optional, Sequence
+
+from src.pre_commit_jenkinsfile.git import PIPELINE_PATTERN
+
+DISCOVERY_JOBS: int = 8
+# Directories that hold dependencies or tool state rather than pipelines of this repository
+PRUNED_DIRECTORIES = (
+    ".git",
+    ".hg",
+    ".svn",
+    ".tox",
+    ".venv",
+    "__pycache__",
+    "bower_components",
+    "node_modules",
+    "third_party",
+    "vendor",
+    "venv",
+)
+
+
+class IgnoreRule(NamedTuple):
+    # A .gitignore pattern, matched against paths relative to the directory of its file. base is that
+    # directory with a trailing separator, so the relative path is whatever follows it.
+    base: str
+    pattern: "re.Pattern[str]"
+    negated: bool
+    directory_only: bool
+
+
+def translate(pattern: str) -> str:
+    # Translates the glob syntax of .gitignore into a regular expression
+    parts: List[str] = []
+    index: int = 0
+    while index < len(pattern):
+        if pattern.startswith("**/", index):
+            parts.append("(?:.*/)?")
+            index += 3
+        elif pattern.startswith("/**", index) and index + 3 == len(pattern):
+            parts.append("/.*")
+            index += 3
+        elif pattern.startswith("**", index):
+            parts.append(".*")
+            index += 2
+        elif "*" == pattern[index]:
+            parts.append("[^/]*")
+            index += 1
+        elif "?" == pattern[index]:
+            parts.append("[^/]")
+            index += 1
+        elif "[" == pattern[index] and "]" in pattern[index + 2 :]:
+            end: int = pattern.index("]", index + 2)
+            body: str = pattern[index + 1 : end]
+            if body.startswith("!"):
+                body = "^" + body[1:]
+            parts.append(f"[{body}]")
+            index = end + 1
+        elif "\\" == pattern[index] and index + 1 < len(pattern):
+            parts.append(re.escape(pattern[index + 1]))
+            index += 2
+        else:
+            parts.append(re.escape(pattern[index]))
+            index += 1
+    return "".join(parts)
+
+
+def parse_gitignore(text: str, directory: str) -> List[IgnoreRule]:
+    base: str = directory if directory.endswith(os.sep) else directory + os.sep
+    rules: List[IgnoreRule] = []
+    for line in text.splitlines():
+        line = line.rstrip()
+        if len(line) == 0 or line.startswith("#"):
+            continue
+
+        negated: bool = line.startswith("!")
+        if negated:
+            line = line[1:]
+        directory_only: bool = line.endswith("/")
+        line = line.rstrip("/")
+        if len(line) == 0:
+            continue
+
+        # A slash anywhere but at the end anchors the pattern to the directory of the .gitignore file
+        if "/" in line:
+            expression = translate(line.lstrip("/"))
+        else:
+            expression = "(?:.*/)?" + translate(line)
+        rules.append(
+            IgnoreRule(base, re.compile(expression + r"\Z"), negated, directory_only)
+        )
+    return rules
+
+
+def is_ignored(rules: Sequence[IgnoreRule], path: str, is_directory: bool) -> bool:
+    # The last matching rule wins, and rules from deeper .gitignore files come later
+    ignored: bool = False
+    for rule in rules:
+        if rule.directory_only and not is_directory:
+            continue
+        if rule.pattern.match(path[len(rule.base) :].replace(os.sep, "/")):
+            ignored = not rule.negated
+    return ignored
+
+
+def _load_rules(directory: str, filename: str) -> List[IgnoreRule]:
+    try:
+        with open(os.path.join(directory, filename), encoding="utf-8") as ignore_file:
+            return parse_gitignore(ignore_file.read(), directory)
+    except (OSError, UnicodeDecodeError):
+        return []
+
+
+def is_pipeline(name: str, globs: Sequence[str]) -> bool:
+    return PIPELINE_PATTERN.match(name) is not None or any(
+        fnmatchcase(name, glob) for glob in globs
+    )
+
+
+class _Walker:
+    # Scans directories on a thread pool. Every scan queues the pipelines it finds and schedules its
+    # subdirectories; the last scan to finish queues None to end the stream.
+    def __init__(
+        self, globs: Sequence[str], pruned: Sequence[str], executor: ThreadPoolExecutor
+    ):
+        self.globs: Sequence[str] = globs
+        self.pruned: Sequence[str] = pruned
+        self.executor: ThreadPoolExecutor = executor
+        self.found: "queue.Queue[Optional[Path]]" = queue.Queue()
+        self.pending: int = 0
+        self.stopped = threading.Event()
+        self._lock = threading.Lock()
+
+    def submit(self, directory: str, rules: List[IgnoreRule]) -> None:
+        with self._lock:
+            self.pending += 1
+        try:
+            self.executor.submit(self.scan, directory, rules)
+        except RuntimeError:
+            # The stream was closed, which shuts the executor down
+            with self._lock:
+                self.pending -= 1
+
+    def scan(self, directory: str, rules: List[IgnoreRule]) -> None:
+        try:
+            if not self.stopped.is_set():
+                self._scan(directory, rules + _load_rules(directory, ".gitignore"))
+        finally:
+            with self._lock:
+                self.pending -= 1
+                if 0 == self.pending:
+                    self.found.put(None)
+
+    def _scan(self, directory: str, rules: List[IgnoreRule]) -> None:
+        try:
+            entries = list(os.scandir(directory))
+        except OSError:
+            return
+
+        for entry in entries:
+            try:
+                # Symbolic links to directories are not followed, so a link cycle cannot trap the walk
+                is_directory: bool = entry.is_dir(follow_symlinks=False)
+                if is_directory and entry.name in self.pruned:
+                    continue
+                if is_ignored(rules, entry.path, is_directory):
+                    continue
+                if is_directory:
+                    self.submit(entry.path, rules)
+                elif is_pipeline(entry.name, self.globs) and entry.is_file():
+                    self.found.put(Path(entry.path))
+            except OSError:
+                continue
+
+
+def discover(
+    root: Path,
+    globs: Sequence[str] = (),
+    pruned: Sequence[str] = PRUNED_DIRECTORIES,
+    jobs: int = DISCOVERY_JOBS,
+) -> Iterator[Path]:
+    # Yields the pipelines under root as they are found, in no particular order, so validation can start
+    # before the walk is over. Files and directories ignored by git are skipped.
+    executor = ThreadPoolExecutor(max_workers=jobs)
+    walker = _Walker(globs, pruned, executor)
+    walker.submit(
+        str(root), _load_rules(str(root), os.path.join(".git", "info", "exclude"))
+    )
+    try:
+        while True:
+            filename: Optional[Path] = walker.found.get()
+            if filename is None:
+                return
+            yield filename
+    finally:
+        walker.stopped.set()
+        executor.shutdown(wait=False)
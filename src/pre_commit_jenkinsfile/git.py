@@ -0,0 +1,74 @@
+import os
+import re
+import subprocess
+from pathlib import Path
+from typing import List, Optional, Set
+
+# The same names the hook is registered for in .pre-commit-hooks.yaml
+PIPELINE_PATTERN = re.compile(r"^[Jj]enkins[fF]ile")
+
+
+class GitError(Exception):
+    pass
+
+
+def _git(*args: str) -> str:
+    try:
+        completed = subprocess.run(
+            ["git", *args],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            check=True,
+        )
+    except FileNotFoundError:
+        raise GitError("git is not installed or is not on the PATH")
+    except subprocess.CalledProcessError as err:
+        raise GitError(f"git {' '.join(args)} failed:\n{err.stderr.decode().strip()}")
+    return completed.stdout.decode()
+
+
+def changed_paths(ref: str) -> Set[Path]:
+    # Every file that differs between the merge base of ref and the working tree. git tells files
+    # apart by their blob ids, and only hashes working tree files whose stat information no longer
+    # matches its index, so unchanged files are never read.
+    top_level = Path(_git("rev-parse", "--show-toplevel").strip())
+    try:
+        base: str = _git("merge-base", ref, "HEAD").strip()
+    except GitError:
+        # Unrelated histories, or no commits yet on HEAD
+        base = _git("rev-parse", "--verify", f"{ref}^{{commit}}").strip()
+
+    changed: Set[Path] = set()
+    # -z output is ":<old mode> <new mode> <old id> <new id> <status>\0<path>\0" per file
+    fields: List[str] = _git("diff", "--raw", "-z", "--no-renames", base).split("\0")
+    for header, path in zip(fields[0::2], fields[1::2]):
+        if not header.endswith(" D"):
+            changed.add(top_level / path)
+
+    untracked: str = _git(
+        "ls-files",
+        "-z",
+        "--others",
+        "--exclude-standard",
+        "--full-name",
+        str(top_level),
+    )
+    for path in filter(None, untracked.split("\0")):
+        changed.add(top_level / path)
+
+    return changed
+
+
+def changed_since(ref: str, filenames: Optional[List[Path]] = None) -> List[Path]:
+    # Returns the given files that changed since ref, keeping the names they were given by. Without
+    # filenames, every changed pipeline file in the repository is returned relative to the current
+    # directory. An empty list of filenames stays empty.
+    changed: Set[Path] = changed_paths(ref)
+    if filenames is not None:
+        return [filename for filename in filenames if filename.resolve() in changed]
+
+    return sorted(
+        Path(os.path.relpath(path))
+        for path in changed
+        if PIPELINE_PATTERN.match(path.name)
+    )
@@ -0,0 +1,102 @@
+import hashlib
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict
+
+from src.pre_commit_jenkinsfile.results import ErrorCodes, ValidationResult
+
+CIRCUIT_POLICIES = ("fail-closed", "fail-open")
+DEFAULT_FAILURE_THRESHOLD: int = 3
+# Seconds until the first probe once the circuit opened, doubled after every failed probe
+PROBE_BACKOFF: float = 30.0
+MAX_PROBE_BACKOFF: float = 15 * 60
+
+
+class HealthStore:
+    # Remembers across runs how each controller fared: its failures in a row and its moving average
+    # validation time. After threshold failures in a row the circuit opens, and runs skip the controller
+    # without touching the network until the probe time. The first run after that probes it again; it
+    # moves the probe time on first, so runs started meanwhile keep skipping. A failed probe doubles the
+    # wait, any verdict closes the circuit.
+    def __init__(
+        self,
+        cache_dir: Path,
+        threshold: int = DEFAULT_FAILURE_THRESHOLD,
+        fail_open: bool = False,
+    ):
+        self.store_dir: Path = cache_dir / "health"
+        self.threshold: int = threshold
+        self.fail_open: bool = fail_open
+
+    def _entry_path(self, controller_id: str) -> Path:
+        key: str = hashlib.sha256(controller_id.encode()).hexdigest()
+        return self.store_dir / f"{key}.json"
+
+    def load(self, controller_id: str) -> Dict[str, Any]:
+        try:
+            return json.loads(self._entry_path(controller_id).read_text())
+        except (OSError, ValueError):
+            return {}
+
+    def _save(self, controller_id: str, entry: Dict[str, Any]) -> None:
+        try:
+            self.store_dir.mkdir(parents=True, exist_ok=True)
+            file_descriptor, temp_name = tempfile.mkstemp(
+                dir=self.store_dir, suffix=".tmp"
+            )
+            with os.fdopen(file_descriptor, "w") as temp_file:
+                json.dump(entry, temp_file)
+            os.replace(temp_name, self._entry_path(controller_id))
+        except OSError as err:
+            print(
+                f"Could not save the controller health to {self.store_dir}:\n{str(err)}"
+            )
+
+    def _backoff(self, failures: int) -> float:
+        return min(MAX_PROBE_BACKOFF, PROBE_BACKOFF * 2 ** (failures - self.threshold))
+
+    def is_open(self, controller_id: str) -> bool:
+        return self.load(controller_id).get("retry_at", 0.0) > time.time()
+
+    def allow(self, controller_id: str) -> bool:
+        # Returns False while the circuit is open. Once the probe is due, the caller is the probe.
+        entry: Dict[str, Any] = self.load(controller_id)
+        if entry.get("failures", 0) < self.threshold:
+            return True
+        if entry.get("retry_at", 0.0) > time.time():
+            return False
+        entry["retry_at"] = time.time() + self._backoff(entry["failures"])
+        self._save(controller_id, entry)
+        return True
+
+    def latency(self, controller_id: str) -> float:
+        return self.load(controller_id).get("latency", 0.0)
+
+    def success(self, controller_id: str, latency: float) -> None:
+        self._save(controller_id, {"failures": 0, "latency": latency})
+
+    def failure(self, controller_id: str) -> None:
+        entry: Dict[str, Any] = self.load(controller_id)
+        entry["failures"] = entry.get("failures", 0) + 1
+        if entry["failures"] >= self.threshold:
+            entry["retry_at"] = time.time() + self._backoff(entry["failures"])
+        self._save(controller_id, entry)
+
+    def skipped(self, controller_id: str) -> str:
+        retry_at: float = self.load(controller_id).get("retry_at", 0.0)
+        return (
+            f"The Jenkins controller {controller_id} could not be reached on recent runs and is skipped "
+            f"until {time.strftime('%H:%M:%S', time.localtime(retry_at))}."
+        )
+
+    def result(self, filename: Path) -> ValidationResult:
+        return ValidationResult(
+            filename,
+            ErrorCodes.OK if self.fail_open else ErrorCodes.FAIL,
+            f'The file "{str(filename)}" was not validated while the Jenkins controllers are skipped.',
+            is_verdict=False,
+            transport="circuit",
+        )
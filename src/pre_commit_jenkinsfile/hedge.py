@@ -0,0 +1,193 @@
+import queue
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Deque, Iterator, List, Optional, Tuple
+
+from src.pre_commit_jenkinsfile.limiter import AdaptiveLimiter
+from src.pre_commit_jenkinsfile.results import ValidationResult
+
+# A request is sent again once it took longer than this share of the recent requests did
+HEDGE_QUANTILE: float = 0.9
+# Until that many requests came back, the quantile is a guess and DEFAULT_HEDGE_DELAY is used instead
+MIN_SAMPLES: int = 10
+DEFAULT_HEDGE_DELAY: float = 1.0
+SAMPLE_WINDOW: int = 200
+
+Answer = Tuple[int, Optional[ValidationResult], Optional[BaseException]]
+
+# The Cancel of the request made on this thread, if it can be taken back
+_current = threading.local()
+
+
+class Cancel:
+    # Takes back a request that is no longer needed. While a transport waits on its connection or
+    # channel, it registers how to stop waiting there, e.g. by closing the channel, and cancel() runs
+    # that, or runs it as soon as it is registered.
+    def __init__(self):
+        self.cancelled: bool = False
+        self._abort: Optional[Callable[[], None]] = None
+        self._lock = threading.Lock()
+
+    def cancel(self) -> None:
+        with self._lock:
+            self.cancelled = True
+            abort, self._abort = self._abort, None
+        if abort is not None:
+            abort()
+
+    def _register(self, abort: Optional[Callable[[], None]]) -> bool:
+        # Returns False when the request was cancelled already
+        with self._lock:
+            self._abort = None if self.cancelled else abort
+            return not self.cancelled
+
+
+@contextmanager
+def cancellable(cancel: Cancel) -> Iterator[None]:
+    # The request made on this thread meanwhile is taken back by cancel
+    _current.cancel = cancel
+    try:
+        yield
+    finally:
+        _current.cancel = None
+
+
+@contextmanager
+def abortable(abort: Callable[[], None]) -> Iterator[None]:
+    # Lets the request made on this thread, if it can be taken back, stop waiting with abort
+    cancel: Optional[Cancel] = getattr(_current, "cancel", None)
+    if cancel is None:
+        yield
+        return
+    if not cancel._register(abort):
+        abort()
+    try:
+        yield
+    finally:
+        cancel._register(None)
+
+
+def cancelled() -> bool:
+    # Whether the request made on this thread was taken back, so its failure says nothing about the
+    # controller
+    cancel: Optional[Cancel] = getattr(_current, "cancel", None)
+    return cancel is not None and cancel.cancelled
+
+
+class Hedger:
+    # Decides when a slow request is sent a second time. The delay is the HEDGE_QUANTILE of the time the
+    # recent verdicts took, so only the slowest tenth of the requests are hedged, and at most max_rate
+    # of all requests, plus one, are sent twice, so a controller that is slow across the board does not
+    # get twice the load.
+    def __init__(self, max_rate: float, initial_delay: float = DEFAULT_HEDGE_DELAY):
+        self.max_rate: float = max_rate
+        self.initial_delay: float = initial_delay
+        self.requests: int = 0
+        self.hedges: int = 0
+        # Hedges that answered before the request they backed up
+        self.won: int = 0
+        self._samples: Deque[float] = deque(maxlen=SAMPLE_WINDOW)
+        self._lock = threading.Lock()
+
+    def delay(self) -> float:
+        # Called once per request before it is sent
+        with self._lock:
+            self.requests += 1
+            if len(self._samples) < MIN_SAMPLES:
+                return self.initial_delay
+            ordered = sorted(self._samples)
+            return ordered[min(len(ordered) - 1, int(HEDGE_QUANTILE * len(ordered)))]
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.hedges >= self.max_rate * self.requests + 1:
+                return False
+            self.hedges += 1
+            return True
+
+    def record(self, duration: float) -> None:
+        with self._lock:
+            self._samples.append(duration)
+
+    def hedge_won(self) -> None:
+        with self._lock:
+            self.won += 1
+
+    def summary(self) -> str:
+        return f"Hedged {self.hedges} of {self.requests} requests, {self.won} of them answered first."
+
+
+def hedged(
+    validate: Callable[[Path], ValidationResult],
+    hedger: Hedger,
+    limiter: Optional[AdaptiveLimiter] = None,
+) -> Callable[[Path], ValidationResult]:
+    # Sends the file again when the first request is slower than most, and returns the verdict that
+    # comes first. The second request gets a connection or channel of its own, or goes to another
+    # controller of a pool. The slower one is then taken back: its SSH channel or HTTP connection is
+    # closed, and its result is dropped. The requests run on daemon threads, so one still waiting for a
+    # controller does not hold up the end of the run. With a limiter, the first request runs in the
+    # caller's slot, and the second is only sent while a slot is free and holds it until it comes back
+    # or is taken back, so hedging never takes the requests in flight above the limit.
+    def run(filename: Path) -> ValidationResult:
+        answers: "queue.Queue[Answer]" = queue.Queue()
+        cancels: List[Cancel] = [Cancel(), Cancel()]
+
+        def attempt(index: int, epoch: Optional[int]) -> None:
+            started: float = time.perf_counter()
+            result: Optional[ValidationResult] = None
+            error: Optional[BaseException] = None
+            try:
+                with cancellable(cancels[index]):
+                    result = validate(filename)
+            except Exception as err:
+                error = err
+            duration: float = time.perf_counter() - started
+            if limiter is not None and epoch is not None:
+                if cancels[index].cancelled:
+                    # A request that was taken back tells nothing about the latency
+                    limiter.abandon()
+                else:
+                    limiter.release(
+                        epoch, duration, result is not None and result.overloaded
+                    )
+            answers.put((index, result, error))
+            if (
+                result is not None
+                and result.is_verdict
+                and not cancels[index].cancelled
+            ):
+                hedger.record(duration)
+
+        threading.Thread(target=attempt, args=(0, None), daemon=True).start()
+        sent: int = 1
+        try:
+            answer: Answer = answers.get(timeout=hedger.delay())
+        except queue.Empty:
+            epoch: Optional[int] = None if limiter is None else limiter.try_acquire()
+            if (limiter is None or epoch is not None) and hedger.allow():
+                threading.Thread(target=attempt, args=(1, epoch), daemon=True).start()
+                sent = 2
+            elif limiter is not None and epoch is not None:
+                limiter.abandon()
+            answer = answers.get()
+
+        # An answer without a verdict waits for the other request, if there is one
+        if 2 == sent and (answer[1] is None or not answer[1].is_verdict):
+            other: Answer = answers.get()
+            if other[1] is not None and other[1].is_verdict:
+                answer = other
+        index, result, error = answer
+        if 2 == sent:
+            cancels[1 - index].cancel()
+        if error is not None:
+            raise error
+        assert result is not None
+        if 1 == index:
+            hedger.hedge_won()
+        return result
+
+    return run
@@ -0,0 +1,126 @@
+import json
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, Optional
+
+from urllib3 import HTTPResponse
+from urllib3.filepost import choose_boundary
+
+from src.pre_commit_jenkinsfile.cache import ResultCache
+from src.pre_commit_jenkinsfile.config import Config
+from src.pre_commit_jenkinsfile.limiter import AdaptiveLimiter
+from src.pre_commit_jenkinsfile.results import ErrorCodes, ValidationResult
+from src.pre_commit_jenkinsfile.session import CrumbStore, JenkinsSession
+from src.pre_commit_jenkinsfile.shared_store import (
+    LINTER_PLUGIN,
+    SharedStore,
+    versions_id,
+)
+from src.pre_commit_jenkinsfile.transport import iter_chunks
+
+
+NO_CRUMB: str = "No crumb was returned by the Jenkins server and so we cannot lint."
+
+
+def get_jenkins_crumb(
+    jenkins_url: str, jenkins_login: str, jenkins_api_token: str
+) -> Optional[str]:
+    session = JenkinsSession(jenkins_url, jenkins_login, jenkins_api_token)
+    crumb: Optional[str] = session.fetch_crumb()
+    if not crumb:
+        print(session.error)
+    return crumb
+
+
+def lint_via_http(
+    filenames: Iterable[Path],
+    jenkins_url: str,
+    jenkins_login: str,
+    jenkins_api_token: str,
+    cache: Optional[ResultCache] = None,
+    jobs: int = 1,
+    crumb_store: Optional[CrumbStore] = None,
+    limiter: Optional[AdaptiveLimiter] = None,
+    shared_store: Optional[SharedStore] = None,
+) -> ErrorCodes:
+    # Validates and reports the files like the hook does with --transport http. The Linter and the
+    # hook import this module, so they are only imported here.
+    from src.pre_commit_jenkinsfile.lint_jenkinsfile import report_all
+    from src.pre_commit_jenkinsfile.linter import Linter
+
+    config = Config(
+        jenkins_url=jenkins_url,
+        jenkins_login=jenkins_login,
+        jenkins_api_token=jenkins_api_token,
+    )
+    with Linter(
+        config,
+        cache,
+        jobs,
+        limiter,
+        crumb_store,
+        shared_store,
+        offline_check=False,
+        notify=print,
+        transport="http",
+    ) as linter:
+        return report_all(linter, filenames)
+
+
+def controller_versions(session: JenkinsSession) -> str:
+    # The Jenkins version comes with every response; the plugin list needs Overall/Read permission
+    response: HTTPResponse = session.request(
+        "GET", "/pluginManager/api/json?tree=plugins[shortName,version]"
+    )
+    jenkins_version: Optional[str] = response.headers.get("X-Jenkins")
+    if response.status != 200 or not jenkins_version:
+        raise ValueError(f"A status code of {response.status} was returned.")
+    for plugin in json.loads(response.data)["plugins"]:
+        if LINTER_PLUGIN == plugin["shortName"]:
+            return versions_id(jenkins_version, plugin["version"])
+    raise ValueError(f"The {LINTER_PLUGIN} plugin is not installed.")
+
+
+class MultipartBody:
+    # A multipart/form-data body with the file as its only field. It is read from disk while it is
+    # sent, and can be iterated again when the request is repeated, e.g. with a fresh crumb.
+    def __init__(self, filename: Path, field: str):
+        self.filename: Path = filename
+        self.boundary: str = choose_boundary()
+        self._head: bytes = (
+            f"--{self.boundary}\r\n"
+            f'Content-Disposition: form-data; name="{field}"\r\n\r\n'
+        ).encode()
+        self._tail: bytes = f"\r\n--{self.boundary}--\r\n".encode()
+
+    def headers(self) -> Dict[str, str]:
+        length: int = len(self._head) + self.filename.stat().st_size + len(self._tail)
+        return {
+            "Content-Type": f"multipart/form-data; boundary={self.boundary}",
+            "Content-Length": str(length),
+        }
+
+    def __iter__(self) -> Iterator[bytes]:
+        yield self._head
+        yield from iter_chunks(self.filename)
+        yield self._tail
+
+
+def http_validate(filename: Path, session: JenkinsSession) -> ValidationResult:
+
+    body = MultipartBody(filename, "jenkinsfile")
+    response: HTTPResponse = session.post(
+        "/pipeline-model-converter/validate", body=body, headers=body.headers()
+    )
+    message: str = response.data.decode()
+    if response.status == 200:
+        if "Error" in message:
+            return ValidationResult(filename, ErrorCodes.FAIL, message)
+        return ValidationResult(filename, ErrorCodes.OK, message)
+
+    return ValidationResult(
+        filename,
+        ErrorCodes.FAIL,
+        f"Connection failed: A status code of {response.status} was returned.",
+        is_verdict=False,
+        overloaded=response.status in (429, 503),
+    )
@@ -0,0 +1,91 @@
+import math
+import threading
+from typing import Optional
+
+# The controller counts as slowed down once the latency of the last few requests is this many times
+# the longer running average. Comparing two averages, rather than single requests against the fastest
+# one, keeps files that are simply bigger or a jittery network from looking like congestion.
+LATENCY_TOLERANCE: float = 2.0
+# Weights of the newest request in the short and the long moving averages
+SHORT_SMOOTHING: float = 0.3
+LONG_SMOOTHING: float = 0.05
+BACKOFF_FACTOR: float = 0.5
+# How often a file is sent again after the controller reported that it is overloaded
+OVERLOAD_RETRIES: int = 3
+# The least time in seconds to wait before the first of those, while no request has come back yet
+RETRY_DELAY: float = 0.01
+
+
+class AdaptiveLimiter:
+    # Additive increase, multiplicative decrease. The limit grows by one after a full limit's worth of
+    # requests came back without slowing down, and is cut by BACKOFF_FACTOR when the latency rises or
+    # the controller reports that it is overloaded. Requests that were already in flight when the limit
+    # was cut do not cut it again.
+    def __init__(self, initial: int, max_limit: int, min_limit: int = 1):
+        self.min_limit: int = min_limit
+        self.max_limit: int = max(min_limit, max_limit)
+        self.limit: int = min(max(initial, min_limit), self.max_limit)
+        self.peak: int = self.limit
+        self.backoffs: int = 0
+        self.in_flight: int = 0
+        self.short_latency: float = 0.0
+        self.long_latency: float = 0.0
+        self._epoch: int = 0
+        self._successes: int = 0
+        self._condition = threading.Condition()
+
+    def acquire(self) -> int:
+        # Blocks until a request may be sent. The returned epoch is handed back to release.
+        with self._condition:
+            while self.in_flight >= self.limit:
+                self._condition.wait()
+            self.in_flight += 1
+            return self._epoch
+
+    def try_acquire(self) -> Optional[int]:
+        # Like acquire, but returns None instead of waiting when the limit is reached
+        with self._condition:
+            if self.in_flight >= self.limit:
+                return None
+            self.in_flight += 1
+            return self._epoch
+
+    def abandon(self) -> None:
+        # Gives back a request that was acquired but never sent, without a latency to learn from
+        with self._condition:
+            self.in_flight -= 1
+            self._condition.notify_all()
+
+    def release(self, epoch: int, latency: float, overloaded: bool = False) -> None:
+        with self._condition:
+            self.in_flight -= 1
+            if 0.0 == self.long_latency:
+                self.short_latency = self.long_latency = latency
+            else:
+                self.short_latency += SHORT_SMOOTHING * (latency - self.short_latency)
+                self.long_latency += LONG_SMOOTHING * (latency - self.long_latency)
+            congested: bool = (
+                overloaded or self.short_latency > LATENCY_TOLERANCE * self.long_latency
+            )
+            if congested:
+                if epoch == self._epoch:
+                    self.limit = max(
+                        self.min_limit, math.floor(self.limit * BACKOFF_FACTOR)
+                    )
+                    self.backoffs += 1
+                    self._epoch += 1
+                    self._successes = 0
+                    self.short_latency = self.long_latency
+            elif epoch == self._epoch:
+                self._successes += 1
+                if self._successes >= self.limit and self.limit < self.max_limit:
+                    self.limit += 1
+                    self.peak = max(self.peak, self.limit)
+                    self._successes = 0
+            self._condition.notify_all()
+
+    def summary(self) -> str:
+        return (
+            f"Concurrency settled at {self.limit} "
+            f"(peak {self.peak}, at most {self.max_limit}, backed off {self.backoffs} times)."
+        )
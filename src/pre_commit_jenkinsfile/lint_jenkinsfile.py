@@ -1,190 +1,100 @@
 import argparse
-from enum import IntEnum
+import itertools
+import sys
+import time
+from contextlib import nullcontext, redirect_stdout
+from importlib import import_module
 from pathlib import Path
-from typing import List, Optional, Sequence, Dict
-
-import paramiko
-import urllib3
-from paramiko import (
-    SSHClient,
-    SSHException,
-    BadHostKeyException,
-    AuthenticationException,
-    AutoAddPolicy,
-)
-from urllib3 import HTTPResponse
+from typing import Any, Generator, Iterable, Iterator, List, Optional, Sequence
 
+from src.pre_commit_jenkinsfile.cache import DEFAULT_TTL, ResultCache, default_cache_dir
 from src.pre_commit_jenkinsfile.config import Config
-
-
-class ErrorCodes(IntEnum):
-    OK = 0
-    FAIL = 1
-
-
-def get_jenkins_crumb(
-    jenkins_url: str, jenkins_login: str, jenkins_api_token: str
-) -> Optional[str]:
-    crumb: Optional[str]
-    http = urllib3.PoolManager()
-    request_url: str = f'{jenkins_url}/crumbIssuer/api/xml?xpath=concat(//crumbRequestField,":",//crumb)'
-    header: Dict[str, str] = {}
-    if len(jenkins_login) > 0 and len(jenkins_api_token) > 0:
-        header = urllib3.make_headers(basic_auth=f"{jenkins_login}:{jenkins_api_token}")
-    response: HTTPResponse = http.request("GET", request_url, headers=header)
-    if response.status == 200:
-        crumb = response.data.decode()
-    else:
-        response_message: str = response.data.decode()
-        if "Authentication required" in response_message:
-            print(
-                f"Requesting a crumb from the Jenkins server failed due to an authentication failure "
-                f"(status {response.status})."
-            )
-        else:
-            print(
-                f"Requesting the crumb field from the Jenkins server failed with status {response.status}:"
-                f"\n{response_message}."
-            )
-        crumb = None
-
-    return crumb
-
-
-def lint_via_http(
-    filenames: List[Path],
-    jenkins_url: str,
-    jenkins_login: str,
-    jenkins_api_token: str,
-) -> ErrorCodes:
-
-    return_code: ErrorCodes
-    return_codes: List[ErrorCodes] = []
-    crumb = get_jenkins_crumb(jenkins_url, jenkins_login, jenkins_api_token)
-    if crumb:
-        http = urllib3.PoolManager()
-        request_url: str = f"{jenkins_url}/pipeline-model-converter/validate"
-        headers: Dict[str, str] = {}
-        if len(jenkins_login) > 0 and len(jenkins_api_token) > 0:
-            headers = urllib3.make_headers(
-                basic_auth=f"{jenkins_login}:{jenkins_api_token}"
-            )
-
-        crumb_parts = crumb.split(":")
-        headers[crumb_parts[0]] = crumb_parts[1]
-        for filename in filenames:
-            return_code = http_validate(filename, headers, http, request_url)
-            return_codes.append(return_code)
-
-        return_code = (
-            ErrorCodes.OK if ErrorCodes.FAIL not in return_codes else ErrorCodes.FAIL
-        )
-    else:
-        return_code = ErrorCodes.FAIL
-        print("No crumb was returned by the Jenkins server and so we cannot lint.")
-
-    return return_code
-
-
-def http_validate(
-    filename: Path, headers: Dict[str, str], http: urllib3.PoolManager, request_url: str
-) -> ErrorCodes:
-    return_code: ErrorCodes
-
-    jenkinsfile_text: str = filename.read_text()
-    response: HTTPResponse = http.request_encode_body(
-        "POST",
-        request_url,
-        fields={"jenkinsfile": jenkinsfile_text},
-        headers=headers,
-    )
-    message: str = response.data.decode()
-    if response.status == 200:
-        if "Error" in message:
-            print(filename)
-            print(message)
-            return_code = ErrorCodes.FAIL
-        else:
-            return_code = ErrorCodes.OK
-    else:
-        print(f"Connection failed: A status code of {response.status} was returned.")
-        return_code = ErrorCodes.FAIL
-
-    return return_code
-
-
-def lint_via_ssh(
-    filenames: List[Path], jenkins_hostname: str, jenkins_jenkins_ssh_port: int
-) -> ErrorCodes:
-    return_code: ErrorCodes = ErrorCodes.FAIL
+from src.pre_commit_jenkinsfile.controllers import TransportStore
+from src.pre_commit_jenkinsfile.deadline import (
+    DEADLINE_POLICIES,
+    Deadline,
+    most_recent_first,
+)
+from src.pre_commit_jenkinsfile.health import (
+    CIRCUIT_POLICIES,
+    DEFAULT_FAILURE_THRESHOLD,
+    HealthStore,
+)
+from src.pre_commit_jenkinsfile.hedge import Hedger
+from src.pre_commit_jenkinsfile.limiter import AdaptiveLimiter
+from src.pre_commit_jenkinsfile.results import (
+    REPORT_FORMATS,
+    REPORTER,
+    ErrorCodes,
+    ValidationResult,
+    combine_return_codes,
+    report_result,
+    report_skipped,
+)
+from src.pre_commit_jenkinsfile.shared_store import SharedStore
+from src.pre_commit_jenkinsfile.syntax import check_file
+from src.pre_commit_jenkinsfile.timings import TIMINGS
+from src.pre_commit_jenkinsfile.transport import peek, timed
+
+TRANSPORTS = ("http", "ssh", "script", "auto")
+
+# The transports pull in urllib3 or paramiko (and with it cryptography), which take longer to import
+# than the rest of the hook. They are only imported once a run needs them.
+TRANSPORT_MODULES = {
+    "get_jenkins_crumb": "src.pre_commit_jenkinsfile.http_transport",
+    "lint_via_http": "src.pre_commit_jenkinsfile.http_transport",
+    "http_validate": "src.pre_commit_jenkinsfile.http_transport",
+    "lint_via_ssh": "src.pre_commit_jenkinsfile.ssh_transport",
+    "ssh_validate": "src.pre_commit_jenkinsfile.ssh_transport",
+}
+
+
+def __getattr__(name: str) -> Any:
+    if name in TRANSPORT_MODULES:
+        return getattr(import_module(TRANSPORT_MODULES[name]), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def check_offline(
+    filenames: Iterable[Path], return_codes: List[ErrorCodes], final: bool = False
+) -> Iterator[Path]:
+    # Reports the files rejected by the local structural check and yields the ones left to validate.
+    # A pass is only reported when no controller will see the file afterwards.
+    check = timed(check_file, "offline")
+    for filename in filenames:
+        if REPORTER.stopped:
+            return
+        with TIMINGS.span("offline_check", "file", file=str(filename)):
+            result: ValidationResult = check(filename)
+        if final or ErrorCodes.FAIL == result.return_code:
+            report_result(result)
+        return_codes.append(result.return_code)
+        if ErrorCodes.OK == result.return_code:
+            yield filename
+
+
+def report_all(linter: Any, filenames: Iterable[Path]) -> ErrorCodes:
     return_codes: List[ErrorCodes] = []
-
-    try:
-        with SSHClient() as client:
-            client.set_missing_host_key_policy(AutoAddPolicy())
-            client.load_system_host_keys()
-            client.connect(jenkins_hostname, port=jenkins_jenkins_ssh_port)
-            for filename in filenames:
-                return_code = ssh_validate(client, filename)
-                return_codes.append(return_code)
-
-    except BadHostKeyException as err:
-        print(
-            f"Connection to the server failed because the hostkey could not be verified:\n{str(err)}"
-        )
-    except AuthenticationException as err:
-        print(f"Authentication with the server failed:\n{str(err)}")
-    except SSHException as err:
-        print(f"Error establishing an SSH connection: \n{str(err)}")
-    except OSError as err:
-        # socket.error is a deprecated alias of OSError
-        print(
-            f"A socket error occurred during the attempt to connect to the server: \n{str(err)}"
-        )
-    except Exception as err:
-        print(f"An unexpected error occurred:\n{str(err)}")
-
-    if len(return_codes) > 0:
-        return_code = (
-            ErrorCodes.OK if ErrorCodes.FAIL not in return_codes else ErrorCodes.FAIL
-        )
-
-    return return_code
-
-
-def ssh_validate(client: paramiko.SSHClient, filename: Path) -> ErrorCodes:
-    return_code: ErrorCodes = ErrorCodes.FAIL
-
-    if filename.exists():
-        try:
-            stdin_channel, stdout_channel, stderr_channel = client.exec_command(
-                "declarative-linter"
-            )
-
-            # Write the file contents to stdin; declarative-linter will wait for stdin input
-            stdin_channel.channel.send(filename.read_bytes())
-            stdin_channel.channel.shutdown_write()
-
-            # Block until finished
-            exit_status: int = stdout_channel.channel.recv_exit_status()
-            stdout: str = stdout_channel.read().decode()
-
-            return_code = ErrorCodes.OK if 0 == exit_status else ErrorCodes.FAIL
-            if ErrorCodes.FAIL == return_code:
-                print(filename)
-                print(stdout)
-
-        except SSHException as err:
-            print(
-                f'Failed to execute the "declarative-linter" command on the Jenkins server:\n{str(err)}'
-            )
-    else:
-        print(f'The file "{str(filename)} does not exist.')
-
-    return return_code
+    results: Generator[ValidationResult, None, None] = linter.lint_many(
+        filenames, REPORTER.in_order
+    )
+    for result in results:
+        if not result.is_verdict and not linter.reachable:
+            # notify already said why; like a failed connection, the rest of the files are not sent.
+            # Only an open circuit with --circuit-policy fail-open lets the run pass.
+            report_skipped(result)
+            return_codes.append(result.return_code)
+            break
+        report_result(result)
+        return_codes.append(result.return_code)
+        if REPORTER.stopped:
+            break
+    results.close()
+    return combine_return_codes(return_codes)
 
 
 def main(argv: Optional[Sequence[str]] = None) -> int:
+    started: float = time.perf_counter()
     parser = argparse.ArgumentParser()
 
     parser.add_argument(
@@ -230,15 +140,199 @@ def main(argv: Optional[Sequence[str]] = None) -> int:
         type=str,
         default="",
     )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Always send files to the Jenkins controller instead of reusing earlier results",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        action="store",
+        help="The directory that holds cached validation results",
+        type=str,
+        default="",
+    )
+    parser.add_argument(
+        "--cache-ttl",
+        action="store",
+        help="The number of seconds a cached validation result stays valid",
+        type=float,
+        default=DEFAULT_TTL,
+    )
+    parser.add_argument(
+        "--shared-cache",
+        action="store",
+        help="A directory, e.g. on a network share, or the http(s) URL of a key-value service that "
+        "holds validation results shared with the rest of the team",
+        type=str,
+        default="",
+    )
+    parser.add_argument(
+        "--jobs",
+        action="store",
+        help="The number of files to validate in parallel",
+        type=int,
+        default=1,
+    )
+    parser.add_argument(
+        "--max-jobs",
+        action="store",
+        help="Adjust the number of files validated in parallel to the response times of the controller, "
+        "starting at --jobs and never exceeding this number",
+        type=int,
+        default=0,
+    )
+    parser.add_argument(
+        "--hedge-rate",
+        action="store",
+        help="Send a file a second time when the controller takes longer than for nine in ten files, "
+        "for at most this share of the files, e.g. 0.1. Default is 0, never",
+        type=float,
+        default=0.0,
+    )
+    parser.add_argument(
+        "--deadline",
+        action="store",
+        help="The most seconds the whole run may take; files not validated by then are reported and "
+        "handled according to --deadline-policy",
+        type=float,
+        default=0.0,
+    )
+    parser.add_argument(
+        "--deadline-policy",
+        action="store",
+        help="Whether files not validated before the deadline fail the run (fail-closed) or not (fail-open)",
+        choices=DEADLINE_POLICIES,
+        default="fail-closed",
+    )
+    parser.add_argument(
+        "--transport",
+        action="store",
+        help="How to reach the controller: http, ssh, script to send many files per request through the "
+        "script console, or auto to use the faster of http and ssh. By default http if a URL is configured, "
+        "ssh otherwise",
+        choices=TRANSPORTS,
+        default="",
+    )
+    parser.add_argument(
+        "--circuit-threshold",
+        action="store",
+        help="Skip a controller without contacting it once it could not be reached on this many runs in a "
+        "row, until a later run finds it back; 0 always contacts it",
+        type=int,
+        default=DEFAULT_FAILURE_THRESHOLD,
+    )
+    parser.add_argument(
+        "--circuit-policy",
+        action="store",
+        help="Whether files fail the run while their controllers are skipped (fail-closed) or not (fail-open)",
+        choices=CIRCUIT_POLICIES,
+        default="fail-closed",
+    )
+    parser.add_argument(
+        "--offline",
+        action="store_true",
+        help="Only run the local structural check and never contact the Jenkins controller",
+    )
+    parser.add_argument(
+        "--no-offline-check",
+        action="store_true",
+        help="Send every file to the Jenkins controller without the local structural check",
+    )
+    parser.add_argument(
+        "--discover",
+        action="store",
+        help="Validate the pipelines found under this directory as well as the given files",
+        type=str,
+        default="",
+    )
+    parser.add_argument(
+        "--discover-glob",
+        action="append",
+        help="Also discover files whose name matches this glob, e.g. *.jenkinsfile",
+        type=str,
+        default=[],
+    )
+    parser.add_argument(
+        "--discover-exclude",
+        action="append",
+        help="Do not descend into directories with this name",
+        type=str,
+        default=[],
+    )
+    parser.add_argument(
+        "--since",
+        action="store",
+        help="Only validate the files that changed since this git ref",
+        type=str,
+        default="",
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="Keep running and validate the files again whenever they are saved with new content",
+    )
+    parser.add_argument(
+        "--watch-polling",
+        action="store_true",
+        help="Watch the files by checking their modification times instead of with inotify",
+    )
+    parser.add_argument(
+        "--daemon",
+        action="store_true",
+        help="Validate through a background process that keeps the controller connection open between runs",
+    )
+    parser.add_argument(
+        "--daemon-idle-timeout",
+        action="store",
+        help="The number of idle seconds after which the background process exits",
+        type=float,
+        default=600.0,
+    )
+    parser.add_argument(
+        "--format",
+        action="store",
+        help="text prints the failures, ndjson prints one JSON record per file as soon as it is validated",
+        choices=REPORT_FORMATS,
+        default="text",
+    )
+    parser.add_argument(
+        "--fail-fast",
+        action="store_true",
+        help="Stop validating after the first failure",
+    )
+    parser.add_argument(
+        "--timings",
+        action="store_true",
+        help="Print how long each phase of the run took",
+    )
+    parser.add_argument(
+        "--trace-file",
+        action="store",
+        help="Write the timing of each phase and file to this file in the Chrome trace format",
+        type=str,
+        default="",
+    )
     parser.add_argument("filenames", nargs="*", type=Path)
     args = parser.parse_args(argv)
+    TIMINGS.reset(args.timings or len(args.trace_file) > 0, origin=started)
+    TIMINGS.add("parse_args", "phase", started)
+    REPORTER.reset(args.format, args.fail_fast)
+
+    # Keep stdout for the records, everything else goes to stderr
+    with redirect_stdout(sys.stderr) if "ndjson" == args.format else nullcontext():
+        return run(args, started)
+
+
+def run(args: argparse.Namespace, started: float) -> int:
     return_value: ErrorCodes = ErrorCodes.OK
 
-    filenames: List[Path] = []
+    filenames: Iterable[Path] = []
     if args.filenames:
         filenames = args.filenames
 
     config: Config
+    config_started: float = time.perf_counter()
     if len(args.config) > 0:
         config_file_path: Path = Path(args.config).resolve()
         if config_file_path.exists() and config_file_path.is_file():
@@ -256,21 +350,196 @@ def main(argv: Optional[Sequence[str]] = None) -> int:
             args.jenkins_hostname,
             args.jenkins_ssh_port,
         )
+    TIMINGS.add("load_config", "phase", config_started)
+
+    cache_dir: Path = (
+        Path(args.cache_dir) if len(args.cache_dir) > 0 else default_cache_dir()
+    )
+    cache: Optional[ResultCache] = None
+    if not args.no_cache:
+        cache = ResultCache(cache_dir, ttl=args.cache_ttl)
+    shared_store: Optional[SharedStore] = None
+    if not args.no_cache and len(args.shared_cache) > 0:
+        from src.pre_commit_jenkinsfile.shared_store import open_store
+
+        shared_store = open_store(args.shared_cache, args.cache_ttl)
+
+    jobs: int = args.jobs
+    limiter: Optional[AdaptiveLimiter] = None
+    if args.max_jobs > 0:
+        limiter = AdaptiveLimiter(args.jobs, args.max_jobs)
+        jobs = limiter.max_limit
+
+    hedger: Optional[Hedger] = None
+    if args.hedge_rate > 0:
+        hedger = Hedger(args.hedge_rate)
+
+    health: Optional[HealthStore] = None
+    if args.circuit_threshold > 0:
+        health = HealthStore(
+            cache_dir, args.circuit_threshold, "fail-open" == args.circuit_policy
+        )
+
+    transport_store: Optional[TransportStore] = None
+    if "auto" == args.transport:
+        transport_store = TransportStore(cache_dir)
+
+    if len(args.discover) > 0:
+        from src.pre_commit_jenkinsfile.discover import PRUNED_DIRECTORIES, discover
+
+        filenames = itertools.chain(
+            filenames,
+            discover(
+                Path(args.discover),
+                args.discover_glob,
+                PRUNED_DIRECTORIES + tuple(args.discover_exclude),
+            ),
+        )
+
+    if len(args.since) > 0:
+        from src.pre_commit_jenkinsfile.git import GitError, changed_since
+
+        try:
+            with TIMINGS.span("git_since"):
+                filenames = changed_since(
+                    args.since,
+                    list(filenames) if args.filenames or args.discover else None,
+                )
+        except GitError as err:
+            print(f"Could not find the files changed since {args.since}:\n{str(err)}")
+            return ErrorCodes.FAIL
+
+    if args.watch:
+        if len(config.controllers()) == 0:
+            print("--watch needs a Jenkins controller to validate the files with.")
+            return ErrorCodes.FAIL
+
+        from src.pre_commit_jenkinsfile.linter import Linter
+        from src.pre_commit_jenkinsfile.session import CrumbStore
+        from src.pre_commit_jenkinsfile.watch import Watch
+
+        with Linter(
+            config,
+            cache,
+            jobs,
+            limiter,
+            CrumbStore(cache_dir),
+            shared_store,
+            offline_check=args.offline or not args.no_offline_check,
+            notify=print,
+            health=health,
+            transport=args.transport,
+            transport_store=transport_store,
+            hedger=hedger,
+        ) as linter:
+            print("Watching for changes, press Ctrl-C to stop.")
+            return Watch(linter, list(filenames), polling=args.watch_polling).run()
+
+    deadline: Optional[Deadline] = None
+    if args.deadline > 0:
+        deadline = Deadline(
+            args.deadline - (time.perf_counter() - started),
+            "fail-open" == args.deadline_policy,
+        )
+        filenames = most_recent_first(filenames)
+
+    offline_return_codes: List[ErrorCodes] = []
+    if args.offline or not args.no_offline_check:
+        filenames = check_offline(filenames, offline_return_codes, args.offline)
+
+    # Files are pulled through the offline check and the cache as the transport asks for them, so the
+    # pipelines found by --discover are validated while the walk is still going on
+    remaining: Optional[Iterator[Path]] = None if args.offline else peek(filenames)
+
+    controllers: List[Config] = config.controllers()
+    if len(controllers) == 1:
+        config = controllers[0]
+
+    # Set when the files went to the script console or the daemon instead of the Linter below
+    delegated_return_value: Optional[ErrorCodes] = None
+    if remaining is not None and "script" == args.transport:
+        if len(controllers) != 1 or not config.has_http_creds():
+            print("--transport script needs a single Jenkins controller with a URL.")
+            return ErrorCodes.FAIL
+
+        from src.pre_commit_jenkinsfile.script_transport import (
+            lint_via_script_console,
+        )
+        from src.pre_commit_jenkinsfile.session import CrumbStore
 
-    if len(filenames) > 0:
-        if config.has_http_creds():
-            return_value = lint_via_http(
-                filenames,
+        with TIMINGS.span("lint"):
+            delegated_return_value = lint_via_script_console(
+                remaining,
                 config.jenkins_url,
                 config.jenkins_login,
                 config.jenkins_api_token,
+                cache,
+                jobs,
+                CrumbStore(cache_dir),
+                deadline,
             )
-        elif config.has_ssh_creds():
-            return_value = lint_via_ssh(
-                filenames, config.jenkins_hostname, config.jenkins_ssh_port
+    elif remaining is not None and args.daemon and len(args.transport) == 0:
+        from src.pre_commit_jenkinsfile import daemon
+
+        # The daemon does not know about the circuit, so a skipped controller is left to the Linter
+        if (
+            daemon.is_supported()
+            and len(controllers) == 1
+            and (health is None or not health.is_open(config.controller_id()))
+        ):
+            delegated_return_value = daemon.lint_via_daemon(
+                remaining,
+                config,
+                cache,
+                args.jobs,
+                args.daemon_idle_timeout,
+                deadline=deadline,
             )
 
-    return return_value
+    if delegated_return_value is not None:
+        return_value = delegated_return_value
+    elif remaining is not None and len(controllers) > 0:
+        from src.pre_commit_jenkinsfile.linter import Linter
+        from src.pre_commit_jenkinsfile.session import CrumbStore
+
+        # The files already passed the offline check above
+        with Linter(
+            config,
+            cache,
+            jobs,
+            limiter,
+            CrumbStore(cache_dir),
+            shared_store,
+            offline_check=False,
+            notify=print,
+            deadline=deadline,
+            health=health,
+            transport=args.transport,
+            transport_store=transport_store,
+            hedger=hedger,
+        ) as linter:
+            with TIMINGS.span("lint"):
+                return_value = report_all(linter, remaining)
+        if limiter is not None:
+            print(limiter.summary())
+        if hedger is not None:
+            print(hedger.summary())
+
+    # Report the offline results of any files no transport asked for, e.g. after a connection failure
+    for _ in remaining if remaining is not None else filenames:
+        pass
+
+    if cache is not None:
+        with TIMINGS.span("cache_prune"):
+            cache.prune()
+
+    TIMINGS.add("main", "phase", started)
+    if args.timings:
+        print(TIMINGS.summary())
+    if len(args.trace_file) > 0:
+        TIMINGS.write_trace(Path(args.trace_file))
+
+    return combine_return_codes(offline_return_codes + [return_value])
 
 
 if __name__ == "__main__":
@@ -0,0 +1,226 @@
+import itertools
+import shutil
+import tempfile
+import threading
+from pathlib import Path
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Generator,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    Union,
+)
+
+from src.pre_commit_jenkinsfile.cache import ResultCache
+from src.pre_commit_jenkinsfile.config import Config
+from src.pre_commit_jenkinsfile.controllers import (
+    Controller,
+    ControllerPool,
+    TransportStore,
+    pool_id,
+)
+from src.pre_commit_jenkinsfile.deadline import Deadline
+from src.pre_commit_jenkinsfile.health import HealthStore
+from src.pre_commit_jenkinsfile.hedge import Hedger, hedged
+from src.pre_commit_jenkinsfile.limiter import AdaptiveLimiter
+from src.pre_commit_jenkinsfile.results import ErrorCodes, ValidationResult
+from src.pre_commit_jenkinsfile.shared_store import SharedStore
+from src.pre_commit_jenkinsfile.syntax import check_file
+from src.pre_commit_jenkinsfile.timings import TIMINGS
+from src.pre_commit_jenkinsfile.transport import (
+    limited,
+    read_ahead,
+    store_result,
+    timed,
+    validate_all,
+)
+
+# The filename reported for pipelines that were passed as text
+TEXT_FILENAME: Path = Path("<string>")
+
+PathOrText = Union[Path, str]
+
+
+def _ignore(message: str) -> None:
+    pass
+
+
+class Linter:
+    # Validates pipelines like the hook does, for callers that keep running such as editor integrations
+    # or audit scripts. The connections to the controllers are opened on first use and kept until
+    # close(), so the crumb request or SSH handshake is paid once. Nothing is printed: every outcome is
+    # a ValidationResult, and notices such as a skipped controller go to notify.
+    # A Path is read from disk, a str is the pipeline itself.
+    def __init__(
+        self,
+        config: Config,
+        cache: Optional[ResultCache] = None,
+        jobs: int = 1,
+        limiter: Optional[AdaptiveLimiter] = None,
+        crumb_store: Any = None,
+        shared_store: Optional[SharedStore] = None,
+        offline_check: bool = True,
+        notify: Callable[[str], None] = _ignore,
+        deadline: Optional[Deadline] = None,
+        health: Optional[HealthStore] = None,
+        transport: str = "",
+        transport_store: Optional[TransportStore] = None,
+        hedger: Optional[Hedger] = None,
+    ):
+        configs: List[Config] = config.controllers()
+        if len(configs) == 0:
+            raise ValueError("The config does not name a Jenkins controller.")
+
+        self.cache: Optional[ResultCache] = cache
+        self.jobs: int = jobs if limiter is None else limiter.max_limit
+        self.limiter: Optional[AdaptiveLimiter] = limiter
+        self.hedger: Optional[Hedger] = hedger
+        self.offline_check: bool = offline_check
+        self.deadline: Optional[Deadline] = deadline
+        # Any controller in the pool may deliver a verdict, so cached results belong to the pool
+        self.scope: str = pool_id(configs)
+        # A hedge needs a connection of its own next to the request it backs up
+        connections: int = self.jobs if hedger is None else 2 * self.jobs
+        self.pool = ControllerPool(
+            [
+                Controller(
+                    config,
+                    connections,
+                    crumb_store,
+                    shared_store,
+                    notify,
+                    deadline,
+                    transport,
+                    transport_store,
+                )
+                for config in configs
+            ],
+            notify,
+            deadline,
+            health,
+        )
+        self._text_dir: Optional[Path] = None
+        self._text_count = itertools.count()
+        self._lock = threading.Lock()
+
+    @property
+    def reachable(self) -> bool:
+        return self.pool.reachable
+
+    def lint(self, path_or_text: PathOrText) -> ValidationResult:
+        return list(self.lint_many([path_or_text]))[0]
+
+    def lint_many(
+        self, items: Iterable[PathOrText], in_order: bool = False
+    ) -> Generator[ValidationResult, None, None]:
+        # Yields one result per item as soon as it is known, or in the order of items. Items are only
+        # taken as workers free up, so they can be a stream that is still being produced, and closing
+        # the iterator early leaves the rest unsent.
+        self.pool.revive()
+        texts: Set[Path] = set()
+        results: Generator[ValidationResult, None, None] = self._lint_files(
+            (self._materialize(item, texts) for item in items), in_order
+        )
+        try:
+            for result in results:
+                if result.filename in texts:
+                    texts.remove(result.filename)
+                    result.filename.unlink(missing_ok=True)
+                    result.filename = TEXT_FILENAME
+                yield result
+        finally:
+            results.close()
+            for text_file in texts:
+                text_file.unlink(missing_ok=True)
+
+    def _materialize(self, item: PathOrText, texts: Set[Path]) -> Path:
+        # Text is written to a temporary file, so it goes through the offline check, the caches and the
+        # transports exactly like a file on disk
+        if not isinstance(item, str):
+            return Path(item)
+        with self._lock:
+            if self._text_dir is None:
+                self._text_dir = Path(
+                    tempfile.mkdtemp(prefix="pre-commit-jenkinsfile-")
+                )
+            text_file: Path = self._text_dir / f"{next(self._text_count)}.Jenkinsfile"
+        text_file.write_text(item)
+        texts.add(text_file)
+        return text_file
+
+    def _lint_files(
+        self, filenames: Iterable[Path], in_order: bool
+    ) -> Generator[ValidationResult, None, None]:
+        # Offline failures, cache hits and files left at the deadline are known before any request is
+        # sent. They go through the workers with the files to validate, so in_order keeps them in place.
+        keys: Dict[Path, str] = {}
+        check = timed(check_file, "offline")
+
+        def pending() -> Iterator[Union[Path, ValidationResult]]:
+            warming_up: bool = False
+            for filename in filenames:
+                if self.deadline is not None and self.deadline.expired:
+                    yield self.deadline.result(filename)
+                    continue
+                if self.offline_check:
+                    with TIMINGS.span("offline_check", "file", file=str(filename)):
+                        result: ValidationResult = check(filename)
+                    if ErrorCodes.FAIL == result.return_code:
+                        yield result
+                        continue
+                if self.cache is not None:
+                    with TIMINGS.span("cache_lookup", "file", file=str(filename)):
+                        hit, key = self.cache.find(filename, self.scope)
+                    if hit is not None:
+                        hit.transport = "cache"
+                        yield hit
+                        continue
+                    keys[filename] = key
+                if not warming_up:
+                    # Only a file the controllers have to see opens the connection, which is then made
+                    # while the files after it are checked and looked up
+                    warming_up = True
+                    self.pool.warm_up()
+                yield filename
+
+        validate: Callable[[Path], ValidationResult] = self.pool.validate
+        # The limiter sees the time the first answer took, hedged or not; a hedge takes a slot of its own
+        if self.hedger is not None:
+            validate = hedged(validate, self.hedger, self.limiter)
+        if self.limiter is not None:
+            validate = limited(validate, self.limiter)
+        validate = timed(validate, "")
+
+        def validate_unknown(item: Union[Path, ValidationResult]) -> ValidationResult:
+            if isinstance(item, ValidationResult):
+                return item
+            result: ValidationResult = validate(item)
+            store_result(result, keys.pop(item, ""), self.cache)
+            return result
+
+        # The files are checked and looked up ahead of the workers, so the first ones are ready when
+        # the connection is
+        results: Generator[ValidationResult, None, None] = validate_all(
+            validate_unknown, read_ahead(pending()), self.jobs, in_order
+        )
+        try:
+            yield from results
+        finally:
+            results.close()
+
+    def close(self) -> None:
+        self.pool.close()
+        if self._text_dir is not None:
+            shutil.rmtree(self._text_dir, ignore_errors=True)
+            self._text_dir = None
+
+    def __enter__(self) -> "Linter":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
@@ -0,0 +1,107 @@
+import json
+import sys
+import threading
+from dataclasses import dataclass
+from enum import IntEnum
+from pathlib import Path
+from typing import Any, Dict, Iterable, TextIO
+
+REPORT_FORMATS = ("text", "ndjson")
+
+
+class ErrorCodes(IntEnum):
+    OK = 0
+    FAIL = 1
+
+
+@dataclass
+class ValidationResult:
+    filename: Path
+    return_code: ErrorCodes
+    message: str = ""
+    # False when the controller never delivered a verdict, e.g. a connection failure
+    is_verdict: bool = True
+    # Where the verdict came from ("http", "ssh", "cache" or "offline") and how many seconds it took
+    transport: str = ""
+    duration: float = 0.0
+    # True when the controller turned the request away because it is busy, e.g. with a 429 or 503
+    overloaded: bool = False
+
+
+def combine_return_codes(return_codes: Iterable[ErrorCodes]) -> ErrorCodes:
+    return ErrorCodes.OK if ErrorCodes.FAIL not in return_codes else ErrorCodes.FAIL
+
+
+class Reporter:
+    # Reports each result as soon as it is known, either as the original text or as one JSON record per
+    # line. With fail_fast set, the first failure tells the transports to stop sending files.
+    def __init__(self):
+        self.format: str = "text"
+        self.fail_fast: bool = False
+        self.failed: bool = False
+        self.stream: TextIO = sys.stdout
+        self._lock = threading.Lock()
+
+    def reset(self, output_format: str = "text", fail_fast: bool = False) -> None:
+        with self._lock:
+            self.format = output_format
+            self.fail_fast = fail_fast
+            self.failed = False
+            self.stream = sys.stdout
+
+    @property
+    def stopped(self) -> bool:
+        return self.fail_fast and self.failed
+
+    @property
+    def in_order(self) -> bool:
+        # Results are held back to keep the order of the command line only when nobody is waiting on them
+        return "text" == self.format and not self.fail_fast
+
+    def report(self, result: ValidationResult) -> None:
+        with self._lock:
+            if ErrorCodes.FAIL == result.return_code:
+                self.failed = True
+
+            if "ndjson" == self.format:
+                self.stream.write(json.dumps(record(result)) + "\n")
+                self.stream.flush()
+            elif ErrorCodes.FAIL == result.return_code or not result.is_verdict:
+                # Files that were never validated are mentioned even when they do not fail the run
+                if result.is_verdict:
+                    print(result.filename)
+                if len(result.message) > 0:
+                    print(result.message)
+
+    def report_skipped(self, result: ValidationResult) -> None:
+        # A file that was not sent since no controller could be reached, or their circuit is open. The
+        # notice already said why, so only ndjson gets a record of it.
+        if "ndjson" == self.format:
+            verdict: str = "skipped" if "circuit" == result.transport else "unreachable"
+            with self._lock:
+                self.stream.write(json.dumps(record(result, verdict)) + "\n")
+                self.stream.flush()
+
+
+def record(result: ValidationResult, verdict: str = "") -> Dict[str, Any]:
+    if len(verdict) == 0:
+        verdict = "pass" if ErrorCodes.OK == result.return_code else "fail"
+        verdict = verdict if result.is_verdict else "error"
+    return {
+        "path": str(result.filename),
+        "verdict": verdict,
+        "transport": result.transport,
+        "duration": round(result.duration, 6),
+        "message": result.message,
+    }
+
+
+REPORTER = Reporter()
+
+
+def report_result(result: ValidationResult) -> None:
+    REPORTER.report(result)
+
+
+def report_skipped(result: ValidationResult) -> None:
+    REPORTER.report_skipped(result)
@@ -0,0 +1,221 @@
+import base64
+import json
+import time
+from pathlib import Path
+from typing import Any, Dict, Generator, Iterable, Iterator, List, Optional
+from urllib.parse import urlencode
+
+from urllib3 import HTTPResponse
+
+from src.pre_commit_jenkinsfile.cache import ResultCache
+from src.pre_commit_jenkinsfile.deadline import Deadline
+from src.pre_commit_jenkinsfile.http_transport import NO_CRUMB
+from src.pre_commit_jenkinsfile.results import (
+    REPORTER,
+    ErrorCodes,
+    ValidationResult,
+    combine_return_codes,
+    report_result,
+)
+from src.pre_commit_jenkinsfile.session import CrumbStore, JenkinsSession
+from src.pre_commit_jenkinsfile.timings import TIMINGS
+from src.pre_commit_jenkinsfile.transport import (
+    peek,
+    resolve_cached,
+    store_result,
+    validate_all,
+)
+
+# The most bytes of Jenkinsfiles sent in one request. Base64 and the form encoding add about half again,
+# which stays well below the request size limits of Jetty and common reverse proxies.
+BATCH_MAX_BYTES: int = 1024 * 1024
+# Starts the line with the verdicts, so anything else the script prints cannot be mistaken for them
+RESULTS_MARKER: str = "pre-commit-jenkinsfile-verdicts:"
+
+# Runs the converter behind /pipeline-model-converter/validate on every file and prints the verdicts as
+# JSON, in the words of that endpoint. The files come base64 encoded so nothing needs escaping.
+VALIDATE_SCRIPT: str = """
+import groovy.json.JsonOutput
+import groovy.json.JsonSlurper
+import org.codehaus.groovy.control.MultipleCompilationErrorsException
+import org.jenkinsci.plugins.pipeline.modeldefinition.parser.Converter
+
+def jenkinsfiles = new JsonSlurper().parseText(new String('@JENKINSFILES@'.decodeBase64(), 'UTF-8'))
+def verdicts = jenkinsfiles.collect { jenkinsfile ->
+    try {
+        if (Converter.scriptToPipelineDef(jenkinsfile) != null) {
+            return [passed: true, message: 'Jenkinsfile successfully validated.']
+        }
+        return [passed: false, message: "Jenkinsfile content '${jenkinsfile}' did not contain the 'pipeline' step"]
+    } catch (MultipleCompilationErrorsException e) {
+        def errors = e.errorCollector.errors.collect { it.cause?.message ?: it.toString() }
+        return [passed: false, message: 'Errors encountered validating Jenkinsfile:\\n' + errors.join('\\n')]
+    } catch (Exception e) {
+        return [passed: false, message: 'Errors encountered validating Jenkinsfile:\\n' + e.message]
+    }
+}
+println '@MARKER@' + JsonOutput.toJson(verdicts)
+"""
+
+
+def batches(
+    filenames: Iterable[Path], max_bytes: int = BATCH_MAX_BYTES
+) -> Iterator[List[Path]]:
+    # Groups the files into batches of at most max_bytes; a larger file goes on its own. Each batch is
+    # handed out as soon as it is full, so the first request does not wait for the last file.
+    batch: List[Path] = []
+    size: int = 0
+    for filename in filenames:
+        try:
+            file_size: int = filename.stat().st_size
+        except OSError:
+            file_size = 0
+        if len(batch) > 0 and size + file_size > max_bytes:
+            yield batch
+            batch, size = [], 0
+        batch.append(filename)
+        size += file_size
+    if len(batch) > 0:
+        yield batch
+
+
+def script_validate(
+    filenames: List[Path], session: JenkinsSession
+) -> List[ValidationResult]:
+    def failed(message: str, overloaded: bool = False) -> List[ValidationResult]:
+        return [
+            ValidationResult(
+                filename, ErrorCodes.FAIL, message, False, overloaded=overloaded
+            )
+            for filename in filenames
+        ]
+
+    try:
+        jenkinsfiles: List[str] = [
+            filename.read_text(encoding="utf-8") for filename in filenames
+        ]
+    except (OSError, UnicodeDecodeError) as err:
+        return failed(f"Could not read the files to validate:\n{str(err)}")
+    payload: str = base64.b64encode(json.dumps(jenkinsfiles).encode()).decode()
+    script: str = VALIDATE_SCRIPT.replace("@JENKINSFILES@", payload).replace(
+        "@MARKER@", RESULTS_MARKER
+    )
+
+    try:
+        response: HTTPResponse = session.post(
+            "/scriptText",
+            body=urlencode({"script": script}),
+            headers={"Content-Type": "application/x-www-form-urlencoded"},
+        )
+    except Exception as err:
+        return failed(f"Connection failed:\n{str(err)}")
+    output: str = response.data.decode()
+    if 403 == response.status:
+        return failed(
+            "The script console needs the Overall/Administer permission, which this account does not have."
+        )
+    if response.status != 200:
+        return failed(
+            f"Connection failed: A status code of {response.status} was returned.",
+            overloaded=response.status in (429, 503),
+        )
+
+    verdicts: Optional[List[Dict[str, Any]]] = None
+    for line in output.splitlines():
+        if line.startswith(RESULTS_MARKER):
+            verdicts = json.loads(line[len(RESULTS_MARKER) :])
+    if verdicts is None or len(verdicts) != len(filenames):
+        return failed(f"The script console did not return the verdicts:\n{output}")
+    return [
+        ValidationResult(
+            filename,
+            ErrorCodes.OK if verdict["passed"] else ErrorCodes.FAIL,
+            verdict["message"],
+        )
+        for filename, verdict in zip(filenames, verdicts)
+    ]
+
+
+def lint_via_script_console(
+    filenames: Iterable[Path],
+    jenkins_url: str,
+    jenkins_login: str,
+    jenkins_api_token: str,
+    cache: Optional[ResultCache] = None,
+    jobs: int = 1,
+    crumb_store: Optional[CrumbStore] = None,
+    deadline: Optional[Deadline] = None,
+) -> ErrorCodes:
+    # Sends many files in one request to the script console, for accounts that may use it. The cache key
+    # is the controller URL, as over HTTP, since the verdicts are the same.
+    return_codes: List[ErrorCodes] = []
+    started: float = time.perf_counter()
+    pending = peek(resolve_cached(filenames, jenkins_url, cache, return_codes))
+    if pending is None:
+        return combine_return_codes(return_codes)
+
+    session = JenkinsSession(
+        jenkins_url, jenkins_login, jenkins_api_token, jobs, crumb_store, deadline
+    )
+    crumb: Optional[str] = None
+    error: str = ""
+    try:
+        with TIMINGS.span("crumb"):
+            crumb = session.ensure_crumb()
+    except Exception as err:
+        error = f"Connection failed:\n{str(err)}"
+    if not crumb:
+        if deadline is not None and deadline.expired:
+            # The crumb request ran out of time, so the files were not validated before the deadline
+            for filename, _ in pending:
+                result: ValidationResult = deadline.result(filename)
+                report_result(result)
+                return_codes.append(result.return_code)
+            return combine_return_codes(return_codes)
+        if len(error) > 0:
+            print(error)
+        else:
+            print(session.error)
+            print(NO_CRUMB)
+        return ErrorCodes.FAIL
+
+    keys: Dict[Path, str] = {}
+
+    def remember_keys() -> Iterator[Path]:
+        for filename, key in pending:
+            keys[filename] = key
+            yield filename
+
+    def validate(batch: List[Path]) -> List[ValidationResult]:
+        # Past the deadline no batch is sent, and one that ran out of time is left to the policy
+        if deadline is not None and deadline.expired:
+            return [deadline.result(filename) for filename in batch]
+        batch_started: float = time.perf_counter()
+        with TIMINGS.span("script_validate", "file", files=len(batch)):
+            results: List[ValidationResult] = script_validate(batch, session)
+        # Every file of the batch waited for the whole request
+        for result in results:
+            result.transport = "script"
+            result.duration = time.perf_counter() - batch_started
+        if deadline is not None and deadline.expired:
+            return [
+                result if result.is_verdict else deadline.result(result.filename)
+                for result in results
+            ]
+        return results
+
+    batch_results: Generator[List[ValidationResult], None, None] = validate_all(
+        validate, batches(remember_keys()), jobs, REPORTER.in_order
+    )
+    for results in batch_results:
+        for result in results:
+            report_result(result)
+            store_result(result, keys.pop(result.filename, ""), cache)
+            return_codes.append(result.return_code)
+        if REPORTER.stopped:
+            break
+    batch_results.close()
+
+    session.save_crumb()
+    TIMINGS.add("lint_via_script_console", "phase", started)
+    return combine_return_codes(return_codes)
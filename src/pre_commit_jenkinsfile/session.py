@@ -0,0 +1,248 @@
+import hashlib
+import json
+import os
+import socket
+import tempfile
+import threading
+import time
+from http.cookies import SimpleCookie
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import urllib3
+from urllib3 import HTTPResponse
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+from src.pre_commit_jenkinsfile.deadline import Deadline
+from src.pre_commit_jenkinsfile.hedge import abortable
+from src.pre_commit_jenkinsfile.timings import TIMINGS
+
+DEFAULT_CRUMB_TTL: float = 20 * 60
+
+# When the last connection opened on this thread was ready, so the request that needed it is timed
+# from then on
+_connected = threading.local()
+
+
+class _SessionHTTPConnection(HTTPConnection):
+    def connect(self) -> None:
+        # The DNS lookup and the TCP/TLS connection are a span of their own rather than part of the
+        # request that opened them
+        with TIMINGS.span("http_connect", host=self.host):
+            super().connect()
+        _connected.at = time.perf_counter()
+
+    def getresponse(self, *args, **kwargs) -> Any:
+        # A request that is taken back gives up the connection, so the controller sees it go away
+        with abortable(self._abort):
+            return super().getresponse(*args, **kwargs)
+
+    def _abort(self) -> None:
+        # Wakes the thread waiting for the response; closing the socket alone would not
+        sock: Optional[socket.socket] = self.sock
+        if sock is not None:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+
+class _SessionHTTPSConnection(_SessionHTTPConnection, HTTPSConnection):
+    pass
+
+
+class _SessionHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _SessionHTTPConnection
+
+
+class _SessionHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _SessionHTTPSConnection
+
+
+class CrumbStore:
+    # The crumb and session cookie grant access to the controller, so they are only readable by the owner
+    def __init__(self, cache_dir: Path, ttl: float = DEFAULT_CRUMB_TTL):
+        self.store_dir: Path = cache_dir / "crumbs"
+        self.ttl: float = ttl
+
+    def _entry_path(self, jenkins_url: str, jenkins_login: str) -> Path:
+        key: str = hashlib.sha256(
+            f"{jenkins_url}\0{jenkins_login}".encode()
+        ).hexdigest()
+        return self.store_dir / f"{key}.json"
+
+    def load(self, jenkins_url: str, jenkins_login: str) -> Optional[Dict[str, Any]]:
+        entry_path: Path = self._entry_path(jenkins_url, jenkins_login)
+        try:
+            entry: Dict[str, Any] = json.loads(entry_path.read_text())
+        except (OSError, ValueError):
+            return None
+
+        if entry.get("expires", 0.0) < time.time():
+            entry_path.unlink(missing_ok=True)
+            return None
+
+        return entry
+
+    def save(
+        self,
+        jenkins_url: str,
+        jenkins_login: str,
+        crumb: str,
+        cookies: Dict[str, str],
+    ) -> None:
+        entry_path: Path = self._entry_path(jenkins_url, jenkins_login)
+        entry: Dict[str, Any] = {
+            "crumb": crumb,
+            "cookies": cookies,
+            "expires": time.time() + self.ttl,
+        }
+        try:
+            self.store_dir.mkdir(mode=0o700, parents=True, exist_ok=True)
+            # mkstemp creates the file with mode 0600
+            file_descriptor, temp_name = tempfile.mkstemp(
+                dir=self.store_dir, suffix=".tmp"
+            )
+            with os.fdopen(file_descriptor, "w") as temp_file:
+                json.dump(entry, temp_file)
+            os.replace(temp_name, entry_path)
+        except OSError as err:
+            print(f"Could not save the crumb to {self.store_dir}:\n{str(err)}")
+
+    def clear(self, jenkins_url: str, jenkins_login: str) -> None:
+        self._entry_path(jenkins_url, jenkins_login).unlink(missing_ok=True)
+
+
+class JenkinsSession:
+    # A single connection pool for the crumb request and validation, which also keeps the session cookie
+    # that newer Jenkins versions tie the crumb to
+    def __init__(
+        self,
+        jenkins_url: str,
+        jenkins_login: str,
+        jenkins_api_token: str,
+        maxsize: int = 1,
+        crumb_store: Optional[CrumbStore] = None,
+        deadline: Optional[Deadline] = None,
+    ):
+        self.jenkins_url: str = jenkins_url
+        self.jenkins_login: str = jenkins_login
+        self.http = urllib3.PoolManager(maxsize=max(1, maxsize))
+        self.http.pool_classes_by_scheme = {
+            "http": _SessionHTTPConnectionPool,
+            "https": _SessionHTTPSConnectionPool,
+        }
+        self.crumb_store: Optional[CrumbStore] = crumb_store
+        self.deadline: Optional[Deadline] = deadline
+        self.crumb: Optional[str] = None
+        # Why the last crumb request failed
+        self.error: str = ""
+        self.cookies: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._auth_headers: Dict[str, str] = {}
+        if len(jenkins_login) > 0 and len(jenkins_api_token) > 0:
+            self._auth_headers = urllib3.make_headers(
+                basic_auth=f"{jenkins_login}:{jenkins_api_token}"
+            )
+
+    def headers(self) -> Dict[str, str]:
+        headers: Dict[str, str] = dict(self._auth_headers)
+        with self._lock:
+            if self.crumb:
+                crumb_parts = self.crumb.split(":", 1)
+                headers[crumb_parts[0]] = crumb_parts[1]
+            if len(self.cookies) > 0:
+                headers["Cookie"] = "; ".join(
+                    f"{name}={value}" for name, value in self.cookies.items()
+                )
+        return headers
+
+    def _remember_cookies(self, response: HTTPResponse) -> None:
+        for header in response.headers.getlist("Set-Cookie"):
+            cookie: SimpleCookie = SimpleCookie()
+            cookie.load(header)
+            with self._lock:
+                for name, morsel in cookie.items():
+                    self.cookies[name] = morsel.value
+
+    def request(self, method: str, path: str, **kwargs) -> HTTPResponse:
+        headers: Dict[str, str] = self.headers()
+        headers.update(kwargs.pop("headers", {}))
+        if self.deadline is not None:
+            # A retry would start over with the time that is left, so there is none
+            kwargs.update(
+                timeout=urllib3.Timeout(total=self.deadline.timeout()), retries=False
+            )
+        response: HTTPResponse = self.http.request(
+            method, f"{self.jenkins_url}{path}", headers=headers, **kwargs
+        )
+        self._remember_cookies(response)
+        return response
+
+    def fetch_crumb(self) -> Optional[str]:
+        with self._lock:
+            self.crumb = None
+            self.cookies = {}
+        _connected.at = time.perf_counter()
+        try:
+            response: HTTPResponse = self.request(
+                "GET",
+                '/crumbIssuer/api/xml?xpath=concat(//crumbRequestField,":",//crumb)',
+            )
+        finally:
+            # The first request on the session opens the connection in its own http_connect span
+            TIMINGS.add("crumb_request", "phase", _connected.at)
+        if response.status == 200:
+            with self._lock:
+                self.crumb = response.data.decode()
+            self.save_crumb()
+        else:
+            response_message: str = response.data.decode()
+            if "Authentication required" in response_message:
+                self.error = (
+                    f"Requesting a crumb from the Jenkins server failed due to an authentication failure "
+                    f"(status {response.status})."
+                )
+            else:
+                self.error = (
+                    f"Requesting the crumb field from the Jenkins server failed with status {response.status}:"
+                    f"\n{response_message}."
+                )
+
+        return self.crumb
+
+    def ensure_crumb(self) -> Optional[str]:
+        if self.crumb is None and self.crumb_store is not None:
+            entry = self.crumb_store.load(self.jenkins_url, self.jenkins_login)
+            if entry is not None:
+                with self._lock:
+                    self.crumb = entry["crumb"]
+                    self.cookies = dict(entry.get("cookies", {}))
+        if self.crumb is None:
+            self.fetch_crumb()
+        return self.crumb
+
+    def refresh_crumb(self, stale_crumb: Optional[str]) -> Optional[str]:
+        # Several workers can hit the same 403 at once; only the first one fetches a new crumb
+        with self._refresh_lock:
+            if self.crumb != stale_crumb:
+                return self.crumb
+            if self.crumb_store is not None:
+                self.crumb_store.clear(self.jenkins_url, self.jenkins_login)
+            return self.fetch_crumb()
+
+    def post(self, path: str, **kwargs) -> HTTPResponse:
+        crumb: Optional[str] = self.crumb
+        response: HTTPResponse = self.request("POST", path, **kwargs)
+        if response.status == 403 and self.refresh_crumb(crumb):
+            response = self.request("POST", path, **kwargs)
+        return response
+
+    def save_crumb(self) -> None:
+        with self._lock:
+            crumb: Optional[str] = self.crumb
+            cookies: Dict[str, str] = dict(self.cookies)
+        if self.crumb_store is not None and crumb:
+            self.crumb_store.save(self.jenkins_url, self.jenkins_login, crumb, cookies)
@@ -0,0 +1,104 @@
+import json
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Union
+
+from src.pre_commit_jenkinsfile.cache import (
+    ResultCache,
+    content_key,
+    entry_result,
+    split_key,
+)
+from src.pre_commit_jenkinsfile.results import ValidationResult
+from src.pre_commit_jenkinsfile.timings import TIMINGS
+
+# The plugin that implements the declarative linter; its version decides the verdicts
+LINTER_PLUGIN: str = "pipeline-model-definition"
+HTTP_TIMEOUT: float = 2.0
+
+
+def versions_id(jenkins_version: str, plugin_version: str) -> str:
+    return f"jenkins={jenkins_version};{LINTER_PLUGIN}={plugin_version}"
+
+
+def describe_versions_error(err: Exception) -> str:
+    return f"Could not read the plugin versions of the Jenkins server, so the shared result store is not used:\n{str(err)}"
+
+
+def store_key(content: bytes, versions: str) -> str:
+    # Verdicts are shared between controllers, so the key names the versions instead of the controller.
+    # Upgrading Jenkins or the plugin changes every key and so retires the old verdicts.
+    return content_key(content, versions)
+
+
+class HttpStore:
+    # A plain key-value service: GET <url>/<key> returns an entry stored with PUT <url>/<key>. The store
+    # only ever saves work, so any failure to reach it counts as a miss.
+    def __init__(self, url: str):
+        import urllib3
+
+        self.url: str = url.rstrip("/")
+        self.http = urllib3.PoolManager(
+            maxsize=4, retries=False, timeout=urllib3.Timeout(total=HTTP_TIMEOUT)
+        )
+
+    def get(self, key: str, filename: Path) -> Optional[ValidationResult]:
+        try:
+            response = self.http.request("GET", f"{self.url}/{split_key(key)[0]}")
+            if response.status != 200:
+                return None
+            return entry_result(json.loads(response.data), key, filename)
+        except Exception:
+            return None
+
+    def put(self, key: str, result: ValidationResult) -> None:
+        if not result.is_verdict:
+            return
+        entry: Dict[str, Any] = {
+            "return_code": int(result.return_code),
+            "message": result.message,
+            "source": split_key(key)[1],
+        }
+        try:
+            self.http.request(
+                "PUT",
+                f"{self.url}/{split_key(key)[0]}",
+                body=json.dumps(entry).encode(),
+                headers={"Content-Type": "application/json"},
+            )
+        except Exception as err:
+            print(f"Could not write to the shared result store {self.url}:\n{str(err)}")
+
+
+SharedStore = Union[ResultCache, HttpStore]
+
+
+def open_store(location: str, ttl: float) -> SharedStore:
+    # A directory, which may be on a network file system, or the URL of a key-value service
+    if location.startswith(("http://", "https://")):
+        return HttpStore(location)
+    # Entries are renamed into place, which is atomic on NFS as well
+    return ResultCache(Path(location), ttl=ttl)
+
+
+def with_shared_store(
+    validate: Callable[[Path], ValidationResult],
+    store: SharedStore,
+    versions: str,
+) -> Callable[[Path], ValidationResult]:
+    # Answers from the shared store when a teammate already validated the same content against the same
+    # versions, and writes every new verdict back for the next one
+    def run(filename: Path) -> ValidationResult:
+        try:
+            key: str = store_key(filename.read_bytes(), versions)
+        except OSError:
+            return validate(filename)
+        with TIMINGS.span("shared_lookup", "file", file=str(filename)):
+            hit: Optional[ValidationResult] = store.get(key, filename)
+        if hit is not None:
+            hit.transport = "shared"
+            return hit
+        result: ValidationResult = validate(filename)
+        store.put(key, result)
+        return result
+
+    return run
@@ -0,0 +1,194 @@
+import socket
+from pathlib import Path
+from typing import Iterable, List, Optional
+
+import paramiko
+from paramiko import (
+    SSHClient,
+    SSHException,
+    BadHostKeyException,
+    AuthenticationException,
+    AutoAddPolicy,
+)
+
+from src.pre_commit_jenkinsfile.cache import ResultCache
+from src.pre_commit_jenkinsfile.config import Config
+from src.pre_commit_jenkinsfile.hedge import abortable
+from src.pre_commit_jenkinsfile.limiter import AdaptiveLimiter
+from src.pre_commit_jenkinsfile.results import ErrorCodes, ValidationResult
+from src.pre_commit_jenkinsfile.shared_store import (
+    LINTER_PLUGIN,
+    SharedStore,
+    versions_id,
+)
+from src.pre_commit_jenkinsfile.timings import TIMINGS
+from src.pre_commit_jenkinsfile.transport import iter_chunks
+
+
+def connect(
+    jenkins_hostname: str, jenkins_ssh_port: int, timeout: Optional[float] = None
+) -> SSHClient:
+    client = SSHClient()
+    try:
+        client.set_missing_host_key_policy(AutoAddPolicy())
+        client.load_system_host_keys()
+        # Open the socket separately so that DNS and TCP are timed apart from the SSH handshake
+        with TIMINGS.span("ssh_tcp_connect"):
+            sock: socket.socket = socket.create_connection(
+                (jenkins_hostname, jenkins_ssh_port), timeout
+            )
+            # The file is written in packets smaller than a TCP segment, which Nagle's algorithm would
+            # hold back until the previous one is acknowledged
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        with TIMINGS.span("ssh_handshake_auth"):
+            client.connect(
+                jenkins_hostname,
+                port=jenkins_ssh_port,
+                sock=sock,
+                timeout=timeout,
+                banner_timeout=timeout,
+                auth_timeout=timeout,
+            )
+    except BaseException:
+        client.close()
+        raise
+
+    return client
+
+
+def describe_error(err: Exception) -> str:
+    if isinstance(err, BadHostKeyException):
+        return f"Connection to the server failed because the hostkey could not be verified:\n{str(err)}"
+    if isinstance(err, AuthenticationException):
+        return f"Authentication with the server failed:\n{str(err)}"
+    if isinstance(err, SSHException):
+        return f"Error establishing an SSH connection: \n{str(err)}"
+    if isinstance(err, OSError):
+        # socket.error is a deprecated alias of OSError
+        return f"A socket error occurred during the attempt to connect to the server: \n{str(err)}"
+    return f"An unexpected error occurred:\n{str(err)}"
+
+
+def lint_via_ssh(
+    filenames: Iterable[Path],
+    jenkins_hostname: str,
+    jenkins_jenkins_ssh_port: int,
+    cache: Optional[ResultCache] = None,
+    jobs: int = 1,
+    limiter: Optional[AdaptiveLimiter] = None,
+    shared_store: Optional[SharedStore] = None,
+) -> ErrorCodes:
+    # Validates and reports the files like the hook does with --transport ssh. The Linter and the
+    # hook import this module, so they are only imported here.
+    from src.pre_commit_jenkinsfile.lint_jenkinsfile import report_all
+    from src.pre_commit_jenkinsfile.linter import Linter
+
+    config = Config(
+        jenkins_hostname=jenkins_hostname, jenkins_ssh_port=jenkins_jenkins_ssh_port
+    )
+    with Linter(
+        config,
+        cache,
+        jobs,
+        limiter,
+        None,
+        shared_store,
+        offline_check=False,
+        notify=print,
+        transport="ssh",
+    ) as linter:
+        return report_all(linter, filenames)
+
+
+def run_command(client: paramiko.SSHClient, command: str) -> str:
+    stdin_channel, stdout_channel, stderr_channel = client.exec_command(command)
+    stdin_channel.channel.shutdown_write()
+    output: str = stdout_channel.read().decode()
+    exit_status: int = stdout_channel.channel.recv_exit_status()
+    if exit_status != 0:
+        raise SSHException(
+            f'The "{command}" command exited with {exit_status}:\n{stderr_channel.read().decode()}'
+        )
+    return output
+
+
+def controller_versions(client: paramiko.SSHClient) -> str:
+    jenkins_version: str = run_command(client, "version").strip()
+    # e.g. "pipeline-model-definition  Pipeline: Declarative  2.2184.v0b_96b_b_1d0c5e (2.2198.v41dd8ef6dd56)",
+    # where the version in brackets is an available update
+    plugin: List[str] = [
+        token
+        for token in run_command(client, f"list-plugins {LINTER_PLUGIN}").split()
+        if not token.startswith("(")
+    ]
+    if len(jenkins_version) == 0 or len(plugin) < 2:
+        raise SSHException(f"The {LINTER_PLUGIN} plugin is not installed.")
+    return versions_id(jenkins_version, plugin[-1])
+
+
+def channel_refused(client: paramiko.SSHClient, err: SSHException) -> bool:
+    # paramiko keeps a single pending exception per connection, so when several channels are refused
+    # at once only one of them sees the ChannelException and the others a plain "Unable to open
+    # channel." while the connection itself is still up
+    if isinstance(err, paramiko.ChannelException):
+        return True
+    transport: Optional[paramiko.Transport] = client.get_transport()
+    return (
+        transport is not None
+        and transport.is_active()
+        and "Unable to open channel" in str(err)
+    )
+
+
+def ssh_validate(
+    client: paramiko.SSHClient, filename: Path, timeout: Optional[float] = None
+) -> ValidationResult:
+    result: ValidationResult
+
+    if filename.exists():
+        try:
+            stdin_channel, stdout_channel, stderr_channel = client.exec_command(
+                "declarative-linter", timeout=timeout
+            )
+
+            # Closing the channel of a request that is taken back stops the linter on the controller
+            with abortable(stdout_channel.channel.close):
+                # Write the file contents to stdin; declarative-linter will wait for stdin input.
+                # sendall waits whenever the controller's receive window is full, where a single send
+                # would silently drop the rest of the file.
+                for chunk in iter_chunks(filename):
+                    stdin_channel.channel.sendall(chunk)
+                stdin_channel.channel.shutdown_write()
+
+                # Block until finished. Closing the channel on a timeout stops the linter as well.
+                if not stdout_channel.channel.status_event.wait(timeout):
+                    stdout_channel.channel.close()
+                    raise SSHException(
+                        "Timed out waiting for the declarative-linter command."
+                    )
+                exit_status: int = stdout_channel.channel.recv_exit_status()
+                stdout: str = stdout_channel.read().decode()
+
+            return_code: ErrorCodes = (
+                ErrorCodes.OK if 0 == exit_status else ErrorCodes.FAIL
+            )
+            result = ValidationResult(filename, return_code, stdout)
+
+        except SSHException as err:
+            # The server refuses to open more channels than it allows per connection
+            result = ValidationResult(
+                filename,
+                ErrorCodes.FAIL,
+                f'Failed to execute the "declarative-linter" command on the Jenkins server:\n{str(err)}',
+                is_verdict=False,
+                overloaded=channel_refused(client, err),
+            )
+    else:
+        result = ValidationResult(
+            filename,
+            ErrorCodes.FAIL,
+            f'The file "{str(filename)} does not exist.',
+            is_verdict=False,
+        )
+
+    return result
@@ -0,0 +1,395 @@
+import hashlib
+import re
+from pathlib import Path
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from src.pre_commit_jenkinsfile.results import ErrorCodes, ValidationResult
+
+# The sections allowed directly inside the declarative pipeline block
+PIPELINE_SECTIONS = {
+    "agent",
+    "environment",
+    "libraries",
+    "options",
+    "parameters",
+    "post",
+    "stages",
+    "tools",
+    "triggers",
+}
+REQUIRED_SECTIONS = ("agent", "stages")
+
+OPENING_BRACKETS: Dict[str, str] = {"{": "}", "(": ")", "[": "]"}
+CLOSING_BRACKETS: Dict[str, str] = {"}": "{", ")": "(", "]": "["}
+
+# Alternatives are tried in order, so terminated forms come before their unterminated prefixes
+TOKEN_PATTERN = re.compile(
+    r"""
+    (?P<newline>\n)
+    |(?P<space>[ \t\f\r]+|\\\r?\n)
+    |(?P<line_comment>//[^\n]*)
+    |(?P<block_comment>/\*.*?\*/)
+    |(?P<string>'''.*?(?<!\\)'''|\"\"\".*?(?<!\\)\"\"\"|\$/.*?/\$)
+    |(?P<unterminated>'''|\"\"\"|\$/|/\*)
+    |(?P<quoted>'(?:\\.|[^\\'\n])*'|"(?:\\.|[^\\"\n])*")
+    |(?P<unterminated_quoted>['"])
+    |(?P<identifier>[A-Za-z_$][\w$]*)
+    |(?P<number>\d[\w.]*)
+    |(?P<operator>.)
+    """,
+    re.VERBOSE | re.DOTALL,
+)
+SLASHY_PATTERN = re.compile(r"/(?:\\.|[^\\/])+/", re.DOTALL)
+SINGLE_QUOTED_PATTERN = re.compile(r"'''.*?(?<!\\)'''|'(?:\\.|[^\\'\n])*'", re.DOTALL)
+# Characters that make up Groovy's operators of more than one character, such as == or ?.
+JOINING_OPERATORS = set("!%&*+-./:<=>?@^|~")
+
+
+class Token(NamedTuple):
+    kind: str
+    value: str
+    line: int
+    column: int
+
+
+class SyntaxIssue(NamedTuple):
+    line: int
+    column: int
+    message: str
+
+    def __str__(self) -> str:
+        return f"WorkflowScript: {self.line}: {self.message} @ line {self.line}, column {self.column}."
+
+
+class JenkinsfileSyntaxError(ValueError):
+    def __init__(self, issue: SyntaxIssue):
+        super().__init__(str(issue))
+        self.issue: SyntaxIssue = issue
+
+
+def _is_value(token: Optional[Token]) -> bool:
+    # A slash after a value is a division, anywhere else it starts a slashy string
+    return token is not None and (
+        token.kind in ("identifier", "number", "string")
+        or token.value in CLOSING_BRACKETS
+    )
+
+
+def _skip_gstring(text: str, position: int) -> Optional[int]:
+    # Returns the end of the double quoted string starting at position, or None when it is not
+    # terminated. The code in ${...} is skipped with its own strings and braces, so the quotes of a
+    # string inside it do not end the outer one.
+    delimiter: str = '"""' if text.startswith('"""', position) else '"'
+    index: int = position + len(delimiter)
+    while index < len(text):
+        if "\\" == text[index]:
+            index += 2
+        elif text.startswith(delimiter, index):
+            return index + len(delimiter)
+        elif "\n" == text[index] and '"' == delimiter:
+            return None
+        elif text.startswith("${", index):
+            end: Optional[int] = _skip_interpolation(text, index + 2)
+            if end is None:
+                return None
+            index = end
+        else:
+            index += 1
+    return None
+
+
+def _skip_interpolation(text: str, position: int) -> Optional[int]:
+    # Returns the position after the brace that closes the ${ before position
+    depth: int = 1
+    index: int = position
+    while index < len(text):
+        end: Optional[int]
+        if '"' == text[index]:
+            end = _skip_gstring(text, index)
+        elif "'" == text[index]:
+            match = SINGLE_QUOTED_PATTERN.match(text, index)
+            end = None if match is None else match.end()
+        else:
+            if "{" == text[index]:
+                depth += 1
+            elif "}" == text[index]:
+                depth -= 1
+                if 0 == depth:
+                    return index + 1
+            index += 1
+            continue
+        if end is None:
+            return None
+        index = end
+    return None
+
+
+def tokenize(text: str) -> List[Token]:
+    return list(iter_tokens(text))
+
+
+def iter_tokens(text: str) -> Iterator[Token]:
+    position: int = 0
+    line: int = 1
+    line_start: int = 0
+    previous: Optional[Token] = None
+
+    # A shebang line is not Groovy
+    if text.startswith("#!"):
+        position = text.find("\n")
+        position = len(text) if position < 0 else position
+
+    while position < len(text):
+        match = TOKEN_PATTERN.match(text, position)
+        # The pattern ends with a catch-all alternative, so it always matches
+        assert match is not None
+        kind: str = match.lastgroup or "operator"
+        end: int = match.end()
+        column: int = position - line_start + 1
+
+        if "/" == match.group() and not _is_value(previous):
+            slashy = SLASHY_PATTERN.match(text, position)
+            if slashy is not None:
+                kind, end = "string", slashy.end()
+        elif match.group().startswith('"'):
+            # GStrings are scanned by hand, since ${...} may hold further strings
+            gstring_end: Optional[int] = _skip_gstring(text, position)
+            if gstring_end is None:
+                kind = "unterminated"
+                end = position + (3 if text.startswith('"""', position) else 1)
+            else:
+                kind, end = "string", gstring_end
+        value: str = text[position:end]
+
+        if kind.startswith("unterminated"):
+            what: str = "comment" if "/*" == value else "string"
+            raise JenkinsfileSyntaxError(
+                SyntaxIssue(line, column, f"Unterminated {what} starting with {value}")
+            )
+
+        if kind in ("string", "quoted"):
+            kind = "string"
+        if kind == "newline" or (kind == "block_comment" and "\n" in value):
+            kind = "newline"
+
+        if kind not in ("space", "line_comment", "block_comment"):
+            token = Token(kind, "\n" if kind == "newline" else value, line, column)
+            yield token
+            if kind != "newline":
+                previous = token
+
+        newlines: int = text.count("\n", position, end)
+        if newlines > 0:
+            line += newlines
+            line_start = text.rindex("\n", position, end) + 1
+        position = end
+
+
+def canonical_digest(content: bytes) -> str:
+    # Hashes the tokens rather than the text, so comments, indentation, blank lines and trailing
+    # whitespace do not change the digest while string literals and line breaks between statements do.
+    # Operators are single tokens of one character, so a gap between two that could form one operator
+    # is kept: "= =" is not "==".
+    # Files the tokenizer rejects are hashed as they are.
+    digest = hashlib.sha256(b"tokens\0")
+    try:
+        text: str = content.decode()
+        # Runs of line breaks count as one, and those before the first token not at all
+        seen_token: bool = False
+        pending_newline: bool = False
+        previous: Optional[Token] = None
+        for token in iter_tokens(text):
+            if "newline" == token.kind:
+                pending_newline = seen_token
+                continue
+            if pending_newline:
+                digest.update(b"\n\0")
+                pending_newline = False
+            elif (
+                previous is not None
+                and previous.value in JOINING_OPERATORS
+                and token.value in JOINING_OPERATORS
+                and (previous.line, previous.column + 1) != (token.line, token.column)
+            ):
+                digest.update(b" \0")
+            seen_token = True
+            previous = token
+            digest.update(token.value.encode())
+            digest.update(b"\0")
+    except (UnicodeDecodeError, JenkinsfileSyntaxError):
+        return hashlib.sha256(b"bytes\0" + content).hexdigest()
+    return digest.hexdigest()
+
+
+def check_brackets(tokens: List[Token]) -> List[SyntaxIssue]:
+    stack: List[Token] = []
+    for token in tokens:
+        if token.kind != "operator":
+            continue
+        if token.value in OPENING_BRACKETS:
+            stack.append(token)
+        elif token.value in CLOSING_BRACKETS:
+            if len(stack) == 0:
+                return [
+                    SyntaxIssue(token.line, token.column, f"Unexpected '{token.value}'")
+                ]
+            opening: Token = stack.pop()
+            if CLOSING_BRACKETS[token.value] != opening.value:
+                return [
+                    SyntaxIssue(
+                        token.line,
+                        token.column,
+                        f"Expected '{OPENING_BRACKETS[opening.value]}' to close '{opening.value}' "
+                        f"opened at line {opening.line}, column {opening.column} but found '{token.value}'",
+                    )
+                ]
+
+    return [
+        SyntaxIssue(
+            opening.line,
+            opening.column,
+            f"Missing '{OPENING_BRACKETS[opening.value]}' to close '{opening.value}'",
+        )
+        for opening in reversed(stack)
+    ][:1]
+
+
+def _next_significant(tokens: List[Token], index: int) -> int:
+    while index < len(tokens) and tokens[index].kind == "newline":
+        index += 1
+    return index
+
+
+def _find_pipeline(tokens: List[Token]) -> Optional[Tuple[int, Token]]:
+    # Returns the index of the opening brace of a top level "pipeline { ... }" block
+    depth: int = 0
+    for index, token in enumerate(tokens):
+        if token.kind == "operator":
+            if token.value in OPENING_BRACKETS:
+                depth += 1
+            elif token.value in CLOSING_BRACKETS:
+                depth -= 1
+        elif 0 == depth and "pipeline" == token.value and token.kind == "identifier":
+            following: int = _next_significant(tokens, index + 1)
+            if following < len(tokens) and "{" == tokens[following].value:
+                return following, token
+    return None
+
+
+def check_pipeline(tokens: List[Token]) -> List[SyntaxIssue]:
+    issues: List[SyntaxIssue] = []
+    found = _find_pipeline(tokens)
+    if found is None:
+        # Scripted pipelines and shared library code are left to the controller
+        return issues
+    start, pipeline = found
+
+    sections: Dict[str, Token] = {}
+    depth: int = 0
+    at_statement_start: bool = True
+    index: int = start + 1
+    while index < len(tokens):
+        token: Token = tokens[index]
+        if token.kind == "newline" or ";" == token.value:
+            at_statement_start = True
+        elif token.kind == "operator" and token.value in CLOSING_BRACKETS:
+            if 0 == depth:
+                break
+            depth -= 1
+            at_statement_start = 0 == depth
+        elif token.kind == "operator" and token.value in OPENING_BRACKETS:
+            depth += 1
+            at_statement_start = False
+        else:
+            if 0 == depth and at_statement_start and token.kind == "identifier":
+                issues.extend(_check_section(tokens, index, sections))
+            at_statement_start = False
+        index += 1
+
+    for required in REQUIRED_SECTIONS:
+        if required not in sections:
+            issues.append(
+                SyntaxIssue(
+                    pipeline.line,
+                    pipeline.column,
+                    f'Missing required section "{required}"',
+                )
+            )
+
+    return sorted(issues)
+
+
+def _check_section(
+    tokens: List[Token], index: int, sections: Dict[str, Token]
+) -> List[SyntaxIssue]:
+    token: Token = tokens[index]
+    if token.value not in PIPELINE_SECTIONS:
+        return [
+            SyntaxIssue(token.line, token.column, f'Undefined section "{token.value}"')
+        ]
+    if token.value in sections:
+        return [
+            SyntaxIssue(
+                token.line,
+                token.column,
+                f'Multiple occurrences of the "{token.value}" section',
+            )
+        ]
+    sections[token.value] = token
+
+    following: int = _next_significant(tokens, index + 1)
+    on_same_line: bool = following == index + 1
+    if (
+        following == len(tokens)
+        or tokens[following].value in (";", "}")
+        or (not on_same_line and "{" != tokens[following].value)
+    ):
+        return [
+            SyntaxIssue(
+                token.line,
+                token.column,
+                f'Not a valid section definition: "{token.value}". Some extra configuration is required',
+            )
+        ]
+
+    if "stages" == token.value and "{" == tokens[following].value:
+        body: int = _next_significant(tokens, following + 1)
+        if body < len(tokens) and "}" == tokens[body].value:
+            return [SyntaxIssue(token.line, token.column, "No stages specified")]
+
+    return []
+
+
+def check_structure(text: str) -> List[SyntaxIssue]:
+    try:
+        tokens: List[Token] = tokenize(text)
+    except JenkinsfileSyntaxError as err:
+        return [err.issue]
+
+    issues: List[SyntaxIssue] = check_brackets(tokens)
+    if len(issues) == 0:
+        issues = check_pipeline(tokens)
+    return issues
+
+
+def check_file(filename: Path) -> ValidationResult:
+    try:
+        text: str = filename.read_text()
+    except (OSError, UnicodeDecodeError) as err:
+        return ValidationResult(
+            filename,
+            ErrorCodes.FAIL,
+            f'The file "{str(filename)}" could not be read:\n{str(err)}',
+            is_verdict=False,
+        )
+
+    issues: List[SyntaxIssue] = check_structure(text)
+    if len(issues) > 0:
+        message: str = "\n".join(str(issue) for issue in issues)
+        return ValidationResult(
+            filename,
+            ErrorCodes.FAIL,
+            f"Errors encountered validating Jenkinsfile:\n{message}",
+        )
+
+    return ValidationResult(filename, ErrorCodes.OK)
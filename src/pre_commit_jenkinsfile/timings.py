@@ -0,0 +1,96 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional
+
+
+class Span(NamedTuple):
+    name: str
+    category: str
+    start: float
+    duration: float
+    thread_id: int
+    args: Dict[str, Any]
+
+
+class Timings:
+    # Records monotonic spans for the phases of a run and the validation of each file. Recording is
+    # off by default so that an ordinary hook run only pays for a flag check.
+    def __init__(self):
+        self.enabled: bool = False
+        self.spans: List[Span] = []
+        self.origin: float = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def reset(self, enabled: bool, origin: Optional[float] = None) -> None:
+        with self._lock:
+            self.enabled = enabled
+            self.spans = []
+            self.origin = time.perf_counter() if origin is None else origin
+
+    def add(self, name: str, category: str, start: float, **args) -> None:
+        if self.enabled:
+            span = Span(
+                name,
+                category,
+                start - self.origin,
+                time.perf_counter() - start,
+                threading.get_ident(),
+                args,
+            )
+            with self._lock:
+                self.spans.append(span)
+
+    @contextmanager
+    def span(self, name: str, category: str = "phase", **args) -> Iterator[None]:
+        if not self.enabled:
+            yield
+            return
+
+        start: float = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, category, start, **args)
+
+    def summary(self) -> str:
+        totals: Dict[str, List[float]] = {}
+        with self._lock:
+            for span in sorted(self.spans, key=lambda span: span.start):
+                totals.setdefault(span.name, []).append(span.duration * 1000)
+
+        lines: List[str] = [
+            f"{'Phase':<24}{'Count':>8}{'Total ms':>12}{'Mean ms':>12}{'Max ms':>12}"
+        ]
+        for name, durations in totals.items():
+            lines.append(
+                f"{name:<24}{len(durations):>8}{sum(durations):>12.1f}"
+                f"{sum(durations) / len(durations):>12.1f}{max(durations):>12.1f}"
+            )
+        return "\n".join(lines)
+
+    def write_trace(self, trace_file: Path) -> None:
+        # The Chrome trace event format, readable by chrome://tracing and Perfetto
+        with self._lock:
+            events: List[Dict[str, Any]] = [
+                {
+                    "name": span.name,
+                    "cat": span.category,
+                    "ph": "X",
+                    "ts": span.start * 1e6,
+                    "dur": span.duration * 1e6,
+                    "pid": os.getpid(),
+                    "tid": span.thread_id,
+                    "args": span.args,
+                }
+                for span in self.spans
+            ]
+        trace_file.write_text(
+            json.dumps({"traceEvents": events, "displayTimeUnit": "ms"})
+        )
+
+
+TIMINGS = Timings()
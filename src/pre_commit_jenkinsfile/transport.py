@@ -0,0 +1,234 @@
+import itertools
+import mmap
+import queue
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import (
+    Any,
+    Callable,
+    Deque,
+    Generator,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    TypeVar,
+)
+
+from src.pre_commit_jenkinsfile.cache import ResultCache
+from src.pre_commit_jenkinsfile.limiter import (
+    OVERLOAD_RETRIES,
+    RETRY_DELAY,
+    AdaptiveLimiter,
+)
+from src.pre_commit_jenkinsfile.results import (
+    REPORTER,
+    ErrorCodes,
+    ValidationResult,
+    report_result,
+)
+from src.pre_commit_jenkinsfile.timings import TIMINGS
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+# The largest payload of an SSH packet, and a good size for HTTP writes as well
+UPLOAD_CHUNK_SIZE: int = 32768
+# How many files read_ahead checks before the first one is taken
+READ_AHEAD: int = 64
+
+
+def peek(items: Iterable[T]) -> Optional[Iterator[T]]:
+    # Returns None when there are no items, otherwise an iterator over all of them
+    iterator: Iterator[T] = iter(items)
+    for first in iterator:
+        return itertools.chain([first], iterator)
+    return None
+
+
+def read_ahead(items: Iterable[T], limit: int = READ_AHEAD) -> Iterator[T]:
+    # Produces the items on a background thread, up to limit ahead of the consumer, so files are read,
+    # checked and hashed while the consumer waits, e.g. for the connection to the controller. Closing
+    # the iterator stops the thread after the item it is working on, and waits for it, so the caller
+    # can go on with the rest of items.
+    buffer: "queue.Queue[Tuple[bool, Any]]" = queue.Queue(limit)
+    stopped = threading.Event()
+
+    def put(entry: Tuple[bool, Any]) -> bool:
+        while not stopped.is_set():
+            try:
+                buffer.put(entry, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def produce() -> None:
+        # Each entry is (True, item), or (False, None) at the end, or (False, error)
+        try:
+            for item in items:
+                if not put((True, item)):
+                    return
+        except Exception as err:
+            put((False, err))
+            return
+        put((False, None))
+
+    producer = threading.Thread(target=produce, daemon=True)
+    producer.start()
+    try:
+        while True:
+            is_item, value = buffer.get()
+            if not is_item:
+                if value is not None:
+                    raise value
+                return
+            yield value
+    finally:
+        stopped.set()
+        producer.join()
+
+
+def iter_chunks(filename: Path, chunk_size: int = UPLOAD_CHUNK_SIZE) -> Iterator[bytes]:
+    # Reads the file a chunk at a time, so uploads take the same memory whatever the size of the file.
+    # A memory map lets the kernel page the file in without copying it through a read buffer.
+    with open(filename, "rb") as source:
+        try:
+            mapped = mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ)
+        except (ValueError, OSError):
+            # Empty files and pipes cannot be mapped
+            mapped = None
+        if mapped is None:
+            for chunk in iter(lambda: source.read(chunk_size), b""):
+                yield chunk
+            return
+        with mapped:
+            for offset in range(0, len(mapped), chunk_size):
+                yield mapped[offset : offset + chunk_size]
+
+
+def resolve_cached(
+    filenames: Iterable[Path],
+    controller: str,
+    cache: Optional[ResultCache],
+    return_codes: List[ErrorCodes],
+) -> Iterator[Tuple[Path, str]]:
+    # Reports cache hits as they are found and yields the files that still need validating along with
+    # their cache keys. The return codes of the hits are added to return_codes.
+    for filename in filenames:
+        if REPORTER.stopped:
+            return
+        if cache is None:
+            yield filename, ""
+            continue
+
+        with TIMINGS.span("cache_lookup", "file", file=str(filename)):
+            hit, key = cache.find(filename, controller)
+        if hit is None:
+            yield filename, key
+        else:
+            hit.transport = "cache"
+            report_result(hit)
+            return_codes.append(hit.return_code)
+
+
+def store_result(
+    result: ValidationResult, cache_key: str, cache: Optional[ResultCache]
+) -> None:
+    if cache is not None and len(cache_key) > 0:
+        cache.put(cache_key, result)
+
+
+def timed(
+    validate: Callable[[Path], ValidationResult], transport: str
+) -> Callable[[Path], ValidationResult]:
+    def run(filename: Path) -> ValidationResult:
+        started: float = time.perf_counter()
+        result: ValidationResult = validate(filename)
+        result.transport = result.transport or transport
+        result.duration = time.perf_counter() - started
+        return result
+
+    return run
+
+
+def limited(
+    validate: Callable[[Path], ValidationResult], limiter: AdaptiveLimiter
+) -> Callable[[Path], ValidationResult]:
+    # Waits for the limiter before each request, and sends a file again when the controller was too
+    # busy to take it. Before each retry it waits a random time of up to twice as long as the time
+    # before, so the requests in flight can finish, the limit can come down and the files that were
+    # turned away together are not all sent again at once.
+    def run(filename: Path) -> ValidationResult:
+        for attempt in range(1 + OVERLOAD_RETRIES):
+            if attempt > 0:
+                time.sleep(
+                    random.uniform(0, 2**attempt)
+                    * max(RETRY_DELAY, limiter.long_latency)
+                )
+            epoch: int = limiter.acquire()
+            started: float = time.perf_counter()
+            try:
+                result: ValidationResult = validate(filename)
+            except BaseException:
+                limiter.release(epoch, time.perf_counter() - started)
+                raise
+            limiter.release(epoch, time.perf_counter() - started, result.overloaded)
+            if not result.overloaded:
+                break
+        return result
+
+    return run
+
+
+def validate_all(
+    validate: Callable[[T], R],
+    filenames: Iterable[T],
+    jobs: int,
+    in_order: bool = True,
+) -> Generator[R, None, None]:
+    # Results are yielded in the order of filenames, or as soon as each one finishes. Files are only
+    # taken from filenames as workers free up, so it can be a stream that is still being produced, and
+    # closing the iterator early leaves the rest unsent. A batch transport passes lists of files.
+    if jobs <= 1:
+        yield from map(validate, filenames)
+        return
+
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        in_flight: Deque[Future] = deque()
+        try:
+            for filename in filenames:
+                in_flight.append(executor.submit(validate, filename))
+                if in_order:
+                    # Queue a few more than the workers so a slow file at the head does not idle them
+                    while len(in_flight) >= 2 * jobs or (
+                        len(in_flight) > 0 and in_flight[0].done()
+                    ):
+                        yield in_flight.popleft().result()
+                elif len(in_flight) >= jobs or any(
+                    future.done() for future in in_flight
+                ):
+                    yield from _finished(in_flight)
+
+            while len(in_flight) > 0:
+                if in_order:
+                    yield in_flight.popleft().result()
+                else:
+                    yield from _finished(in_flight)
+        finally:
+            for future in in_flight:
+                future.cancel()
+
+
+def _finished(in_flight: Deque[Future]) -> Iterator[Any]:
+    done: Set[Future] = wait(in_flight, return_when=FIRST_COMPLETED).done
+    for future in list(in_flight):
+        if future in done:
+            in_flight.remove(future)
+            yield future.result()
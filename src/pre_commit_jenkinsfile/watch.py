@@ -0,0 +1,239 @@
+import ctypes
+import ctypes.util
+import hashlib
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple, Union
+
+from src.pre_commit_jenkinsfile.results import (
+    REPORTER,
+    ErrorCodes,
+    ValidationResult,
+    combine_return_codes,
+    report_result,
+)
+
+# Seconds without another save before the saved files are validated, so the burst of writes an editor
+# makes for one save, or a save of several files, is one round
+DEBOUNCE: float = 0.1
+POLL_INTERVAL: float = 0.5
+
+# From <sys/inotify.h>
+IN_MODIFY: int = 0x00000002
+IN_CLOSE_WRITE: int = 0x00000008
+IN_MOVED_TO: int = 0x00000080
+IN_CREATE: int = 0x00000100
+IN_Q_OVERFLOW: int = 0x00004000
+IN_NONBLOCK: int = 0o4000
+IN_CLOEXEC: int = 0o2000000
+INOTIFY_EVENT = struct.Struct("iIII")
+
+
+class InotifyWatcher:
+    # Editors often save by writing a new file and renaming it over the old one, which ends a watch on the
+    # file itself, so the directories holding the files are watched instead
+    def __init__(self, filenames: Iterable[Path]):
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self.fd: int = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.filenames: Set[Path] = {filename.absolute() for filename in filenames}
+        self.directories: Dict[int, Path] = {}
+        mask: int = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+        for directory in {filename.parent for filename in self.filenames}:
+            descriptor: int = libc.inotify_add_watch(
+                self.fd, os.fsencode(directory), mask
+            )
+            if descriptor < 0:
+                os.close(self.fd)
+                raise OSError(ctypes.get_errno(), f"Could not watch {directory}")
+            self.directories[descriptor] = directory
+
+    def wait(self, timeout: Optional[float]) -> Set[Path]:
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if len(readable) == 0:
+            return set()
+        data: bytes = os.read(self.fd, 65536)
+        changed: Set[Path] = set()
+        offset: int = 0
+        while offset < len(data):
+            descriptor, event_mask, _, length = INOTIFY_EVENT.unpack_from(data, offset)
+            offset += INOTIFY_EVENT.size
+            name: bytes = data[offset : offset + length].rstrip(b"\0")
+            offset += length
+            if event_mask & IN_Q_OVERFLOW or descriptor not in self.directories:
+                # Events were dropped, so any file may have changed; unchanged ones are not sent again
+                changed |= self.filenames
+                continue
+            filename: Path = self.directories[descriptor] / os.fsdecode(name)
+            if filename in self.filenames:
+                changed.add(filename)
+        return changed
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+class PollingWatcher:
+    # Compares the modification time and size of every file, for systems without inotify
+    def __init__(self, filenames: Iterable[Path], interval: float = POLL_INTERVAL):
+        self.interval: float = interval
+        self.stats: Dict[Path, Optional[Tuple[int, int]]] = {
+            filename.absolute(): None for filename in filenames
+        }
+        self._poll()
+
+    def _poll(self) -> Set[Path]:
+        changed: Set[Path] = set()
+        for filename, old in self.stats.items():
+            try:
+                stat = filename.stat()
+                new: Optional[Tuple[int, int]] = (stat.st_mtime_ns, stat.st_size)
+            except OSError:
+                new = None
+            if new != old:
+                self.stats[filename] = new
+                changed.add(filename)
+        return changed
+
+    def wait(self, timeout: Optional[float]) -> Set[Path]:
+        waited: float = 0.0
+        while timeout is None or waited < timeout:
+            changed: Set[Path] = self._poll()
+            if len(changed) > 0:
+                return changed
+            step: float = (
+                self.interval if timeout is None else min(self.interval, timeout)
+            )
+            time.sleep(step)
+            waited += step
+        return self._poll()
+
+    def close(self) -> None:
+        pass
+
+
+Watcher = Union[InotifyWatcher, PollingWatcher]
+
+
+def open_watcher(filenames: List[Path], polling: bool = False) -> Watcher:
+    if not polling and sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher(filenames)
+        except (OSError, AttributeError):
+            pass
+    return PollingWatcher(filenames)
+
+
+def report_watched(result: ValidationResult) -> None:
+    report_result(result)
+    # The hook only prints failures, but after a save a pass is news too
+    if (
+        "text" == REPORTER.format
+        and ErrorCodes.OK == result.return_code
+        and result.is_verdict
+    ):
+        print(f"{result.filename} passed.")
+
+
+class Watch:
+    # Validates the files once, then again whenever one is saved with new content, through one Linter so
+    # the connection stays warm. Each round runs on its own thread, so a save is validated right away even
+    # while an earlier round still waits on the controller. A file saved again before its result came
+    # back makes that result stale: a stale file not sent yet is left out and a stale result is dropped.
+    def __init__(
+        self,
+        linter: Any,
+        filenames: List[Path],
+        report: Callable[[ValidationResult], None] = report_watched,
+        debounce: float = DEBOUNCE,
+        polling: bool = False,
+    ):
+        self.linter: Any = linter
+        # Paths are watched absolute, results are reported under the names they were given as
+        self.names: Dict[Path, Path] = {
+            filename.absolute(): filename for filename in filenames
+        }
+        self.report: Callable[[ValidationResult], None] = report
+        self.debounce: float = debounce
+        self.polling: bool = polling
+        self.stop_event = threading.Event()
+        self.return_codes: Dict[Path, ErrorCodes] = {}
+        self._digests: Dict[Path, str] = {}
+        self._versions: Dict[Path, int] = {filename: 0 for filename in self.names}
+        self._rounds: List[threading.Thread] = []
+        self._lock = threading.Lock()
+
+    def stop(self) -> None:
+        self.stop_event.set()
+
+    def _changed(self, filenames: Iterable[Path]) -> Dict[Path, int]:
+        # Saving without changes, or touching a file, does not send it again
+        batch: Dict[Path, int] = {}
+        for filename in filenames:
+            try:
+                digest: str = hashlib.sha256(filename.read_bytes()).hexdigest()
+            except OSError:
+                continue
+            with self._lock:
+                if self._digests.get(filename) == digest:
+                    continue
+                self._digests[filename] = digest
+                self._versions[filename] += 1
+                batch[filename] = self._versions[filename]
+        return batch
+
+    def _current(self, filename: Path, version: int) -> bool:
+        with self._lock:
+            return self._versions[filename] == version
+
+    def _validate(self, batch: Dict[Path, int]) -> None:
+        pending: Iterable[Path] = (
+            self.names[filename]
+            for filename, version in batch.items()
+            if self._current(filename, version)
+        )
+        for result in self.linter.lint_many(pending):
+            filename: Path = result.filename.absolute()
+            if not self._current(filename, batch[filename]):
+                continue
+            with self._lock:
+                self.return_codes[filename] = result.return_code
+            self.report(result)
+
+    def _start_round(self, filenames: Iterable[Path]) -> None:
+        batch: Dict[Path, int] = self._changed(filenames)
+        if len(batch) == 0:
+            return
+        thread = threading.Thread(target=self._validate, args=(batch,), daemon=True)
+        thread.start()
+        self._rounds = [alive for alive in self._rounds if alive.is_alive()]
+        self._rounds.append(thread)
+
+    def run(self) -> ErrorCodes:
+        # Runs until stop() or Ctrl-C, and returns whether the files passed when last validated
+        watcher: Watcher = open_watcher(list(self.names), self.polling)
+        try:
+            self._start_round(self.names)
+            while not self.stop_event.is_set():
+                changed: Set[Path] = watcher.wait(POLL_INTERVAL)
+                if len(changed) == 0:
+                    continue
+                while True:
+                    more: Set[Path] = watcher.wait(self.debounce)
+                    if len(more) == 0:
+                        break
+                    changed |= more
+                self._start_round(changed)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            watcher.close()
+            for thread in self._rounds:
+                thread.join()
+        return combine_return_codes(self.return_codes.values())
@@ -0,0 +1,164 @@
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+
+from fake_jenkins import FakeJenkins
+
+from src.pre_commit_jenkinsfile import http_transport, lint_jenkinsfile, ssh_transport
+from src.pre_commit_jenkinsfile.config import Config
+from src.pre_commit_jenkinsfile.controllers import ControllerPool
+from src.pre_commit_jenkinsfile.linter import Linter
+from src.pre_commit_jenkinsfile.results import ErrorCodes, combine_return_codes
+
+JENKINSFILE: str = """pipeline {{
+  agent any
+  stages {{
+{stages}  }}
+}}
+"""
+STAGE: str = """    stage('Build {index}') {{
+      steps {{
+        echo 'Building {index}'
+      }}
+    }}
+"""
+
+
+@dataclass
+class BenchmarkResult:
+    transport: str
+    file_count: int
+    jobs: int
+    seconds: float
+    return_code: ErrorCodes
+    latencies: List[float] = field(default_factory=list)
+
+    def percentile(self, percent: float) -> float:
+        # Nearest-rank percentile of the per-file latencies, in milliseconds
+        if len(self.latencies) == 0:
+            return 0.0
+        ordered: List[float] = sorted(self.latencies)
+        rank: int = max(0, int(round(percent / 100 * len(ordered) + 0.5)) - 1)
+        return ordered[min(rank, len(ordered) - 1)] * 1000
+
+    def as_row(self) -> Dict:
+        return {
+            "transport": self.transport,
+            "files": self.file_count,
+            "jobs": self.jobs,
+            "files_per_sec": self.file_count / self.seconds,
+            "p50_ms": self.percentile(50),
+            "p95_ms": self.percentile(95),
+        }
+
+
+def write_jenkinsfiles(directory: Path, count: int, stages: int = 1) -> List[Path]:
+    filenames: List[Path] = []
+    for index in range(count):
+        filename: Path = directory / f"Jenkinsfile.{index}"
+        filename.write_text(
+            JENKINSFILE.format(
+                stages="".join(
+                    STAGE.format(index=f"{index}.{stage}") for stage in range(stages)
+                )
+            )
+        )
+        filenames.append(filename)
+    return filenames
+
+
+def jenkins_config(jenkins: FakeJenkins, transport: str) -> Config:
+    if "http" == transport:
+        return Config(jenkins_url=jenkins.url)
+    return Config(jenkins_hostname="127.0.0.1", jenkins_ssh_port=jenkins.ssh_port)
+
+
+def jenkins_args(jenkins: FakeJenkins, transport: str) -> List[str]:
+    if "http" == transport:
+        return ["--jenkins_url", jenkins.url]
+    return [
+        "--jenkins_hostname",
+        "127.0.0.1",
+        "--jenkins_ssh_port",
+        str(jenkins.ssh_port),
+    ]
+
+
+def _timed(validate: Callable, latencies: List[float]) -> Callable:
+    def timed_validate(*args, **kwargs):
+        start: float = time.perf_counter()
+        try:
+            return validate(*args, **kwargs)
+        finally:
+            latencies.append(time.perf_counter() - start)
+
+    return timed_validate
+
+
+def run_benchmark(
+    jenkins: FakeJenkins, transport: str, filenames: List[Path], jobs: int
+) -> BenchmarkResult:
+    # Measures one run of a Linter over HTTP or SSH, timing every validation call on the way
+    latencies: List[float] = []
+    name: str = "http_validate" if "http" == transport else "ssh_validate"
+    module = http_transport if "http" == transport else ssh_transport
+    validate: Callable = getattr(module, name)
+    setattr(module, name, _timed(validate, latencies))
+    try:
+        start: float = time.perf_counter()
+        with Linter(jenkins_config(jenkins, transport), jobs=jobs) as linter:
+            return_code: ErrorCodes = combine_return_codes(
+                [result.return_code for result in linter.lint_many(filenames)]
+            )
+        seconds: float = time.perf_counter() - start
+    finally:
+        setattr(module, name, validate)
+
+    return BenchmarkResult(
+        transport, len(filenames), jobs, seconds, return_code, latencies
+    )
+
+
+def _connect_now(pool: ControllerPool) -> None:
+    # The startup before the connection was made in the background: no file after the first one is
+    # read or checked until the controllers answered
+    for controller in pool.controllers:
+        controller.connect()
+
+
+def time_main(
+    jenkins: FakeJenkins,
+    transport: str,
+    directory: Path,
+    cache_dir: Path,
+    jobs: int,
+    sequential: bool,
+) -> Tuple[float, float]:
+    # Runs the hook on the files it discovers in directory, and returns the seconds until the first
+    # and the last result were reported. With sequential the connection is made as it used to be,
+    # before any other file is read. A new cache_dir has no crumb to reuse.
+    times: List[float] = []
+    report_result: Callable = lint_jenkinsfile.report_result
+    warm_up: Callable = ControllerPool.warm_up
+
+    def timed_report(*args, **kwargs):
+        report_result(*args, **kwargs)
+        times.append(time.perf_counter() - start)
+
+    setattr(lint_jenkinsfile, "report_result", timed_report)
+    if sequential:
+        setattr(ControllerPool, "warm_up", _connect_now)
+    try:
+        start: float = time.perf_counter()
+        return_code: int = lint_jenkinsfile.main(
+            jenkins_args(jenkins, transport)
+            + ["--no-cache", "--cache-dir", str(cache_dir), "--jobs", str(jobs)]
+            + ["--discover", str(directory)]
+        )
+    finally:
+        setattr(lint_jenkinsfile, "report_result", report_result)
+        setattr(ControllerPool, "warm_up", warm_up)
+
+    assert ErrorCodes.OK == return_code
+    return times[0], times[-1]
@@ -1,10 +1,98 @@
-"""
-    Dummy conftest.py for pre_commit_jenkinsfile.
+import json
+from pathlib import Path
+from typing import Dict, List
 
-    If you don't know what this is for, just leave it empty.
-    Read more about conftest.py under:
-    - https://docs.pytest.org/en/stable/fixture.html
-    - https://docs.pytest.org/en/stable/writing_plugins.html
-"""
+import paramiko
+import pytest
+from fake_jenkins import FakeJenkins
 
-# import pytest
+from src.pre_commit_jenkinsfile.results import REPORTER
+
+BENCHMARK_RESULTS: List[Dict] = []
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--run-benchmarks",
+        action="store_true",
+        help="Run the benchmarks against the fake Jenkins controller",
+    )
+    parser.addoption(
+        "--benchmark-output",
+        action="store",
+        default="",
+        help="Append the benchmark results as JSON lines to this file",
+    )
+
+
+def pytest_collection_modifyitems(config, items):
+    if not config.getoption("--run-benchmarks"):
+        skip = pytest.mark.skip(reason="benchmarks only run with --run-benchmarks")
+        for item in items:
+            if "benchmark" in item.keywords:
+                item.add_marker(skip)
+
+
+def pytest_terminal_summary(terminalreporter, config):
+    if len(BENCHMARK_RESULTS) == 0:
+        return
+
+    terminalreporter.section("benchmarks")
+    columns: List[str] = []
+    for row in BENCHMARK_RESULTS:
+        # Each benchmark has columns of its own
+        if list(row.keys()) != columns:
+            columns = list(row.keys())
+            terminalreporter.write_line("".join(f"{column:>16}" for column in columns))
+        terminalreporter.write_line(
+            "".join(
+                f"{value:>16.2f}" if isinstance(value, float) else f"{value:>16}"
+                for value in row.values()
+            )
+        )
+
+    output: str = config.getoption("--benchmark-output")
+    if len(output) > 0:
+        with open(output, "a") as output_file:
+            for row in BENCHMARK_RESULTS:
+                output_file.write(json.dumps(row) + "\n")
+
+
+@pytest.fixture(autouse=True)
+def reset_reporter():
+    # main() sets the output format for the whole process, so tests calling a transport directly
+    # must not see the format of an earlier test
+    REPORTER.reset()
+    yield
+    REPORTER.reset()
+
+
+@pytest.fixture(autouse=True)
+def cache_home(tmp_path, monkeypatch) -> Path:
+    # Tests calling main() without --cache-dir must not leave crumbs, circuits or results in the
+    # cache of the user running them
+    home: Path = tmp_path / "cache"
+    monkeypatch.setenv("XDG_CACHE_HOME", str(home))
+    return home
+
+
+@pytest.fixture(scope="session")
+def ssh_client_key() -> paramiko.RSAKey:
+    return paramiko.RSAKey.generate(2048)
+
+
+@pytest.fixture
+def ssh_home(tmp_path, monkeypatch, ssh_client_key) -> Path:
+    # paramiko looks for client keys and known hosts under ~/.ssh
+    home: Path = tmp_path / "home"
+    (home / ".ssh").mkdir(parents=True)
+    ssh_client_key.write_private_key_file(str(home / ".ssh" / "id_rsa"))
+    monkeypatch.setenv("HOME", str(home))
+    monkeypatch.delenv("SSH_AUTH_SOCK", raising=False)
+    return home
+
+
+@pytest.fixture
+def fake_jenkins(ssh_home):
+    with FakeJenkins().start(http=True, ssh=True) as jenkins:
+        yield jenkins
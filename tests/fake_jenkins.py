@@ -0,0 +1,389 @@
+import base64
+import json
+import random
+import re
+import socket
+import threading
+import time
+from email.parser import BytesParser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs
+
+import paramiko
+
+from src.pre_commit_jenkinsfile.script_transport import RESULTS_MARKER
+from src.pre_commit_jenkinsfile.syntax import check_structure
+
+CRUMB: str = "Jenkins-Crumb:fake-crumb"
+SESSION_COOKIE: str = "JSESSIONID.fake=session"
+JENKINS_VERSION: str = "2.462.3"
+PLUGIN_VERSION: str = "2.2214.vb_b_34b_2ea_9b_83"
+# The script console fails the files that contain this and passes all others
+SCRIPT_FAILURE: str = "// fails on the script console"
+SCRIPT_FAILURE_MESSAGE: str = "Errors encountered validating Jenkinsfile:\nRejected."
+SCRIPT_SUCCESS_MESSAGE: str = "Jenkinsfile successfully validated."
+
+_host_keys: List[paramiko.RSAKey] = []
+
+
+def host_key() -> paramiko.RSAKey:
+    # Generating an RSA key takes a while, so every fake controller shares one
+    if len(_host_keys) == 0:
+        _host_keys.append(paramiko.RSAKey.generate(2048))
+    return _host_keys[0]
+
+
+class FakeJenkins:
+    # An in-process stand-in for a Jenkins controller that serves the crumb issuer and the declarative
+    # linter over HTTP and SSH, and the batch script of script_transport on its script console. Every
+    # validation waits latency +/- jitter seconds and fails with an error_rate probability, so the
+    # clients can be measured under controlled conditions. With a capacity, validations beyond that
+    # many at once are turned away with a 429 or a refused channel.
+    def __init__(
+        self,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        seed: int = 0,
+        capacity: int = 0,
+    ):
+        self.latency: float = latency
+        self.jitter: float = jitter
+        self.error_rate: float = error_rate
+        self.capacity: int = capacity
+        self.rejected: int = 0
+        # Whether the account may use the script console
+        self.script_console: bool = True
+        # Seconds the crumb issuer takes to answer, and a status for the validation endpoint to fail with
+        self.crumb_latency: float = 0.0
+        self.http_status: int = 0
+        # Seconds the SSH server takes to accept a login
+        self.login_latency: float = 0.0
+        # The next stalls validations take stall seconds longer, as on a controller that pauses for GC
+        self.stalls: int = 0
+        self.stall: float = 0.0
+        self.jenkins_version: str = JENKINS_VERSION
+        self.plugin_version: str = PLUGIN_VERSION
+        self.requests: Dict[str, int] = {
+            "crumb": 0,
+            "validate": 0,
+            "ssh": 0,
+            "versions": 0,
+            "script": 0,
+        }
+        self.in_flight: int = 0
+        self.peak_in_flight: int = 0
+        self.largest_upload: int = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._http_server: Optional[ThreadingHTTPServer] = None
+        self._ssh_socket: Optional[socket.socket] = None
+        self._ssh_transports: List[paramiko.Transport] = []
+        self._stopped = threading.Event()
+
+    @property
+    def url(self) -> str:
+        assert self._http_server is not None
+        return f"http://127.0.0.1:{self._http_server.server_address[1]}"
+
+    @property
+    def ssh_port(self) -> int:
+        assert self._ssh_socket is not None
+        return self._ssh_socket.getsockname()[1]
+
+    def count(self, kind: str) -> None:
+        with self._lock:
+            self.requests[kind] += 1
+
+    def received(self, jenkinsfile: str) -> None:
+        with self._lock:
+            self.largest_upload = max(self.largest_upload, len(jenkinsfile.encode()))
+
+    def admit(self) -> bool:
+        # Takes a slot for a request that is about to be served, or turns it away when all slots are
+        # taken. Checking and taking at once keeps concurrent requests from all squeezing into the
+        # last slot.
+        with self._lock:
+            if 0 < self.capacity <= self.in_flight:
+                self.rejected += 1
+                return False
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+            return True
+
+    def finish(self) -> None:
+        with self._lock:
+            self.in_flight -= 1
+
+    def delay(self) -> bool:
+        # Returns False when this request should fail
+        with self._lock:
+            latency: float = self.latency + self._random.uniform(
+                -self.jitter, self.jitter
+            )
+            failed: bool = self._random.random() < self.error_rate
+            if self.stalls > 0:
+                self.stalls -= 1
+                latency += self.stall
+        time.sleep(max(0.0, latency))
+        return not failed
+
+    @staticmethod
+    def verdict(jenkinsfile: str) -> str:
+        issues = check_structure(jenkinsfile)
+        if len(issues) > 0:
+            return "Errors encountered validating Jenkinsfile:\n" + "\n".join(
+                str(issue) for issue in issues
+            )
+        return "Jenkinsfile successfully validated."
+
+    def start(self, http: bool = True, ssh: bool = False) -> "FakeJenkins":
+        if http:
+            self._http_server = ThreadingHTTPServer(
+                ("127.0.0.1", 0), _make_http_handler(self)
+            )
+            self._http_server.daemon_threads = True
+            threading.Thread(
+                target=self._http_server.serve_forever, daemon=True
+            ).start()
+        if ssh:
+            self._ssh_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            self._ssh_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            self._ssh_socket.bind(("127.0.0.1", 0))
+            self._ssh_socket.listen(16)
+            threading.Thread(target=self._accept_ssh, daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._http_server is not None:
+            self._http_server.shutdown()
+            self._http_server.server_close()
+        if self._ssh_socket is not None:
+            self._ssh_socket.close()
+        for transport in self._ssh_transports:
+            transport.close()
+
+    def __enter__(self) -> "FakeJenkins":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.stop()
+
+    def _accept_ssh(self) -> None:
+        assert self._ssh_socket is not None
+        while not self._stopped.is_set():
+            try:
+                client_socket, _ = self._ssh_socket.accept()
+            except OSError:
+                return
+            client_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            transport = paramiko.Transport(client_socket)
+            transport.add_server_key(host_key())
+            self._ssh_transports.append(transport)
+            try:
+                transport.start_server(server=_SSHServer(self))
+            except (paramiko.SSHException, EOFError):
+                transport.close()
+
+
+def _make_http_handler(jenkins: FakeJenkins):
+    class Handler(BaseHTTPRequestHandler):
+        # Keep connections alive like a real controller, and do not let Nagle's algorithm hold back
+        # the response body behind the headers
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def log_message(self, *args) -> None:
+            pass
+
+        def reply(
+            self, status: int, body: str, headers: Optional[Dict[str, str]] = None
+        ) -> None:
+            data: bytes = body.encode()
+            self.send_response(status)
+            self.send_header("X-Jenkins", jenkins.jenkins_version)
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.send_header("Content-Type", "text/plain;charset=utf-8")
+            self.send_header("Content-Length", str(len(data)))
+            try:
+                self.end_headers()
+                self.wfile.write(data)
+            except OSError:
+                # The client gave up on the request, e.g. at its deadline
+                pass
+
+        def read_fields(self) -> Dict[str, str]:
+            body: bytes = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            message = BytesParser().parsebytes(
+                f"Content-Type: {self.headers['Content-Type']}\r\n\r\n".encode() + body
+            )
+            fields: Dict[str, str] = {}
+            for part in message.get_payload():
+                name = part.get_param("name", header="content-disposition")
+                fields[name] = part.get_payload(decode=True).decode()
+            return fields
+
+        def do_GET(self) -> None:
+            if self.path.startswith("/crumbIssuer/api/xml"):
+                jenkins.count("crumb")
+                time.sleep(jenkins.crumb_latency)
+                self.reply(200, CRUMB, {"Set-Cookie": f"{SESSION_COOKIE}; Path=/"})
+            elif self.path.startswith("/pluginManager/api/json"):
+                jenkins.count("versions")
+                plugins = [
+                    {"shortName": "workflow-job", "version": "1436.vfa_244484591f"},
+                    {
+                        "shortName": "pipeline-model-definition",
+                        "version": jenkins.plugin_version,
+                    },
+                ]
+                self.reply(200, json.dumps({"plugins": plugins}))
+            else:
+                self.reply(404, "Not Found")
+
+        def run_script(self) -> None:
+            # Finds the files in the batch script of script_transport and answers like the real script
+            body: bytes = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            script: str = parse_qs(body.decode())["script"][0]
+            if CRUMB.split(":")[1] != self.headers.get(CRUMB.split(":")[0]):
+                self.reply(403, "No valid crumb was included in the request")
+                return
+            jenkins.count("script")
+            if not jenkins.script_console:
+                self.reply(
+                    403, "anonymous is missing the Overall/Administer permission"
+                )
+                return
+
+            payload = re.search(r"'([A-Za-z0-9+/=]*)'\.decodeBase64\(\)", script)
+            assert payload is not None
+            jenkinsfiles: List[str] = json.loads(base64.b64decode(payload.group(1)))
+            for jenkinsfile in jenkinsfiles:
+                jenkins.received(jenkinsfile)
+            if not jenkins.admit():
+                self.reply(429, "Too Many Requests")
+                return
+            try:
+                if not jenkins.delay():
+                    self.reply(503, "Service Unavailable")
+                    return
+                # Fixed verdicts, so the results cannot have come from the offline check
+                verdicts = [
+                    (
+                        {"passed": False, "message": SCRIPT_FAILURE_MESSAGE}
+                        if SCRIPT_FAILURE in jenkinsfile
+                        else {"passed": True, "message": SCRIPT_SUCCESS_MESSAGE}
+                    )
+                    for jenkinsfile in jenkinsfiles
+                ]
+                self.reply(200, f"{RESULTS_MARKER}{json.dumps(verdicts)}\n")
+            finally:
+                jenkins.finish()
+
+        def do_POST(self) -> None:
+            if "/scriptText" == self.path:
+                self.run_script()
+                return
+            fields: Dict[str, str] = self.read_fields()
+            if self.path != "/pipeline-model-converter/validate":
+                self.reply(404, "Not Found")
+                return
+            if CRUMB.split(":")[1] != self.headers.get(CRUMB.split(":")[0]):
+                self.reply(403, "No valid crumb was included in the request")
+                return
+
+            jenkins.count("validate")
+            jenkins.received(fields.get("jenkinsfile", ""))
+            if jenkins.http_status > 0:
+                self.reply(jenkins.http_status, "Internal Server Error")
+                return
+            if not jenkins.admit():
+                self.reply(429, "Too Many Requests")
+                return
+            try:
+                if not jenkins.delay():
+                    self.reply(503, "Service Unavailable")
+                    return
+                self.reply(200, jenkins.verdict(fields.get("jenkinsfile", "")))
+            finally:
+                jenkins.finish()
+
+    return Handler
+
+
+class _SSHServer(paramiko.ServerInterface):
+    def __init__(self, jenkins: FakeJenkins):
+        self.jenkins: FakeJenkins = jenkins
+
+    def get_allowed_auths(self, username: str) -> str:
+        return "publickey"
+
+    def check_auth_publickey(self, username: str, key: paramiko.PKey) -> int:
+        time.sleep(self.jenkins.login_latency)
+        return paramiko.AUTH_SUCCESSFUL
+
+    def check_channel_request(self, kind: str, chanid: int) -> int:
+        if "session" == kind:
+            # The slot is held from the channel open until the channel is answered
+            if not self.jenkins.admit():
+                return paramiko.OPEN_FAILED_RESOURCE_SHORTAGE
+            return paramiko.OPEN_SUCCEEDED
+        return paramiko.OPEN_FAILED_ADMINISTRATIVELY_PROHIBITED
+
+    def check_channel_exec_request(self, channel: paramiko.Channel, command) -> bool:
+        if b"declarative-linter" == bytes(command):
+            threading.Thread(target=self.lint, args=(channel,), daemon=True).start()
+            return True
+        if b"version" == bytes(command):
+            self.reply(channel, f"{self.jenkins.jenkins_version}\n")
+            return True
+        if b"list-plugins pipeline-model-definition" == bytes(command):
+            self.reply(
+                channel,
+                f"pipeline-model-definition  Pipeline: Declarative  {self.jenkins.plugin_version}\n",
+            )
+            return True
+        return False
+
+    def reply(self, channel: paramiko.Channel, output: str) -> None:
+        def send() -> None:
+            self.jenkins.count("versions")
+            try:
+                # Like the real CLI, answer once the client closed stdin
+                while len(channel.recv(1024)) > 0:
+                    pass
+                channel.sendall(output.encode())
+                channel.send_exit_status(0)
+            finally:
+                self.jenkins.finish()
+            channel.close()
+
+        threading.Thread(target=send, daemon=True).start()
+
+    def lint(self, channel: paramiko.Channel) -> None:
+        self.jenkins.count("ssh")
+        chunks: List[bytes] = []
+        while True:
+            chunk: bytes = channel.recv(32768)
+            if len(chunk) == 0:
+                break
+            chunks.append(chunk)
+
+        self.jenkins.received(b"".join(chunks).decode())
+        try:
+            if not self.jenkins.delay():
+                channel.sendall_stderr(b"java.io.IOException: Internal error\n")
+                channel.send_exit_status(255)
+            else:
+                verdict: str = self.jenkins.verdict(b"".join(chunks).decode())
+                channel.sendall(f"{verdict}\n".encode())
+                channel.send_exit_status(0 if "successfully" in verdict else 1)
+        except OSError:
+            # The client gave up on the channel, e.g. at its deadline
+            pass
+        finally:
+            self.jenkins.finish()
+        channel.close()
@@ -0,0 +1,67 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+
+
+class FakeResultStore:
+    # An in-process key-value service like the one a team would put in front of the shared result store:
+    # GET <url>/<key> returns what PUT <url>/<key> stored
+    def __init__(self):
+        self.entries: Dict[str, bytes] = {}
+        self.requests: Dict[str, int] = {"GET": 0, "PUT": 0}
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    @property
+    def url(self) -> str:
+        assert self._server is not None
+        return f"http://127.0.0.1:{self._server.server_address[1]}/results"
+
+    def start(self) -> "FakeResultStore":
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), _make_handler(self))
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+
+    def __enter__(self) -> "FakeResultStore":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.stop()
+
+
+def _make_handler(store: FakeResultStore):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args) -> None:
+            pass
+
+        def reply(self, status: int, body: bytes = b"") -> None:
+            self.send_response(status)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self) -> None:
+            with store._lock:
+                store.requests["GET"] += 1
+                entry: Optional[bytes] = store.entries.get(self.path)
+            if entry is None:
+                self.reply(404)
+            else:
+                self.reply(200, entry)
+
+        def do_PUT(self) -> None:
+            body: bytes = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            with store._lock:
+                store.requests["PUT"] += 1
+                store.entries[self.path] = body
+            self.reply(204)
+
+    return Handler
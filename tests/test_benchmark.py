@@ -0,0 +1,80 @@
+import statistics
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import pytest
+from benchmark import run_benchmark, time_main, write_jenkinsfiles
+from conftest import BENCHMARK_RESULTS
+from fake_jenkins import FakeJenkins
+
+from src.pre_commit_jenkinsfile.results import ErrorCodes
+
+
+class TestBenchmark:
+    @pytest.mark.parametrize("transport", ["http", "ssh"])
+    def test_fake_controller(self, transport: str, ssh_home, tmp_path: Path):
+        filenames = write_jenkinsfiles(tmp_path, 3)
+        with FakeJenkins().start(http=True, ssh=True) as jenkins:
+            result = run_benchmark(jenkins, transport, filenames, jobs=2)
+
+        assert result.return_code == ErrorCodes.OK
+        assert len(result.latencies) == 3
+
+    @pytest.mark.benchmark
+    @pytest.mark.parametrize("jobs", [1, 8])
+    @pytest.mark.parametrize("file_count", [1, 10, 100, 1000])
+    @pytest.mark.parametrize("transport", ["http", "ssh"])
+    def test_throughput(
+        self, transport: str, file_count: int, jobs: int, ssh_home, tmp_path: Path
+    ):
+        filenames = write_jenkinsfiles(tmp_path, file_count)
+        with FakeJenkins(latency=0.01, jitter=0.005).start(
+            http=True, ssh=True
+        ) as jenkins:
+            result = run_benchmark(jenkins, transport, filenames, jobs)
+
+        assert result.return_code == ErrorCodes.OK
+        BENCHMARK_RESULTS.append(result.as_row())
+
+    @pytest.mark.benchmark
+    @pytest.mark.parametrize("transport", ["http", "ssh"])
+    def test_startup(self, transport: str, ssh_home, tmp_path: Path):
+        # Checking these pipelines offline takes about as long as connecting, which the hook overlaps
+        # from the first file on
+        file_count: int = 8
+        directory: Path = tmp_path / "files"
+        directory.mkdir()
+        write_jenkinsfiles(directory, file_count, stages=200)
+        seconds: Dict[bool, Tuple[float, float]] = {}
+        with FakeJenkins(latency=0.01).start(http=True, ssh=True) as jenkins:
+            # A crumb request, or an SSH login, to a controller across the network
+            jenkins.crumb_latency = 0.05
+            jenkins.login_latency = 0.05
+            for sequential in (True, False):
+                runs: List[Tuple[float, float]] = [
+                    time_main(
+                        jenkins,
+                        transport,
+                        directory,
+                        tmp_path / f"cache-{sequential}-{run}",
+                        file_count,
+                        sequential,
+                    )
+                    for run in range(5)
+                ]
+                seconds[sequential] = (
+                    statistics.median(first for first, _ in runs),
+                    statistics.median(last for _, last in runs),
+                )
+
+        BENCHMARK_RESULTS.append(
+            {
+                "transport": transport,
+                "files": file_count,
+                "seq_first_ms": seconds[True][0] * 1000,
+                "seq_last_ms": seconds[True][1] * 1000,
+                "first_ms": seconds[False][0] * 1000,
+                "last_ms": seconds[False][1] * 1000,
+            }
+        )
+        assert seconds[False][1] < seconds[True][1]
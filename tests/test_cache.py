@@ -0,0 +1,76 @@
+import os
+import time
+from pathlib import Path
+
+from src.pre_commit_jenkinsfile.cache import ResultCache
+from src.pre_commit_jenkinsfile.results import ErrorCodes, ValidationResult
+
+
+class TestResultCache:
+    def test_round_trip(self, tmp_path: Path):
+        cache = ResultCache(tmp_path)
+        key: str = ResultCache.key(b"pipeline {}", "http://jenkins")
+        cache.put(key, ValidationResult(Path("Jenkinsfile"), ErrorCodes.FAIL, "Error"))
+
+        result = cache.get(key, Path("Jenkinsfile"))
+        assert result is not None
+        assert result.return_code == ErrorCodes.FAIL
+        assert result.message == "Error"
+
+    def test_key_depends_on_controller(self):
+        assert ResultCache.key(b"pipeline {}", "http://a") != ResultCache.key(
+            b"pipeline {}", "http://b"
+        )
+
+    def test_connection_failures_are_not_stored(self, tmp_path: Path):
+        cache = ResultCache(tmp_path)
+        key: str = ResultCache.key(b"pipeline {}", "http://jenkins")
+        cache.put(
+            key,
+            ValidationResult(Path("Jenkinsfile"), ErrorCodes.FAIL, is_verdict=False),
+        )
+
+        assert cache.get(key, Path("Jenkinsfile")) is None
+
+    def test_expired_entries_are_ignored(self, tmp_path: Path):
+        cache = ResultCache(tmp_path, ttl=0.0)
+        key: str = ResultCache.key(b"pipeline {}", "http://jenkins")
+        cache.put(key, ValidationResult(Path("Jenkinsfile"), ErrorCodes.OK))
+        time.sleep(0.01)
+
+        assert cache.get(key, Path("Jenkinsfile")) is None
+
+    def test_prune_keeps_newest_entries(self, tmp_path: Path):
+        cache = ResultCache(tmp_path, max_entries=2)
+        keys = [ResultCache.key(bytes([index]), "ssh:22") for index in range(4)]
+        for age, key in enumerate(reversed(keys)):
+            cache.put(key, ValidationResult(Path("Jenkinsfile"), ErrorCodes.OK))
+            entry_path = cache._entry_path(key)
+            os.utime(entry_path, (time.time() - age, time.time() - age))
+
+        cache.prune()
+
+        assert [cache.get(key, Path("Jenkinsfile")) is not None for key in keys] == [
+            False,
+            False,
+            True,
+            True,
+        ]
+
+    def test_comment_edits_reuse_passes_only(self, tmp_path: Path):
+        cache = ResultCache(tmp_path)
+        original: bytes = b"pipeline {\n  agent any\n}\n"
+        edited: bytes = b"// Deploys the service\npipeline {\n  agent any\n}\n"
+        cache.put(
+            ResultCache.key(original, "ssh:22"),
+            ValidationResult(Path("Jenkinsfile"), ErrorCodes.OK),
+        )
+        assert cache.get(ResultCache.key(edited, "ssh:22"), Path("Jenkinsfile"))
+
+        # The line numbers in the message no longer match the edited file
+        cache.put(
+            ResultCache.key(original, "ssh:22"),
+            ValidationResult(Path("Jenkinsfile"), ErrorCodes.FAIL, "line 2"),
+        )
+        assert cache.get(ResultCache.key(original, "ssh:22"), Path("Jenkinsfile"))
+        assert cache.get(ResultCache.key(edited, "ssh:22"), Path("Jenkinsfile")) is None
@@ -0,0 +1,102 @@
+import socket
+from pathlib import Path
+from typing import List
+
+import pytest
+from benchmark import write_jenkinsfiles
+from fake_jenkins import FakeJenkins
+
+from src.pre_commit_jenkinsfile import lint_jenkinsfile
+from src.pre_commit_jenkinsfile.config import Config
+from src.pre_commit_jenkinsfile.linter import Linter
+from src.pre_commit_jenkinsfile.results import ErrorCodes, combine_return_codes
+
+
+def unused_url() -> str:
+    with socket.socket() as unused:
+        unused.bind(("127.0.0.1", 0))
+        port: int = unused.getsockname()[1]
+    return f"http://127.0.0.1:{port}"
+
+
+def lint_with_controllers(
+    filenames: List[Path], configs: List[Config], jobs: int = 1
+) -> ErrorCodes:
+    with Linter(Config(extra_controllers=configs), jobs=jobs, notify=print) as linter:
+        return combine_return_codes(
+            [result.return_code for result in linter.lint_many(filenames)]
+        )
+
+
+class TestControllers:
+    @pytest.fixture
+    def fast_and_slow(self):
+        with FakeJenkins(latency=0.005).start() as fast, FakeJenkins(
+            latency=0.05
+        ).start() as slow:
+            yield fast, slow
+
+    def test_config_file_sections(self, tmp_path):
+        config_file: Path = tmp_path / "config.ini"
+        config_file.write_text(
+            "[http]\nurl = http://main\n\n"
+            "[http:backup]\nurl = http://backup\nlogin = user\napi_token = token\n\n"
+            "[ssh:east]\nhostname = east\nport = 2222\n"
+        )
+
+        controllers = Config.load_file(config_file).controllers()
+
+        assert [controller.controller_id() for controller in controllers] == [
+            "http://main",
+            "http://backup",
+            "east:2222",
+        ]
+        assert controllers[1].jenkins_login == "user"
+        assert controllers[1].jenkins_api_token == "token"
+
+    def test_faster_controller_gets_more_files(self, fast_and_slow, tmp_path):
+        fast, slow = fast_and_slow
+        filenames = write_jenkinsfiles(tmp_path, 40)
+        configs = [Config(jenkins_url=slow.url), Config(jenkins_url=fast.url)]
+
+        assert lint_with_controllers(filenames, configs, jobs=4) == ErrorCodes.OK
+        assert fast.requests["validate"] + slow.requests["validate"] == 40
+        assert fast.requests["validate"] > 2 * slow.requests["validate"]
+
+    def test_failover_to_the_next_controller(self, fake_jenkins, tmp_path, capsys):
+        filenames = write_jenkinsfiles(tmp_path, 4)
+        configs = [
+            Config(jenkins_url=unused_url()),
+            Config(
+                jenkins_hostname="127.0.0.1", jenkins_ssh_port=fake_jenkins.ssh_port
+            ),
+        ]
+
+        assert lint_with_controllers(filenames, configs, jobs=2) == ErrorCodes.OK
+        assert fake_jenkins.requests["ssh"] == 4
+        assert capsys.readouterr().out.count("is skipped") == 1
+
+    def test_failed_validations_fail_over(self, tmp_path):
+        filenames = write_jenkinsfiles(tmp_path, 4)
+        with FakeJenkins(
+            error_rate=1.0
+        ).start() as broken, FakeJenkins().start() as working:
+            configs = [Config(jenkins_url=broken.url), Config(jenkins_url=working.url)]
+
+            assert lint_with_controllers(filenames, configs) == ErrorCodes.OK
+            assert broken.requests["validate"] >= 1
+            assert working.requests["validate"] == 4
+
+    def test_all_controllers_down(self, tmp_path, capsys):
+        config_file: Path = tmp_path / "config.ini"
+        config_file.write_text(
+            f"[http:a]\nurl = {unused_url()}\n\n[http:b]\nurl = {unused_url()}\n"
+        )
+        filenames = write_jenkinsfiles(tmp_path, 2)
+        argv = ["--config", str(config_file), "--no-cache"]
+
+        assert (
+            lint_jenkinsfile.main(argv + [str(filename) for filename in filenames])
+            == ErrorCodes.FAIL
+        )
+        assert capsys.readouterr().out.count("is skipped") == 2
@@ -0,0 +1,102 @@
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import pytest
+from benchmark import write_jenkinsfiles
+
+from src.pre_commit_jenkinsfile import daemon
+from src.pre_commit_jenkinsfile.config import Config
+from src.pre_commit_jenkinsfile.results import ErrorCodes
+
+DATA_DIR: Path = Path(__file__).parent / "data"
+
+
+class TestDaemon:
+    @pytest.fixture
+    def daemon_server(self):
+        # Unix socket paths are limited to about a hundred characters, which tmp_path can exceed
+        with tempfile.TemporaryDirectory() as socket_dir:
+            server = daemon.DaemonServer(Path(socket_dir) / "daemon.sock")
+            thread = threading.Thread(target=server.serve, daemon=True)
+            thread.start()
+            yield server
+            server.shutdown()
+            thread.join()
+
+    def test_http_session_stays_warm_between_runs(
+        self, fake_jenkins, daemon_server, tmp_path
+    ):
+        config = Config(jenkins_url=fake_jenkins.url)
+        filenames = write_jenkinsfiles(tmp_path, 4)
+
+        for _ in range(2):
+            return_code = daemon.lint_via_daemon(
+                filenames, config, jobs=2, path=daemon_server.path
+            )
+            assert return_code == ErrorCodes.OK
+
+        assert fake_jenkins.requests["crumb"] == 1
+        assert fake_jenkins.requests["validate"] == 8
+
+    def test_ssh_results_keep_the_given_names(
+        self, fake_jenkins, daemon_server, capsys, monkeypatch
+    ):
+        monkeypatch.chdir(DATA_DIR)
+        config = Config(
+            jenkins_hostname="127.0.0.1", jenkins_ssh_port=fake_jenkins.ssh_port
+        )
+        filename = Path("missing_agent") / "Jenkinsfile"
+
+        return_code = daemon.lint_via_daemon(
+            [filename], config, path=daemon_server.path
+        )
+
+        assert return_code == ErrorCodes.FAIL
+        assert str(filename) in capsys.readouterr().out.splitlines()
+        assert fake_jenkins.requests["ssh"] == 1
+
+    def test_unreachable_daemon_falls_back(self, monkeypatch, tmp_path):
+        monkeypatch.setattr(daemon, "START_TIMEOUT", 0.1)
+        monkeypatch.setattr(daemon, "_start_daemon", lambda path, idle_timeout: None)
+
+        return_code = daemon.lint_via_daemon(
+            [DATA_DIR / "valid" / "Jenkinsfile"],
+            Config(jenkins_url="http://jenkins"),
+            path=tmp_path / "missing.sock",
+        )
+
+        assert return_code is None
+
+    def test_idle_daemon_exits(self):
+        with tempfile.TemporaryDirectory() as socket_dir:
+            server = daemon.DaemonServer(Path(socket_dir) / "daemon.sock", 0.1)
+            thread = threading.Thread(target=server.serve, daemon=True)
+            started: float = time.monotonic()
+            thread.start()
+            thread.join(timeout=5)
+
+            assert not thread.is_alive()
+            assert time.monotonic() - started < 5
+            assert not server.path.exists()
+
+    def test_shared_directory_is_refused(self, monkeypatch):
+        monkeypatch.setattr(daemon, "START_TIMEOUT", 0.1)
+        monkeypatch.setattr(daemon, "_start_daemon", lambda path, idle_timeout: None)
+        with tempfile.TemporaryDirectory() as socket_dir:
+            path = Path(socket_dir) / "daemon.sock"
+            server = daemon.DaemonServer(path)
+            # Another user may create or open up the directory under /tmp
+            Path(socket_dir).chmod(0o755)
+            try:
+                return_code = daemon.lint_via_daemon(
+                    [DATA_DIR / "valid" / "Jenkinsfile"],
+                    Config(jenkins_url="http://jenkins"),
+                    path=path,
+                )
+                assert return_code is None
+                with pytest.raises(PermissionError):
+                    daemon.DaemonServer(Path(socket_dir) / "other.sock")
+            finally:
+                server.server_close()
@@ -0,0 +1,60 @@
+import json
+import os
+import time
+from typing import List
+
+import pytest
+from benchmark import write_jenkinsfiles
+
+from src.pre_commit_jenkinsfile import lint_jenkinsfile
+from src.pre_commit_jenkinsfile.deadline import most_recent_first
+from src.pre_commit_jenkinsfile.results import ErrorCodes
+
+
+class TestDeadline:
+    def test_most_recent_first(self, tmp_path):
+        filenames = write_jenkinsfiles(tmp_path, 3)
+        for age, filename in enumerate(filenames):
+            os.utime(filename, (time.time() - age, time.time() - age))
+
+        assert most_recent_first(reversed(filenames)) == filenames
+
+    @pytest.mark.parametrize(
+        "transport,policy,return_code",
+        [
+            ("http", "fail-closed", ErrorCodes.FAIL),
+            ("ssh", "fail-closed", ErrorCodes.FAIL),
+            ("http", "fail-open", ErrorCodes.OK),
+        ],
+    )
+    def test_files_left_at_the_deadline(
+        self, fake_jenkins, tmp_path, capsys, transport, policy, return_code
+    ):
+        fake_jenkins.latency = 0.4
+        filenames = write_jenkinsfiles(tmp_path, 4)
+        if "http" == transport:
+            argv = ["--jenkins_url", fake_jenkins.url]
+        else:
+            argv = ["--jenkins_hostname", "127.0.0.1"]
+            argv += ["--jenkins_ssh_port", str(fake_jenkins.ssh_port)]
+        argv += ["--no-cache", "--format", "ndjson", "--deadline", "1.0"]
+        argv += ["--deadline-policy", policy]
+
+        started: float = time.perf_counter()
+        assert (
+            lint_jenkinsfile.main(argv + [str(filename) for filename in filenames])
+            == return_code
+        )
+        assert time.perf_counter() - started < 1.4
+
+        records: List[dict] = [
+            json.loads(line) for line in capsys.readouterr().out.splitlines()
+        ]
+        assert len(records) == 4
+        transports: List[str] = [record["transport"] for record in records]
+        assert 0 < transports.count("deadline") < 4
+        assert all(
+            "error" == record["verdict"]
+            for record in records
+            if "deadline" == record["transport"]
+        )
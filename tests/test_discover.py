@@ -0,0 +1,88 @@
+from pathlib import Path
+from typing import List
+
+import pytest
+
+from src.pre_commit_jenkinsfile import lint_jenkinsfile
+from src.pre_commit_jenkinsfile.discover import discover, is_ignored, parse_gitignore
+from src.pre_commit_jenkinsfile.results import ErrorCodes
+
+DATA_DIR: Path = Path(__file__).parent / "data"
+
+
+def touch(root: Path, *names: str) -> None:
+    for name in names:
+        (root / name).parent.mkdir(parents=True, exist_ok=True)
+        (root / name).write_text((DATA_DIR / "valid" / "Jenkinsfile").read_text())
+
+
+class TestDiscover:
+    def test_pipelines_are_found(self, tmp_path):
+        touch(
+            tmp_path,
+            "Jenkinsfile",
+            "services/api/jenkinsfile",
+            "services/api/Jenkinsfile.release",
+            "services/web/deploy.jenkinsfile",
+            "services/web/README.md",
+            "node_modules/package/Jenkinsfile",
+            "vendor/Jenkinsfile",
+        )
+
+        found: List[Path] = sorted(discover(tmp_path, ["*.jenkinsfile"]))
+
+        assert found == [
+            tmp_path / "Jenkinsfile",
+            tmp_path / "services" / "api" / "Jenkinsfile.release",
+            tmp_path / "services" / "api" / "jenkinsfile",
+            tmp_path / "services" / "web" / "deploy.jenkinsfile",
+        ]
+
+    def test_gitignore_is_honored(self, tmp_path):
+        touch(
+            tmp_path,
+            "build/Jenkinsfile",
+            "ci/Jenkinsfile",
+            "ci/Jenkinsfile.old",
+            "ci/generated/Jenkinsfile",
+            "ci/generated/keep/Jenkinsfile",
+        )
+        (tmp_path / ".gitignore").write_text("# Build output\n/build/\n*.old\n")
+        (tmp_path / "ci" / ".gitignore").write_text("generated/*\n!generated/keep/\n")
+
+        found: List[Path] = sorted(discover(tmp_path))
+
+        assert found == [
+            tmp_path / "ci" / "Jenkinsfile",
+            tmp_path / "ci" / "generated" / "keep" / "Jenkinsfile",
+        ]
+
+    @pytest.mark.parametrize(
+        "pattern,path,is_directory,ignored",
+        [
+            ("Jenkinsfile", "a/b/Jenkinsfile", False, True),
+            ("/Jenkinsfile", "a/Jenkinsfile", False, False),
+            ("build/", "build", False, False),
+            ("build/", "a/build", True, True),
+            ("a/**/b", "a/x/y/b", False, True),
+            ("*.groovy", "a/b.groovy", False, True),
+            ("Jenkinsfile.[0-9]", "Jenkinsfile.1", False, True),
+        ],
+    )
+    def test_gitignore_patterns(self, pattern, path, is_directory, ignored):
+        rules = parse_gitignore(pattern, "root")
+        assert is_ignored(rules, f"root/{path}", is_directory) == ignored
+
+    def test_main_validates_discovered_files(self, tmp_path, capsys):
+        touch(tmp_path, "a/Jenkinsfile", "b/Jenkinsfile")
+        (tmp_path / "c").mkdir()
+        (tmp_path / "c" / "Jenkinsfile").write_text(
+            (DATA_DIR / "missing_agent" / "Jenkinsfile").read_text()
+        )
+        argv = ["--offline", "--no-cache", "--format", "ndjson"]
+
+        assert (
+            lint_jenkinsfile.main(argv + ["--discover", str(tmp_path)])
+            == ErrorCodes.FAIL
+        )
+        assert len(capsys.readouterr().out.splitlines()) == 3
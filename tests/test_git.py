@@ -0,0 +1,83 @@
+import subprocess
+from pathlib import Path
+
+import pytest
+
+from src.pre_commit_jenkinsfile import lint_jenkinsfile
+from src.pre_commit_jenkinsfile.git import GitError, changed_since
+from src.pre_commit_jenkinsfile.results import ErrorCodes
+
+DATA_DIR: Path = Path(__file__).parent / "data"
+
+
+def git(repo: Path, *args: str) -> None:
+    subprocess.run(
+        ["git", "-c", "user.name=test", "-c", "user.email=test@example.com", *args],
+        cwd=repo,
+        check=True,
+        stdout=subprocess.DEVNULL,
+    )
+
+
+class TestChangedSince:
+    @pytest.fixture
+    def repo(self, tmp_path, monkeypatch) -> Path:
+        valid: str = (DATA_DIR / "valid" / "Jenkinsfile").read_text()
+        for name in ["unchanged", "modified", "deleted"]:
+            (tmp_path / name).mkdir()
+            (tmp_path / name / "Jenkinsfile").write_text(valid)
+        git(tmp_path, "init", "-q")
+        git(tmp_path, "add", ".")
+        git(tmp_path, "commit", "-q", "-m", "Initial commit")
+        git(tmp_path, "tag", "base")
+
+        (tmp_path / "modified" / "Jenkinsfile").write_text(valid + "\n")
+        (tmp_path / "deleted" / "Jenkinsfile").unlink()
+        (tmp_path / "untracked").mkdir()
+        (tmp_path / "untracked" / "Jenkinsfile").write_text(valid)
+        (tmp_path / "untracked" / "README").write_text("")
+        monkeypatch.chdir(tmp_path)
+        return tmp_path
+
+    def test_changed_pipelines_are_found(self, repo):
+        assert changed_since("base") == [
+            Path("modified") / "Jenkinsfile",
+            Path("untracked") / "Jenkinsfile",
+        ]
+
+    def test_given_files_are_filtered(self, repo):
+        filenames = [
+            Path("unchanged") / "Jenkinsfile",
+            Path("modified") / "Jenkinsfile",
+        ]
+
+        assert changed_since("base", filenames) == [Path("modified") / "Jenkinsfile"]
+
+    def test_committed_changes_count(self, repo):
+        git(repo, "add", ".")
+        git(repo, "commit", "-q", "-m", "Change pipelines")
+
+        assert changed_since("base") == [
+            Path("modified") / "Jenkinsfile",
+            Path("untracked") / "Jenkinsfile",
+        ]
+        assert changed_since("HEAD") == []
+
+    def test_unknown_ref(self, repo):
+        with pytest.raises(GitError):
+            changed_since("no-such-ref")
+
+    def test_main_only_validates_changed_files(self, repo, capsys):
+        argv = ["--offline", "--no-cache", "--format", "ndjson", "--since", "base"]
+
+        assert lint_jenkinsfile.main(argv) == ErrorCodes.OK
+        assert len(capsys.readouterr().out.splitlines()) == 2
+        assert lint_jenkinsfile.main(argv[:-1] + ["no-such-ref"]) == ErrorCodes.FAIL
+
+    def test_empty_discover_root(self, repo, capsys):
+        (repo / "empty").mkdir()
+        argv = ["--offline", "--no-cache", "--format", "ndjson", "--since", "base"]
+
+        assert changed_since("base", []) == []
+        assert lint_jenkinsfile.main(argv + ["--discover", "empty"]) == ErrorCodes.OK
+        assert capsys.readouterr().out == ""
@@ -0,0 +1,63 @@
+import time
+from pathlib import Path
+from typing import List
+
+from benchmark import write_jenkinsfiles
+from test_controllers import unused_url
+
+from src.pre_commit_jenkinsfile import lint_jenkinsfile
+from src.pre_commit_jenkinsfile.config import Config
+from src.pre_commit_jenkinsfile.health import HealthStore
+from src.pre_commit_jenkinsfile.results import ErrorCodes
+
+
+def lint(url: str, filenames: List[Path], cache_dir: Path, *args: str) -> int:
+    argv = ["--jenkins_url", url, "--cache-dir", str(cache_dir), "--no-cache"]
+    return lint_jenkinsfile.main(
+        argv + list(args) + [str(filename) for filename in filenames]
+    )
+
+
+class TestHealth:
+    def test_circuit_opens_after_threshold(self, tmp_path, capsys):
+        url: str = unused_url()
+        filenames = write_jenkinsfiles(tmp_path, 2)
+        health = HealthStore(tmp_path / "cache", threshold=2)
+        controller_id: str = Config(jenkins_url=url).controller_id()
+
+        args = ["--circuit-threshold", "2"]
+        for _ in range(2):
+            assert not health.is_open(controller_id)
+            assert lint(url, filenames, tmp_path / "cache", *args) == ErrorCodes.FAIL
+        assert health.is_open(controller_id)
+
+        capsys.readouterr()
+        args += ["--circuit-policy", "fail-open"]
+        assert lint(url, filenames, tmp_path / "cache", *args) == ErrorCodes.OK
+        assert "is skipped until" in capsys.readouterr().out
+
+    def test_open_circuit_skips_the_network(self, fake_jenkins, tmp_path):
+        filenames = write_jenkinsfiles(tmp_path, 2)
+        health = HealthStore(tmp_path / "cache")
+        controller_id: str = Config(jenkins_url=fake_jenkins.url).controller_id()
+        for _ in range(health.threshold):
+            health.failure(controller_id)
+
+        assert lint(fake_jenkins.url, filenames, tmp_path / "cache") == ErrorCodes.FAIL
+        assert fake_jenkins.requests["crumb"] == 0
+
+    def test_probe_closes_circuit(self, fake_jenkins, tmp_path):
+        filenames = write_jenkinsfiles(tmp_path, 2)
+        health = HealthStore(tmp_path / "cache")
+        controller_id: str = Config(jenkins_url=fake_jenkins.url).controller_id()
+        for _ in range(health.threshold):
+            health.failure(controller_id)
+        health._save(
+            controller_id,
+            dict(health.load(controller_id), retry_at=time.time() - 1.0),
+        )
+
+        assert lint(fake_jenkins.url, filenames, tmp_path / "cache") == ErrorCodes.OK
+        assert fake_jenkins.requests["validate"] == 2
+        assert health.load(controller_id)["failures"] == 0
+        assert health.latency(controller_id) > 0.0
@@ -0,0 +1,106 @@
+import threading
+import time
+from pathlib import Path
+from typing import List
+
+import pytest
+from benchmark import write_jenkinsfiles
+
+from src.pre_commit_jenkinsfile.config import Config
+from src.pre_commit_jenkinsfile.hedge import MIN_SAMPLES, Hedger, hedged
+from src.pre_commit_jenkinsfile.limiter import AdaptiveLimiter
+from src.pre_commit_jenkinsfile.linter import Linter
+from src.pre_commit_jenkinsfile.results import ErrorCodes, ValidationResult
+from src.pre_commit_jenkinsfile.transport import limited
+
+
+class TestHedge:
+    def test_slow_request_is_hedged(self, fake_jenkins, tmp_path):
+        fake_jenkins.latency = 0.01
+        fake_jenkins.stalls = 1
+        fake_jenkins.stall = 1.0
+        filenames = write_jenkinsfiles(tmp_path, 4)
+        hedger = Hedger(0.5, initial_delay=0.1)
+        with Linter(Config(jenkins_url=fake_jenkins.url), hedger=hedger) as linter:
+            results = list(linter.lint_many(filenames))
+
+        assert [result.return_code for result in results] == [ErrorCodes.OK] * 4
+        # The stalled request was answered by its hedge
+        assert max(result.duration for result in results) < 0.5
+        assert (hedger.hedges, hedger.won) == (1, 1)
+        assert fake_jenkins.requests["validate"] == 5
+
+    @pytest.mark.parametrize("transport", ["http", "ssh"])
+    def test_loser_is_taken_back(self, fake_jenkins, tmp_path, transport):
+        # Both requests stall, and the hedge would answer half a second after the first
+        fake_jenkins.stalls = 2
+        fake_jenkins.stall = 1.0
+        filenames = write_jenkinsfiles(tmp_path, 1)
+        hedger = Hedger(1.0, initial_delay=0.5)
+        limiter = AdaptiveLimiter(2, 2)
+        notices: List[str] = []
+        config = (
+            Config(jenkins_url=fake_jenkins.url)
+            if "http" == transport
+            else Config(
+                jenkins_hostname="127.0.0.1", jenkins_ssh_port=fake_jenkins.ssh_port
+            )
+        )
+        with Linter(
+            config, limiter=limiter, hedger=hedger, notify=notices.append
+        ) as linter:
+            results = list(linter.lint_many(filenames))
+            # The hedge gives its slot back without waiting for its answer
+            time.sleep(0.2)
+            assert limiter.in_flight == 0
+
+        assert [result.return_code for result in results] == [ErrorCodes.OK]
+        assert (hedger.hedges, hedger.won) == (1, 0)
+        # Its closed connection or channel does not make the controller look down
+        assert notices == []
+
+    def test_delay_follows_response_times(self):
+        hedger = Hedger(0.1, initial_delay=1.0)
+        assert hedger.delay() == 1.0
+        for duration in range(MIN_SAMPLES * 10):
+            hedger.record(duration / 100)
+        assert hedger.delay() == 0.9
+
+    def test_hedges_are_capped(self):
+        calls = []
+        lock = threading.Lock()
+
+        def slow(filename: Path) -> ValidationResult:
+            with lock:
+                calls.append(filename)
+            time.sleep(0.05)
+            return ValidationResult(filename, ErrorCodes.OK, "")
+
+        # Every request is slow, so hedging everything would double the load
+        hedger = Hedger(0.1, initial_delay=0.01)
+        validate = hedged(slow, hedger)
+        for number in range(20):
+            validate(Path(str(number)))
+
+        assert 0 < hedger.hedges <= 0.1 * 20 + 1
+        assert len(calls) == 20 + hedger.hedges
+
+    def test_hedges_stay_within_the_limiter(self):
+        def slow(filename: Path) -> ValidationResult:
+            time.sleep(0.1)
+            return ValidationResult(filename, ErrorCodes.OK, "")
+
+        # The only slot is taken by the request itself
+        hedger = Hedger(1.0, initial_delay=0.01)
+        limiter = AdaptiveLimiter(1, 1)
+        limited(hedged(slow, hedger, limiter), limiter)(Path("a"))
+        assert hedger.hedges == 0
+
+        # A free slot is taken by the hedge until it comes back
+        hedger = Hedger(1.0, initial_delay=0.05)
+        limiter = AdaptiveLimiter(2, 2)
+        limited(hedged(slow, hedger, limiter), limiter)(Path("a"))
+        assert hedger.hedges == 1
+        assert limiter.in_flight == 1
+        time.sleep(0.2)
+        assert limiter.in_flight == 0
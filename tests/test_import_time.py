@@ -0,0 +1,52 @@
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict
+
+ROOT_DIR: Path = Path(__file__).parent.parent
+HEAVY_PACKAGES = ("paramiko", "urllib3", "cryptography")
+# Generous enough for a slow CI agent; paramiko alone takes about 200 ms on a laptop
+MAX_IMPORT_MICROSECONDS: int = 250_000
+
+
+def import_times(code: str) -> Dict[str, int]:
+    # Runs code in a fresh interpreter and returns the cumulative import time of every module
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=ROOT_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times: Dict[str, int] = {}
+    for line in completed.stderr.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            _, cumulative, name = line[len("import time:") :].split("|")
+            if cumulative.strip().isdigit():
+                times[name.strip()] = int(cumulative)
+    return times
+
+
+class TestImportTime:
+    def test_transports_are_not_imported_at_startup(self):
+        times = import_times("import src.pre_commit_jenkinsfile.lint_jenkinsfile")
+
+        assert "src.pre_commit_jenkinsfile.lint_jenkinsfile" in times
+        assert [name for name in times if name.split(".")[0] in HEAVY_PACKAGES] == []
+
+    def test_startup_time_is_bounded(self):
+        times = import_times("import src.pre_commit_jenkinsfile.lint_jenkinsfile")
+
+        assert (
+            times["src.pre_commit_jenkinsfile.lint_jenkinsfile"]
+            < MAX_IMPORT_MICROSECONDS
+        )
+
+    def test_offline_run_never_loads_a_transport(self):
+        data_file: Path = ROOT_DIR / "tests" / "data" / "valid" / "Jenkinsfile"
+        times = import_times(
+            "from src.pre_commit_jenkinsfile.lint_jenkinsfile import main; "
+            f"main(['--jenkins_url', 'http://jenkins', '--offline', {str(data_file)!r}])"
+        )
+
+        assert [name for name in times if name.split(".")[0] in HEAVY_PACKAGES] == []
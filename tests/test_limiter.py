@@ -0,0 +1,71 @@
+from benchmark import write_jenkinsfiles
+from fake_jenkins import FakeJenkins
+
+from src.pre_commit_jenkinsfile.config import Config
+from src.pre_commit_jenkinsfile.limiter import AdaptiveLimiter
+from src.pre_commit_jenkinsfile.linter import Linter
+from src.pre_commit_jenkinsfile.results import ErrorCodes
+
+
+class TestAdaptiveLimiter:
+    def test_grows_while_latency_is_flat(self):
+        limiter = AdaptiveLimiter(1, 4)
+        for _ in range(20):
+            limiter.release(limiter.acquire(), 0.01)
+
+        assert limiter.limit == 4
+        assert limiter.peak == 4
+
+    def test_backs_off_once_per_epoch(self):
+        limiter = AdaptiveLimiter(8, 8)
+        epochs = [limiter.acquire() for _ in range(8)]
+        limiter.release(epochs[0], 0.01)
+        limiter.release(epochs[1], 0.01, overloaded=True)
+        # Requests sent before the cut were sent at the old limit and do not cut it again
+        limiter.release(epochs[2], 0.01, overloaded=True)
+        limiter.release(epochs[3], 0.5)
+
+        assert limiter.limit == 4
+        assert limiter.backoffs == 1
+
+        for epoch in epochs[4:]:
+            limiter.release(epoch, 0.01)
+        limiter.release(limiter.acquire(), 0.5)
+        assert limiter.limit == 2
+
+    def test_never_leaves_its_bounds(self):
+        limiter = AdaptiveLimiter(1, 2)
+        for _ in range(3):
+            limiter.release(limiter.acquire(), 0.01, overloaded=True)
+
+        assert limiter.limit == 1
+
+
+class TestAdaptiveConcurrency:
+    def test_http_backs_off_when_turned_away(self, tmp_path):
+        filenames = write_jenkinsfiles(tmp_path, 40)
+        limiter = AdaptiveLimiter(1, 8)
+        with FakeJenkins(latency=0.01, capacity=3).start() as jenkins:
+            with Linter(Config(jenkins_url=jenkins.url), limiter=limiter) as linter:
+                results = list(linter.lint_many(filenames))
+
+        assert [result.return_code for result in results] == [ErrorCodes.OK] * 40
+        assert limiter.backoffs > 0
+        assert jenkins.peak_in_flight <= 3
+
+    def test_ssh_backs_off_when_channels_are_refused(self, fake_jenkins, tmp_path):
+        fake_jenkins.latency = 0.01
+        fake_jenkins.capacity = 3
+        filenames = write_jenkinsfiles(tmp_path, 40)
+        limiter = AdaptiveLimiter(8, 8)
+
+        config = Config(
+            jenkins_hostname="127.0.0.1", jenkins_ssh_port=fake_jenkins.ssh_port
+        )
+        with Linter(config, limiter=limiter) as linter:
+            results = list(linter.lint_many(filenames))
+
+        assert [result.return_code for result in results] == [ErrorCodes.OK] * 40
+        assert fake_jenkins.requests["ssh"] == 40
+        assert fake_jenkins.rejected > 0
+        assert limiter.backoffs > 0
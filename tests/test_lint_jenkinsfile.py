@@ -1,5 +1,224 @@
+import json
+import time
+from pathlib import Path
+from typing import List
+
 import pytest
+from benchmark import write_jenkinsfiles
+from test_controllers import unused_url
+
+from src.pre_commit_jenkinsfile import http_transport, lint_jenkinsfile, ssh_transport
+from src.pre_commit_jenkinsfile.results import ErrorCodes, ValidationResult
+from src.pre_commit_jenkinsfile.session import JenkinsSession
+
+DATA_DIR: Path = Path(__file__).parent / "data"
 
 
 class TestLintJenkinsFile:
-    pass
+    @pytest.fixture
+    def fake_http(self, monkeypatch):
+        validated: List[Path] = []
+
+        def fake_validate(filename, session) -> ValidationResult:
+            validated.append(filename)
+            if "missing_agent" in str(filename):
+                return ValidationResult(filename, ErrorCodes.FAIL, "Errors encountered")
+            return ValidationResult(
+                filename, ErrorCodes.OK, "Jenkinsfile successfully validated."
+            )
+
+        monkeypatch.setattr(
+            JenkinsSession, "ensure_crumb", lambda self: "Jenkins-Crumb:abc"
+        )
+        monkeypatch.setattr(http_transport, "http_validate", fake_validate)
+        return validated
+
+    def test_cached_results_skip_the_controller(self, fake_http, tmp_path):
+        argv = [
+            "--jenkins_url",
+            "http://jenkins",
+            "--cache-dir",
+            str(tmp_path),
+            "--no-offline-check",
+            str(DATA_DIR / "valid" / "Jenkinsfile"),
+            str(DATA_DIR / "missing_agent" / "Jenkinsfile"),
+        ]
+
+        assert lint_jenkinsfile.main(argv) == ErrorCodes.FAIL
+        assert len(fake_http) == 2
+
+        assert lint_jenkinsfile.main(argv) == ErrorCodes.FAIL
+        assert len(fake_http) == 2
+
+    def test_no_cache(self, fake_http, tmp_path):
+        argv = [
+            "--jenkins_url",
+            "http://jenkins",
+            "--cache-dir",
+            str(tmp_path),
+            "--no-cache",
+            str(DATA_DIR / "valid" / "Jenkinsfile"),
+        ]
+
+        assert lint_jenkinsfile.main(argv) == ErrorCodes.OK
+        assert lint_jenkinsfile.main(argv) == ErrorCodes.OK
+        assert len(fake_http) == 2
+
+    def test_offline_check_rejects_before_the_controller(self, fake_http, tmp_path):
+        argv = [
+            "--jenkins_url",
+            "http://jenkins",
+            "--no-cache",
+            str(DATA_DIR / "valid" / "Jenkinsfile"),
+            str(DATA_DIR / "missing_agent" / "Jenkinsfile"),
+        ]
+
+        assert lint_jenkinsfile.main(argv) == ErrorCodes.FAIL
+        assert fake_http == [DATA_DIR / "valid" / "Jenkinsfile"]
+
+    def test_offline_mode_never_contacts_the_controller(self, fake_http, capsys):
+        argv = ["--jenkins_url", "http://jenkins", "--no-cache", "--offline"]
+
+        assert (
+            lint_jenkinsfile.main(argv + [str(DATA_DIR / "valid" / "Jenkinsfile")])
+            == ErrorCodes.OK
+        )
+        assert (
+            lint_jenkinsfile.main(
+                argv + [str(DATA_DIR / "missing_agent" / "Jenkinsfile")]
+            )
+            == ErrorCodes.FAIL
+        )
+        assert fake_http == []
+        assert "@ line 2, column 3." in capsys.readouterr().out
+
+    def test_parallel_output_keeps_file_order(self, monkeypatch, capsys):
+        filenames = [Path(f"Jenkinsfile.{index}") for index in range(4)]
+
+        def slow_validate(filename, session) -> ValidationResult:
+            # Later files finish first
+            time.sleep(0.01 * (len(filenames) - filenames.index(filename)))
+            return ValidationResult(filename, ErrorCodes.FAIL, f"Error in {filename}")
+
+        monkeypatch.setattr(
+            JenkinsSession, "ensure_crumb", lambda self: "Jenkins-Crumb:abc"
+        )
+        monkeypatch.setattr(http_transport, "http_validate", slow_validate)
+
+        argv = ["--jenkins_url", "http://jenkins", "--no-cache", "--no-offline-check"]
+
+        return_code = lint_jenkinsfile.main(
+            argv + ["--jobs", "4"] + [str(filename) for filename in filenames]
+        )
+
+        assert return_code == ErrorCodes.FAIL
+        printed = capsys.readouterr().out.splitlines()
+        assert printed[0::2] == [str(filename) for filename in filenames]
+
+    def test_ssh_channels_run_concurrently(self, fake_jenkins, tmp_path):
+        fake_jenkins.latency = 0.05
+        filenames = write_jenkinsfiles(tmp_path, 8)
+
+        return_code = ssh_transport.lint_via_ssh(
+            filenames, "127.0.0.1", fake_jenkins.ssh_port, jobs=4
+        )
+
+        assert return_code == ErrorCodes.OK
+        assert fake_jenkins.requests["ssh"] == 8
+        assert fake_jenkins.peak_in_flight == 4
+
+    def test_ndjson_records(self, fake_http, tmp_path, capsys):
+        argv = [
+            "--jenkins_url",
+            "http://jenkins",
+            "--cache-dir",
+            str(tmp_path),
+            "--format",
+            "ndjson",
+            str(DATA_DIR / "valid" / "Jenkinsfile"),
+            str(DATA_DIR / "missing_agent" / "Jenkinsfile"),
+        ]
+
+        assert lint_jenkinsfile.main(argv) == ErrorCodes.FAIL
+        records = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+        assert {record["path"]: record["verdict"] for record in records} == {
+            str(DATA_DIR / "valid" / "Jenkinsfile"): "pass",
+            str(DATA_DIR / "missing_agent" / "Jenkinsfile"): "fail",
+        }
+        assert {record["transport"] for record in records} == {"http", "offline"}
+
+        assert lint_jenkinsfile.main(argv) == ErrorCodes.FAIL
+        records = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+        assert {record["transport"] for record in records} == {"cache", "offline"}
+
+    def test_ndjson_record_without_a_controller(self, tmp_path, capsys):
+        filenames = write_jenkinsfiles(tmp_path, 2)
+        argv = [
+            "--jenkins_url",
+            unused_url(),
+            "--cache-dir",
+            str(tmp_path / "cache"),
+            "--circuit-threshold",
+            "1",
+            "--format",
+            "ndjson",
+        ] + [str(filename) for filename in filenames]
+
+        # The first file gets a record of why it was not validated; the rest are not sent
+        for verdict in ["unreachable", "skipped"]:
+            assert lint_jenkinsfile.main(argv) == ErrorCodes.FAIL
+            records = [
+                json.loads(line) for line in capsys.readouterr().out.splitlines()
+            ]
+            assert [record["verdict"] for record in records] == [verdict]
+
+    def test_fail_fast_stops_sending_files(self, fake_jenkins, tmp_path):
+        fake_jenkins.latency = 0.05
+        fake_jenkins.error_rate = 1.0
+        filenames = write_jenkinsfiles(tmp_path, 8)
+        argv = [
+            "--jenkins_hostname",
+            "127.0.0.1",
+            "--jenkins_ssh_port",
+            str(fake_jenkins.ssh_port),
+            "--no-cache",
+            "--fail-fast",
+            "--jobs",
+            "2",
+        ] + [str(filename) for filename in filenames]
+
+        assert lint_jenkinsfile.main(argv) == ErrorCodes.FAIL
+        assert fake_jenkins.requests["ssh"] < 8
+
+    @pytest.mark.parametrize("transport", ["http", "ssh"])
+    def test_large_files_are_sent_whole(self, fake_jenkins, tmp_path, transport):
+        # A generated pipeline far larger than an SSH packet
+        filename: Path = tmp_path / "Jenkinsfile"
+        stages: str = "\n".join(
+            f"    stage('Step {index}') {{ steps {{ echo '{index:08}' }} }}"
+            for index in range(10000)
+        )
+        filename.write_text(
+            f"pipeline {{\n  agent any\n  stages {{\n{stages}\n  }}\n}}\n"
+        )
+
+        if "http" == transport:
+            return_code = http_transport.lint_via_http(
+                [filename], fake_jenkins.url, "", ""
+            )
+        else:
+            return_code = ssh_transport.lint_via_ssh(
+                [filename], "127.0.0.1", fake_jenkins.ssh_port
+            )
+
+        assert return_code == ErrorCodes.OK
+
+        assert fake_jenkins.largest_upload == filename.stat().st_size
+
+    def test_lint_via_http_without_a_controller(self, tmp_path, capsys):
+        filenames = write_jenkinsfiles(tmp_path, 2)
+
+        return_code = http_transport.lint_via_http(filenames, unused_url(), "", "")
+
+        assert return_code == ErrorCodes.FAIL
+        assert len(capsys.readouterr().out) > 0
@@ -0,0 +1,88 @@
+from pathlib import Path
+from typing import List
+
+from benchmark import write_jenkinsfiles
+from test_controllers import unused_url
+
+from src.pre_commit_jenkinsfile.cache import ResultCache
+from src.pre_commit_jenkinsfile.config import Config
+from src.pre_commit_jenkinsfile.linter import TEXT_FILENAME, Linter
+from src.pre_commit_jenkinsfile.results import ErrorCodes
+
+DATA_DIR: Path = Path(__file__).parent / "data"
+
+
+class TestLinter:
+    def test_connection_is_kept_between_calls(self, fake_jenkins, tmp_path):
+        filenames = write_jenkinsfiles(tmp_path, 3)
+        with Linter(Config(jenkins_url=fake_jenkins.url)) as linter:
+            for filename in filenames:
+                assert linter.lint(filename).return_code == ErrorCodes.OK
+
+        assert fake_jenkins.requests["crumb"] == 1
+        assert fake_jenkins.requests["validate"] == 3
+
+    def test_text_is_linted(self, fake_jenkins):
+        config = Config(
+            jenkins_hostname="127.0.0.1", jenkins_ssh_port=fake_jenkins.ssh_port
+        )
+        with Linter(config, offline_check=False) as linter:
+            passed = linter.lint((DATA_DIR / "valid" / "Jenkinsfile").read_text())
+            failed = linter.lint(
+                (DATA_DIR / "missing_agent" / "Jenkinsfile").read_text()
+            )
+
+        assert (passed.filename, passed.return_code, passed.transport) == (
+            TEXT_FILENAME,
+            ErrorCodes.OK,
+            "ssh",
+        )
+        assert failed.return_code == ErrorCodes.FAIL
+        assert fake_jenkins.requests["ssh"] == 2
+
+    def test_lint_many_never_prints(self, fake_jenkins, tmp_path, capsys):
+        filenames = write_jenkinsfiles(tmp_path, 6) + [
+            DATA_DIR / "missing_agent" / "Jenkinsfile"
+        ]
+        cache = ResultCache(tmp_path / "cache")
+        with Linter(Config(jenkins_url=fake_jenkins.url), cache, jobs=3) as linter:
+            first = list(linter.lint_many(filenames))
+            second = list(linter.lint_many(filenames))
+
+        assert sorted(result.filename for result in first) == sorted(filenames)
+        assert {result.transport for result in first} == {"http", "offline"}
+        assert {result.transport for result in second} == {"cache", "offline"}
+        assert fake_jenkins.requests["validate"] == 6
+        assert capsys.readouterr().out == ""
+
+    def test_cached_files_do_not_connect(self, fake_jenkins, tmp_path):
+        filenames = write_jenkinsfiles(tmp_path, 3)
+        cache = ResultCache(tmp_path / "cache")
+        config = Config(jenkins_url=fake_jenkins.url)
+        with Linter(config, cache) as linter:
+            list(linter.lint_many(filenames))
+        with Linter(config, cache) as linter:
+            results = list(linter.lint_many(filenames))
+
+        assert {result.transport for result in results} == {"cache"}
+        assert fake_jenkins.requests["crumb"] == 1
+
+    def test_in_order_keeps_known_results_in_place(self, fake_jenkins, tmp_path):
+        fake_jenkins.latency = 0.05
+        filenames = write_jenkinsfiles(tmp_path, 2)
+        filenames.insert(1, DATA_DIR / "missing_agent" / "Jenkinsfile")
+        with Linter(Config(jenkins_url=fake_jenkins.url), jobs=2) as linter:
+            results = list(linter.lint_many(filenames, in_order=True))
+
+        # The offline failure is known at once, but comes after the file ahead of it
+        assert [result.filename for result in results] == filenames
+        assert [result.transport for result in results] == ["http", "offline", "http"]
+
+    def test_unreachable_controller(self, tmp_path):
+        notices: List[str] = []
+        with Linter(Config(jenkins_url=unused_url()), notify=notices.append) as linter:
+            results = list(linter.lint_many(write_jenkinsfiles(tmp_path, 2)))
+
+        assert [result.is_verdict for result in results] == [False, False]
+        assert not linter.reachable
+        assert len(notices) == 1
@@ -0,0 +1,81 @@
+import json
+from pathlib import Path
+from typing import List
+
+import pytest
+from benchmark import write_jenkinsfiles
+from fake_jenkins import SCRIPT_FAILURE
+from test_controllers import unused_url
+
+from src.pre_commit_jenkinsfile import lint_jenkinsfile
+from src.pre_commit_jenkinsfile.results import ErrorCodes
+from src.pre_commit_jenkinsfile.script_transport import batches, script_validate
+from src.pre_commit_jenkinsfile.session import JenkinsSession
+
+
+def lint(url: str, filenames: List[Path], *args: str) -> int:
+    argv = ["--jenkins_url", url, "--transport", "script", "--no-cache"]
+    argv += ["--no-offline-check", "--format", "ndjson"]
+    return lint_jenkinsfile.main(
+        argv + list(args) + [str(filename) for filename in filenames]
+    )
+
+
+class TestScriptTransport:
+    def test_batches_are_limited_by_size(self, tmp_path):
+        filenames = write_jenkinsfiles(tmp_path, 5)
+        size: int = filenames[0].stat().st_size
+
+        assert [len(batch) for batch in batches(filenames, 2 * size)] == [2, 2, 1]
+        assert [len(batch) for batch in batches(filenames, size // 2)] == [1] * 5
+
+    def test_one_request_per_batch(self, fake_jenkins, tmp_path, capsys):
+        filenames = write_jenkinsfiles(tmp_path, 5)
+        # Passes the offline check, so the failure can only come from the controller
+        filenames[-1].write_text(filenames[-1].read_text() + SCRIPT_FAILURE + "\n")
+
+        assert lint(fake_jenkins.url, filenames, "--jobs", "2") == ErrorCodes.FAIL
+
+        records = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+        assert {record["path"] for record in records} == {
+            str(filename) for filename in filenames
+        }
+        assert [record["verdict"] for record in records].count("fail") == 1
+        assert {record["transport"] for record in records} == {"script"}
+        assert fake_jenkins.requests["script"] == 1
+        assert fake_jenkins.requests["validate"] == 0
+
+    def test_missing_permission(self, fake_jenkins, tmp_path, capsys):
+        fake_jenkins.script_console = False
+
+        assert (
+            lint(fake_jenkins.url, write_jenkinsfiles(tmp_path, 2)) == ErrorCodes.FAIL
+        )
+        records = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+        assert [record["verdict"] for record in records] == ["error", "error"]
+        assert "Overall/Administer" in records[0]["message"]
+
+    @pytest.mark.parametrize(
+        "policy, expected",
+        [("fail-open", ErrorCodes.OK), ("fail-closed", ErrorCodes.FAIL)],
+    )
+    def test_deadline(self, fake_jenkins, tmp_path, capsys, policy, expected):
+        fake_jenkins.latency = 1.0
+        filenames = write_jenkinsfiles(tmp_path, 2)
+        deadline = ["--deadline", "0.3", "--deadline-policy", policy]
+
+        assert lint(fake_jenkins.url, filenames, *deadline) == expected
+        records = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+        assert [record["transport"] for record in records] == ["deadline"] * 2
+        assert fake_jenkins.requests["script"] == 1
+
+    def test_unreachable_controller(self, tmp_path, capsys):
+        filenames = write_jenkinsfiles(tmp_path, 2)
+
+        assert lint(unused_url(), filenames) == ErrorCodes.FAIL
+        assert "Connection failed" in capsys.readouterr().err
+
+        # Without a crumb to request first, the batch itself cannot be sent
+        results = script_validate(filenames, JenkinsSession(unused_url(), "", ""))
+        assert [result.is_verdict for result in results] == [False, False]
+        assert results[0].message.startswith("Connection failed")
@@ -0,0 +1,102 @@
+import stat
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List
+
+import pytest
+
+from src.pre_commit_jenkinsfile.session import CrumbStore, JenkinsSession
+
+
+class CrumbHandler(BaseHTTPRequestHandler):
+    crumb_requests: List[str] = []
+    valid_crumb: Dict[str, str] = {"value": "1"}
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, status: int, body: str, headers: Dict[str, str]):
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body.encode())
+
+    def do_GET(self):
+        self.crumb_requests.append(self.path)
+        value: str = self.valid_crumb["value"]
+        self._reply(
+            200,
+            f"Jenkins-Crumb:{value}",
+            {"Set-Cookie": f"JSESSIONID={value}; Path=/"},
+        )
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers["Content-Length"]))
+        value: str = self.valid_crumb["value"]
+        if (
+            self.headers.get("Jenkins-Crumb") != value
+            or self.headers.get("Cookie") != f"JSESSIONID={value}"
+        ):
+            self._reply(403, "No valid crumb was included in the request", {})
+        else:
+            self._reply(200, "Jenkinsfile successfully validated.", {})
+
+
+@pytest.fixture
+def jenkins_url():
+    CrumbHandler.crumb_requests = []
+    CrumbHandler.valid_crumb = {"value": "1"}
+    server = ThreadingHTTPServer(("127.0.0.1", 0), CrumbHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+class TestJenkinsSession:
+    def test_crumb_and_cookie_are_reused_between_sessions(
+        self, jenkins_url: str, tmp_path: Path
+    ):
+        store = CrumbStore(tmp_path)
+        for _ in range(3):
+            session = JenkinsSession(jenkins_url, "", "", crumb_store=store)
+            assert session.ensure_crumb() == "Jenkins-Crumb:1"
+            response = session.post(
+                "/pipeline-model-converter/validate", fields={"jenkinsfile": ""}
+            )
+            assert response.status == 200
+
+        assert len(CrumbHandler.crumb_requests) == 1
+
+    def test_crumb_is_refreshed_on_403(self, jenkins_url: str, tmp_path: Path):
+        store = CrumbStore(tmp_path)
+        JenkinsSession(jenkins_url, "", "", crumb_store=store).ensure_crumb()
+        CrumbHandler.valid_crumb["value"] = "2"
+
+        session = JenkinsSession(jenkins_url, "", "", crumb_store=store)
+        session.ensure_crumb()
+        response = session.post(
+            "/pipeline-model-converter/validate", fields={"jenkinsfile": ""}
+        )
+
+        assert response.status == 200
+        assert session.crumb == "Jenkins-Crumb:2"
+        assert len(CrumbHandler.crumb_requests) == 2
+
+    def test_stored_crumbs_are_private(self, tmp_path: Path):
+        store = CrumbStore(tmp_path)
+        store.save("http://jenkins", "user", "Jenkins-Crumb:1", {})
+
+        entry_path = next(store.store_dir.glob("*.json"))
+        assert stat.S_IMODE(entry_path.stat().st_mode) == 0o600
+        assert store.load("http://jenkins", "user")["crumb"] == "Jenkins-Crumb:1"
+
+    def test_expired_crumbs_are_discarded(self, tmp_path: Path):
+        store = CrumbStore(tmp_path, ttl=-1.0)
+        store.save("http://jenkins", "user", "Jenkins-Crumb:1", {})
+
+        assert store.load("http://jenkins", "user") is None
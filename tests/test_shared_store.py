@@ -0,0 +1,77 @@
+import json
+from pathlib import Path
+from typing import List
+
+from benchmark import write_jenkinsfiles
+from fake_store import FakeResultStore
+
+from src.pre_commit_jenkinsfile import lint_jenkinsfile
+from src.pre_commit_jenkinsfile.results import ErrorCodes
+from src.pre_commit_jenkinsfile.shared_store import store_key, versions_id
+
+
+def lint(filenames: List[Path], cache_dir: Path, *args: str) -> int:
+    argv = ["--cache-dir", str(cache_dir), "--no-offline-check", "--format", "ndjson"]
+    return lint_jenkinsfile.main(
+        argv + list(args) + [str(filename) for filename in filenames]
+    )
+
+
+def transports(output: str) -> List[str]:
+    return [json.loads(line)["transport"] for line in output.splitlines()]
+
+
+class TestSharedStore:
+    def test_key_depends_on_versions(self):
+        assert store_key(b"pipeline {}", versions_id("2.462.3", "2.1")) != store_key(
+            b"pipeline {}", versions_id("2.462.3", "2.2")
+        )
+
+    def test_http_store_is_shared_between_machines(
+        self, fake_jenkins, tmp_path, capsys
+    ):
+        filenames = write_jenkinsfiles(tmp_path, 3)
+        with FakeResultStore().start() as store:
+            args = ["--jenkins_url", fake_jenkins.url, "--shared-cache", store.url]
+
+            assert lint(filenames, tmp_path / "first", *args) == ErrorCodes.OK
+            assert transports(capsys.readouterr().out) == ["http"] * 3
+            # A teammate with an empty local cache
+            assert lint(filenames, tmp_path / "second", *args) == ErrorCodes.OK
+            assert transports(capsys.readouterr().out) == ["shared"] * 3
+
+            assert fake_jenkins.requests["validate"] == 3
+            assert fake_jenkins.requests["versions"] == 2
+            assert store.requests["PUT"] == 3
+
+    def test_plugin_upgrade_invalidates_directory_store(
+        self, fake_jenkins, tmp_path, capsys
+    ):
+        filenames = write_jenkinsfiles(tmp_path, 2)
+        args = [
+            "--jenkins_hostname",
+            "127.0.0.1",
+            "--jenkins_ssh_port",
+            str(fake_jenkins.ssh_port),
+            "--shared-cache",
+            str(tmp_path / "shared"),
+        ]
+
+        assert lint(filenames, tmp_path / "first", *args) == ErrorCodes.OK
+        assert lint(filenames, tmp_path / "second", *args) == ErrorCodes.OK
+        assert fake_jenkins.requests["ssh"] == 2
+
+        fake_jenkins.plugin_version = "2.9999.v0000000000"
+        capsys.readouterr()
+        assert lint(filenames, tmp_path / "third", *args) == ErrorCodes.OK
+        assert transports(capsys.readouterr().out) == ["ssh"] * 2
+        assert fake_jenkins.requests["ssh"] == 4
+
+    def test_unreachable_store_is_a_miss(self, fake_jenkins, tmp_path):
+        filenames = write_jenkinsfiles(tmp_path, 2)
+        with FakeResultStore().start() as store:
+            url: str = store.url
+        args = ["--jenkins_url", fake_jenkins.url, "--shared-cache", url]
+
+        assert lint(filenames, tmp_path / "cache", *args) == ErrorCodes.OK
+        assert fake_jenkins.requests["validate"] == 2
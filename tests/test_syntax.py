@@ -0,0 +1,121 @@
+from typing import List
+
+import pytest
+
+from src.pre_commit_jenkinsfile.syntax import (
+    canonical_digest,
+    check_structure,
+    tokenize,
+)
+
+VALID = """#!groovy
+@Library('shared') _
+def suffix = "${env.BRANCH_NAME}" / 2
+pipeline {
+  agent { label 'linux' }
+  environment { PATTERN = /re{gex/ }
+  options { timeout(time: 1, unit: 'HOURS') }
+  stages {
+    stage('Build') {
+      steps {
+        sh '''echo "}"'''
+        // an unbalanced { in a comment
+      }
+    }
+  } post { always { echo "done" } }
+}
+"""
+
+
+def messages(text: str) -> List[str]:
+    return [str(issue) for issue in check_structure(text)]
+
+
+class TestSyntax:
+    def test_valid_pipeline(self):
+        assert messages(VALID) == []
+
+    def test_scripted_pipelines_are_left_to_the_controller(self):
+        assert messages("node {\n  sh 'make'\n}\n") == []
+
+    @pytest.mark.parametrize(
+        "text, expected",
+        [
+            (
+                "pipeline {\n  agent\n  stages { stage('a') {} }\n}\n",
+                'WorkflowScript: 2: Not a valid section definition: "agent". '
+                "Some extra configuration is required @ line 2, column 3.",
+            ),
+            (
+                "pipeline {\n  agent any\n  stages { stage('a') {}\n}\n",
+                "WorkflowScript: 1: Missing '}' to close '{' @ line 1, column 10.",
+            ),
+            (
+                "pipeline {\n  agent any\n  build { }\n  stages { stage('a') {} }\n}\n",
+                'WorkflowScript: 3: Undefined section "build" @ line 3, column 3.',
+            ),
+            (
+                "pipeline {\n  agent any\n}\n",
+                'WorkflowScript: 1: Missing required section "stages" @ line 1, column 1.',
+            ),
+            (
+                "pipeline {\n  agent any\n  stages {\n  }\n}\n",
+                "WorkflowScript: 3: No stages specified @ line 3, column 3.",
+            ),
+            (
+                "pipeline {\n  agent any\n  stages { echo 'a\n  }\n}\n",
+                "WorkflowScript: 3: Unterminated string starting with ' @ line 3, column 17.",
+            ),
+        ],
+    )
+    def test_structural_errors(self, text: str, expected: str):
+        assert messages(text) == [expected]
+
+    @pytest.mark.parametrize(
+        "step",
+        [
+            'echo "Version ${readFile(\'v\').trim().replace("(", "")}"',
+            'echo "${[a: \'}\'].collect { "${it.key}{" }}"',
+            'sh """echo ${env.X ?: "}"}\n"""',
+        ],
+    )
+    def test_gstring_interpolation(self, step: str):
+        text: str = (
+            "pipeline {\n  agent any\n  stages { stage('a') { steps {\n"
+            f"    {step}\n  }} }} }}\n}}\n"
+        )
+
+        assert messages(text) == []
+
+    def test_multi_line_tokens_keep_line_numbers(self):
+        tokens = tokenize("x = '''a\nb'''\n/* c\n*/ y")
+
+        assert [(token.value, token.line, token.column) for token in tokens][-1] == (
+            "y",
+            4,
+            4,
+        )
+
+    @pytest.mark.parametrize(
+        "edited,same",
+        [
+            ("// build it\npipeline {\n    agent any   \n\n\n}\n", True),
+            ("pipeline { /* any */\n  agent any\n}", True),
+            ("pipeline {\n  agent none\n}\n", False),
+            ("pipeline {\n  agent any }\n", False),
+            ("pipeline {\n  agent 'any // not a comment'\n}\n", False),
+        ],
+    )
+    def test_canonical_digest(self, edited: str, same: bool):
+        original: bytes = b"pipeline {\n  agent any\n}\n"
+
+        assert (canonical_digest(original) == canonical_digest(edited.encode())) == same
+
+    def test_gaps_between_operators_are_kept(self):
+        # Groovy rejects "1 = = 1", so it must not reuse the result of "1 == 1"
+        assert canonical_digest(b"assert 1 = = 1\n") != canonical_digest(
+            b"assert 1 == 1\n"
+        )
+        assert canonical_digest(b"x =/* */= 1\n") != canonical_digest(b"x == 1\n")
+        assert canonical_digest(b"x  ==  1\n") == canonical_digest(b"x == 1\n")
+        assert canonical_digest(b"if (x) {\n}\n") == canonical_digest(b"if (x){\n}\n")
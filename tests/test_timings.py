@@ -0,0 +1,50 @@
+import json
+from pathlib import Path
+
+from src.pre_commit_jenkinsfile import lint_jenkinsfile
+from src.pre_commit_jenkinsfile.timings import Timings
+
+DATA_DIR: Path = Path(__file__).parent / "data"
+
+
+class TestTimings:
+    def test_disabled_recorder_keeps_nothing(self):
+        timings = Timings()
+        with timings.span("crumb"):
+            pass
+
+        assert timings.spans == []
+
+    def test_summary_aggregates_spans_by_name(self):
+        timings = Timings()
+        timings.reset(True)
+        for index in range(3):
+            with timings.span("http_validate", "file", file=f"Jenkinsfile.{index}"):
+                pass
+
+        lines = timings.summary().splitlines()
+        assert lines[1].split()[:2] == ["http_validate", "3"]
+
+    def test_trace_file_from_the_command_line(self, fake_jenkins, tmp_path, capsys):
+        trace_file: Path = tmp_path / "trace.json"
+        lint_jenkinsfile.main(
+            [
+                "--jenkins_url",
+                fake_jenkins.url,
+                "--no-cache",
+                "--timings",
+                "--trace-file",
+                str(trace_file),
+                str(DATA_DIR / "valid" / "Jenkinsfile"),
+            ]
+        )
+
+        events = json.loads(trace_file.read_text())["traceEvents"]
+        names = {event["name"] for event in events}
+        assert {"main", "load_config", "crumb_request", "http_validate"} <= names
+        # The connection is opened before the crumb is requested over it
+        spans = {event["name"]: event for event in events}
+        connect, crumb = spans["http_connect"], spans["crumb_request"]
+        assert connect["ts"] + connect["dur"] <= crumb["ts"]
+        assert all(event["ph"] == "X" and event["dur"] >= 0 for event in events)
+        assert "http_validate" in capsys.readouterr().out
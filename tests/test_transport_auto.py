@@ -0,0 +1,82 @@
+import json
+from pathlib import Path
+from typing import List
+
+from benchmark import write_jenkinsfiles
+from test_controllers import unused_url
+
+from src.pre_commit_jenkinsfile import lint_jenkinsfile
+from src.pre_commit_jenkinsfile.config import Config
+from src.pre_commit_jenkinsfile.controllers import TransportStore
+from src.pre_commit_jenkinsfile.results import ErrorCodes
+
+
+def lint(fake_jenkins, filenames: List[Path], cache_dir: Path) -> None:
+    argv = ["--jenkins_url", fake_jenkins.url, "--jenkins_hostname", "127.0.0.1"]
+    argv += ["--jenkins_ssh_port", str(fake_jenkins.ssh_port), "--transport", "auto"]
+    argv += ["--cache-dir", str(cache_dir), "--no-cache", "--format", "ndjson"]
+    assert (
+        lint_jenkinsfile.main(argv + [str(filename) for filename in filenames])
+        == ErrorCodes.OK
+    )
+
+
+class TestTransportAuto:
+    def test_faster_transport_is_picked_and_remembered(
+        self, fake_jenkins, tmp_path, capsys
+    ):
+        fake_jenkins.crumb_latency = 0.5
+        filenames = write_jenkinsfiles(tmp_path, 3)
+
+        for _ in range(2):
+            lint(fake_jenkins, filenames, tmp_path / "cache")
+            records = [
+                json.loads(line) for line in capsys.readouterr().out.splitlines()
+            ]
+            assert [record["transport"] for record in records] == ["ssh"] * 3
+
+        # Only the first run measured the crumb request
+        assert fake_jenkins.requests["crumb"] == 1
+        assert fake_jenkins.requests["validate"] == 0
+        assert (
+            TransportStore(tmp_path / "cache").load(
+                Config(jenkins_url=fake_jenkins.url).controller_id()
+            )
+            == "ssh"
+        )
+
+    def test_switches_when_the_transport_fails(self, fake_jenkins, tmp_path, capsys):
+        fake_jenkins.http_status = 500
+        filenames = write_jenkinsfiles(tmp_path, 3)
+        # HTTP answered first on an earlier run
+        TransportStore(tmp_path / "cache").save(
+            Config(jenkins_url=fake_jenkins.url).controller_id(), "http"
+        )
+
+        lint(fake_jenkins, filenames, tmp_path / "cache")
+
+        output: str = capsys.readouterr().out
+        records = [json.loads(line) for line in output.splitlines()]
+        assert [record["transport"] for record in records] == ["ssh"] * 3
+        assert fake_jenkins.requests["validate"] == 1
+
+    def test_remembered_transport_that_went_down(self, fake_jenkins, tmp_path, capsys):
+        url: str = unused_url()
+        filenames = write_jenkinsfiles(tmp_path, 2)
+        store = TransportStore(tmp_path / "cache")
+        store.save(Config(jenkins_url=url).controller_id(), "http")
+        argv = ["--jenkins_url", url, "--jenkins_hostname", "127.0.0.1"]
+        argv += [
+            "--jenkins_ssh_port",
+            str(fake_jenkins.ssh_port),
+            "--transport",
+            "auto",
+        ]
+        argv += ["--cache-dir", str(tmp_path / "cache"), "--no-cache"]
+
+        assert (
+            lint_jenkinsfile.main(argv + [str(filename) for filename in filenames])
+            == ErrorCodes.OK
+        )
+        assert fake_jenkins.requests["ssh"] == 2
+        assert store.load(Config(jenkins_url=url).controller_id()) == "ssh"
@@ -0,0 +1,95 @@
+import os
+import queue
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+from benchmark import write_jenkinsfiles
+
+from src.pre_commit_jenkinsfile.config import Config
+from src.pre_commit_jenkinsfile.linter import Linter
+from src.pre_commit_jenkinsfile.results import ErrorCodes, ValidationResult
+from src.pre_commit_jenkinsfile.watch import (
+    INOTIFY_EVENT,
+    IN_Q_OVERFLOW,
+    InotifyWatcher,
+    Watch,
+)
+
+DATA_DIR: Path = Path(__file__).parent / "data"
+
+
+class TestWatch:
+    @pytest.mark.parametrize("polling", [False, True])
+    def test_saves_are_validated(self, fake_jenkins, tmp_path, polling):
+        filenames = write_jenkinsfiles(tmp_path, 2)
+        results: "queue.Queue[ValidationResult]" = queue.Queue()
+        with Linter(Config(jenkins_url=fake_jenkins.url)) as linter:
+            watch = Watch(linter, filenames, results.put, polling=polling)
+            thread = threading.Thread(target=watch.run)
+            thread.start()
+            try:
+                first = {results.get(timeout=5).filename for _ in filenames}
+                assert first == set(filenames)
+
+                # Saving the same content again is not worth a request
+                filenames[0].write_text(filenames[0].read_text())
+                filenames[1].write_text(
+                    (DATA_DIR / "missing_agent" / "Jenkinsfile").read_text()
+                )
+                result = results.get(timeout=5)
+                assert (result.filename, result.return_code) == (
+                    filenames[1],
+                    ErrorCodes.FAIL,
+                )
+            finally:
+                watch.stop()
+                thread.join()
+
+        assert watch.return_codes[filenames[1].absolute()] == ErrorCodes.FAIL
+        assert results.empty()
+        assert fake_jenkins.requests["crumb"] == 1
+        assert fake_jenkins.requests["validate"] == 2
+
+    def test_stale_results_are_dropped(self, fake_jenkins, tmp_path):
+        fake_jenkins.latency = 0.3
+        filenames = write_jenkinsfiles(tmp_path, 1)
+        results: "queue.Queue[ValidationResult]" = queue.Queue()
+        config = Config(jenkins_url=fake_jenkins.url)
+        with Linter(config, offline_check=False) as linter:
+            watch = Watch(linter, filenames, results.put)
+            thread = threading.Thread(target=watch.run)
+            thread.start()
+            try:
+                assert results.get(timeout=5).return_code == ErrorCodes.OK
+                filenames[0].write_text(
+                    (DATA_DIR / "missing_agent" / "Jenkinsfile").read_text()
+                )
+                # Saved again while the broken version is with the controller
+                threading.Event().wait(0.2)
+                filenames[0].write_text(
+                    (DATA_DIR / "valid" / "Jenkinsfile").read_text()
+                )
+                assert results.get(timeout=5).return_code == ErrorCodes.OK
+            finally:
+                watch.stop()
+                thread.join()
+
+        assert results.empty()
+        assert fake_jenkins.requests["validate"] == 3
+
+    @pytest.mark.skipif(not sys.platform.startswith("linux"), reason="needs inotify")
+    def test_queue_overflow_rescans_every_file(self, tmp_path):
+        filenames = write_jenkinsfiles(tmp_path, 2)
+        watcher = InotifyWatcher(filenames)
+        # The kernel reports dropped events with a watch descriptor of -1
+        reader, writer = os.pipe()
+        os.write(writer, INOTIFY_EVENT.pack(-1, IN_Q_OVERFLOW, 0, 0))
+        os.close(watcher.fd)
+        watcher.fd = reader
+        try:
+            assert watcher.wait(1.0) == {filename.absolute() for filename in filenames}
+        finally:
+            watcher.close()
+            os.close(writer)